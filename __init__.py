@@ -7,8 +7,12 @@ from .pipemind_multiline_text import PipemindMultilineTextInput
 from .pipemind_flux_2m_aspect_ratio import PipemindFlux2MAspectRatio
 from .pipemind_sdxl_aspect_ratio import PipemindSDXL15AspectRatio
 from .pipemind_qwen_aspect_ratio import PipemindQwenAspectRatio
-from .pipemind_batch_image_loader_output import BatchImageLoadOutput
-from .pipemind_batch_image_loader_input import BatchImageLoadInput
+from .pipemind_batch_image_loader_output import (
+    AspectBucketPlanOutput, BatchImageLoadOutput, BatchImageListLoadOutput,
+)
+from .pipemind_batch_image_loader_input import (
+    AspectBucketPlanInput, BatchImageLoadInput, BatchImageListLoadInput,
+)
 from .pipemind_image_saver_with_caption import PipemindSaveImageWTxt
 from .pipemind_token_counter import PipemindTokenCounter
 from .pipemind_show_text import PipemindShowText
@@ -30,6 +34,10 @@ NODE_CLASS_MAPPINGS = {
     "PipemindQwenAspectRatio": PipemindQwenAspectRatio,
     "BatchImageLoadOutput": BatchImageLoadOutput,
     "BatchImageLoadInput": BatchImageLoadInput,
+    "BatchImageListLoadOutput": BatchImageListLoadOutput,
+    "BatchImageListLoadInput": BatchImageListLoadInput,
+    "AspectBucketPlanOutput": AspectBucketPlanOutput,
+    "AspectBucketPlanInput": AspectBucketPlanInput,
     "PipemindSaveImageWTxt": PipemindSaveImageWTxt,
     "PipemindTokenCounter": PipemindTokenCounter,
     "PipemindShowText": PipemindShowText,
@@ -52,6 +60,10 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "PipemindQwenAspectRatio": "🧵 Qwen Aspect Ratios",
     "BatchImageLoadOutput": "🧵 Batch Image Loader src Output",
     "BatchImageLoadInput": "🧵 Batch Image Loader src Input",
+    "BatchImageListLoadOutput": "🧵 Batch Image List Loader src Output",
+    "BatchImageListLoadInput": "🧵 Batch Image List Loader src Input",
+    "AspectBucketPlanOutput": "🧵 Aspect Bucket Plan src Output",
+    "AspectBucketPlanInput": "🧵 Aspect Bucket Plan src Input",
     "PipemindSaveImageWTxt": "🧵 Save Image with Caption",
     "PipemindTokenCounter": "🧵 Token Counter",
     "PipemindShowText": "🧵 Show Text",
@@ -7,10 +7,44 @@ It presents a user-friendly dropdown interface for directory selection.
 """
 
 import os
-from PIL import Image, ImageOps  # Pillow for image processing
-import numpy as np              # NumPy for array operations
+import json
 import torch                    # PyTorch for tensor manipulation
 
+try:
+    from .pipemind_image_catalog import (
+        CAPTION_EXTENSIONS, DEFAULT_IGNORE_GLOBS, ORIENTATION_FILTERS, SCAN_EXECUTORS, SORT_KEYS,
+        VALIDATION_POLICIES, ImageSelection, comfy_progress, get_catalog, parse_globs,
+    )
+    from .pipemind_image_cache import DEFAULT_CACHE_MB, get_disk_cache, get_tensor_cache
+    from .pipemind_image_decode import (
+        BATCH_FIT_POLICIES, ImagePrefetcher, array2tensor, decode_many, decode_with_fallback,
+        get_buffer_pool, iter_decoded, load_frames, open_pixels, stack_images,
+    )
+    from .pipemind_image_cursor import (
+        CURSOR_MODES, DEFAULT_LEASE_SECONDS, get_shared_cursor, worker_id,
+    )
+    from .pipemind_image_buckets import BUCKET_FAMILIES, plan_buckets
+    from .pipemind_image_metadata import compile_text_filter
+    from .pipemind_image_order import IndexPermutation
+    from .pipemind_image_thumbnails import THUMBNAIL_SIZE, get_thumbnail_cache, register_root
+except ImportError:
+    from pipemind_image_catalog import (
+        CAPTION_EXTENSIONS, DEFAULT_IGNORE_GLOBS, ORIENTATION_FILTERS, SCAN_EXECUTORS, SORT_KEYS,
+        VALIDATION_POLICIES, ImageSelection, comfy_progress, get_catalog, parse_globs,
+    )
+    from pipemind_image_cache import DEFAULT_CACHE_MB, get_disk_cache, get_tensor_cache
+    from pipemind_image_decode import (
+        BATCH_FIT_POLICIES, ImagePrefetcher, array2tensor, decode_many, decode_with_fallback,
+        get_buffer_pool, iter_decoded, load_frames, open_pixels, stack_images,
+    )
+    from pipemind_image_cursor import (
+        CURSOR_MODES, DEFAULT_LEASE_SECONDS, get_shared_cursor, worker_id,
+    )
+    from pipemind_image_buckets import BUCKET_FAMILIES, plan_buckets
+    from pipemind_image_metadata import compile_text_filter
+    from pipemind_image_order import IndexPermutation
+    from pipemind_image_thumbnails import THUMBNAIL_SIZE, get_thumbnail_cache, register_root
+
 # Define paths to standard ComfyUI directories
 # These are used to provide easy access to input and output folders
 COMFY_INPUT_DIR = os.path.abspath(
@@ -21,34 +55,6 @@ COMFY_OUTPUT_DIR = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "..", "..", "output")
 )
 
-def pil2tensor(image):
-    """
-    Convert PIL image to tensor in the format ComfyUI expects.
-    
-    ComfyUI expects images as PyTorch tensors in NCHW format (batch, channels, height, width)
-    with normalized float values between 0.0 and 1.0.
-    
-    Args:
-        image: PIL Image object
-        
-    Returns:
-        torch.Tensor: Image as tensor in NCHW format with values normalized to [0.0, 1.0]
-    """
-    # Convert PIL image to numpy array and normalize to float32 in range [0.0, 1.0]
-    image = np.array(image).astype(np.float32) / 255.0
-    
-    # Convert to tensor and add batch dimension
-    image = torch.from_numpy(image)[None,]
-    
-    # If the tensor has 3 dimensions (batch, height, width, channels), 
-    # rearrange to (batch, channels, height, width)
-    if len(image.shape) == 4:  # Already in BCHW format
-        return image
-    elif len(image.shape) == 3:  # In HWC format (height, width, channels)
-        return image.permute(0, 3, 1, 2)
-    else:
-        raise ValueError(f"Unexpected tensor shape: {image.shape}")
-
 
 def create_empty_image(width=64, height=64):
     """
@@ -61,96 +67,85 @@ def create_empty_image(width=64, height=64):
     return torch.zeros((1, 3, width, height), dtype=torch.float32)
 
 
-def validate_image(image_path):
-    """
-    Validate if a file is a valid, uncorrupted image that can be opened by PIL.
-    
-    Args:
-        image_path: Path to the image file to validate
-        
-    Returns:
-        bool: True if the image is valid, False otherwise
-    """
-    try:
-        # Try to open and verify the image without fully loading it into memory
-        with Image.open(image_path) as img:
-            img.verify()
-        
-        # If the above didn't raise an exception, try actually loading the image
-        # (some issues only appear when fully loading)
-        with Image.open(image_path) as img:
-            img.load()
-            
-        return True
-    except Exception as e:
-        print(f"Invalid image {image_path}: {e}")
-        return False
-
-
-def list_image_directories(base_dir):
+def list_image_directories(base_dir, root_label='[Root Output Directory]'):
     """
     Get a list of directories in the base_dir that contain images.
     
     This function is used to populate the directory dropdown in the UI.
     It filters out directories that don't contain any valid images.
+    Tar and zip shards are listed after the directories, so a shard can be
+    selected as a source without unpacking it.
     
     Args:
         base_dir: Base directory to search for image-containing subdirectories
+        root_label: Dropdown entry standing for base_dir itself
         
     Returns:
-        list: Sorted list of directories (relative to base_dir) containing images
+        list: Sorted list of directories (relative to base_dir) containing images,
+            followed by the sorted list of archives
     """
     # Check if the base directory exists
     if not os.path.exists(base_dir):
         print(f"Base directory does not exist: {base_dir}")
         return []
     
-    # Define allowed image file extensions
-    allowed_extensions = {'.png', '.jpg', '.jpeg', '.gif', '.webp'}
-    
     # Track which directories contain images
     dirs_with_images = set()
     
-    # Walk the directory tree
-    for root, dirs, files in os.walk(base_dir):
-        # Check if any files in this directory are images
-        has_images = any(
-            any(file.lower().endswith(ext) for ext in allowed_extensions)
-            for file in files
-        )
+    # Ask the shared catalog which directories directly contain images.
+    # Directory listings are cached against their mtime, so unchanged folders
+    # are not re-listed every time the dropdown is built.
+    for rel_path in get_catalog().list_image_directories(base_dir):
+        # Add this directory and all its parent directories
+        # This ensures that even if a parent doesn't directly contain images,
+        # it will be shown if any of its children contain images
+        current_path = rel_path
+        while current_path:
+            dirs_with_images.add(current_path)
+            # Move up one directory level
+            current_path = os.path.dirname(current_path)
         
-        # If this directory has images, add it to our set
-        if has_images:
-            # Calculate the relative path from base_dir
-            rel_path = os.path.relpath(root, base_dir)
-            # Replace backslashes with forward slashes for cross-platform compatibility
-            rel_path = rel_path.replace('\\', '/')
-            # Don't include the root directory as "."
-            if rel_path == '.':
-                rel_path = ''
-            
-            # Add this directory and all its parent directories
-            # This ensures that even if a parent doesn't directly contain images,
-            # it will be shown if any of its children contain images
-            current_path = rel_path
-            while current_path:
-                dirs_with_images.add(current_path)
-                # Move up one directory level
-                current_path = os.path.dirname(current_path)
-            
-            # Also add the empty string to represent the root directory
-            dirs_with_images.add('')
+        # Also add the empty string to represent the root directory
+        dirs_with_images.add('')
     
     # Convert the set to a sorted list
     result = sorted(dirs_with_images)
     
     # If the root directory was added (as ''), replace it with a more user-friendly name
     if '' in result:
-        result[result.index('')] = '[Root Output Directory]'
+        result[result.index('')] = root_label
+    
+    # Archive shards are sources too; their members are read in place
+    result.extend(get_catalog().list_archives(base_dir))
     
     return result
 
 
+def listing_source(directory, validation, max_depth, ignore_globs, text_filter, selection):
+    """
+    Name a listing by every input that decides which images it holds and in which order.
+    
+    Listings with the same name hold the same images, so the shuffled order and
+    the shared cursor start over whenever the name changes.
+    
+    Args:
+        directory: The selected directory, relative to the base folder
+        validation: Validation policy (invalid images are left out)
+        max_depth: Subfolder levels included
+        ignore_globs: Comma-separated folder name globs skipped
+        text_filter: Metadata filter expression
+        selection: ImageSelection with the sort order and the header filters
+        
+    Returns:
+        str: The same string on every worker listing the same images
+    """
+    return (
+        f"{directory}?validation={validation}&max_depth={max_depth}"
+        f"&ignore_globs={parse_globs(ignore_globs)}&filter={text_filter}"
+        f"&selection={tuple(selection)}"
+    )
+
+
 class BatchImageLoadOutput:
     """
     ComfyUI custom node for loading images in batch from directories.
@@ -158,10 +153,19 @@ class BatchImageLoadOutput:
     This node allows users to:
     1. Choose a specific directory from a dropdown of directories in the output folder
     2. Load images in either "single" mode (selecting by index) or "sequential" mode (advancing automatically)
+    3. Load a range of images at once in "batch" mode, stacked into a single IMAGE batch
+    4. Load the frames of an animated GIF/WebP in "frames" mode, as a single IMAGE batch
+    5. Load uniform batches bucket by bucket in "bucketed" mode (see bucket_plan)
     
     The node maintains state between executions to support sequential loading.
+    
+    The directory is relative to get_base_dir(), the ComfyUI output folder;
+    BatchImageLoadInput only overrides the base folder and its root label.
     """
     
+    # Dropdown entry standing for the base folder itself
+    ROOT_LABEL = '[Root Output Directory]'
+    
     def __init__(self):
         """
         Initialize the BatchImageLoad node with empty state.
@@ -170,10 +174,35 @@ class BatchImageLoadOutput:
         - current_index: Tracks the currently selected image index for sequential loading
         - image_files: Caches the list of valid image files in the selected directory
         - total_files: Caches the total number of valid images found
+        - prefetcher: Decodes the next images ahead of time in sequential mode
+        - decode_size: (max_side, target_width, target_height) used when decoding
+        - disk_cache: Whether decoded images are persisted as memory-mapped .npy files
+        - shuffle_epoch, shuffle_position: Progress through shuffled mode
+        - shuffle_files: The listing the current shuffled epoch is an order of
+        - shuffle_source: (listing_source, seed) the shuffle progress belongs to
+        - shared_claim: (directory, index) last claimed from the shared cursor
+        - bucket_source, bucket_batches, bucket_counter: the per-bucket batches
+          of bucketed mode, what they were planned from and the batch position
         """
         self.current_index = 0    # Index of the current image in sequential mode
         self.image_files = []     # Cache of valid image files in the selected directory  
         self.total_files = 0      # Total number of valid images in the selected directory
+        self.prefetcher = ImagePrefetcher(self.decode_image)  # Sequential read-ahead
+        self.decode_size = (0, 0, 0)  # Reduced-resolution decode limits (0 = off)
+        self.disk_cache = False   # Persistent .npy cache of decoded images (opt-in)
+        self.shuffle_epoch = 0    # Epoch of shuffled mode
+        self.shuffle_position = 0  # Next position within the shuffled epoch
+        self.shuffle_files = []   # Listing at the start of the shuffled epoch
+        self.shuffle_source = None  # Listing and seed of the current shuffle
+        self.shared_claim = None  # Last index claimed from the shared cursor
+        self.bucket_source = None  # Family, batch size and listing the bucket batches belong to
+        self.bucket_batches = []  # ((width, height), [paths]) batches of bucketed mode
+        self.bucket_counter = 0   # Running batch position across epochs in bucketed mode
+    
+    @classmethod
+    def get_base_dir(cls):
+        """Return the folder the directory input is relative to."""
+        return COMFY_OUTPUT_DIR
 
     @classmethod
     def INPUT_TYPES(cls):
@@ -181,27 +210,35 @@ class BatchImageLoadOutput:
         Define the input UI elements for the BatchImageLoad node.
         
         This method is called by ComfyUI to determine what inputs to show in the node's UI.
-        The method populates the directory dropdown with directories from the output folder.
+        The method populates the directory dropdown with directories from the
+        base folder (get_base_dir).
     
         Returns:
             dict: Dictionary defining all the input fields and their properties
         """
-        # Get list of all directories from the output folder
-        output_dirs = list_image_directories(COMFY_OUTPUT_DIR)
+        # Get list of all directories from the base folder
+        base_dirs = list_image_directories(cls.get_base_dir(), cls.ROOT_LABEL)
     
         # Provide placeholder if no directories are found
-        if not output_dirs:
-            output_dirs = ["[No directories found]"]
+        if not base_dirs:
+            base_dirs = ["[No directories found]"]
     
         return {
             "required": {
-                # Directory dropdown: shows directories from the output folder
-                "directory": (output_dirs,),
+                # Directory dropdown: shows directories from the base folder
+                "directory": (base_dirs,),
     
                 # Mode selection:
                 # - "single": Load a specific image by index
                 # - "sequential": Load images in sequence, advancing each time the node is executed
-                "mode": (["single", "sequential"],),
+                # - "shuffled": Visit every image once per epoch in a seeded random order
+                # - "batch": Load batch_count images starting at image_index as one stacked batch
+                # - "frames": Load frames of the animated image at image_index as one batch
+                # - "bucketed": Load batches of images sharing an aspect ratio bucket
+                # - "preview": Return the cached thumbnail of the image at image_index
+                "mode": ([
+                    "single", "sequential", "shuffled", "batch", "frames", "bucketed", "preview",
+                ],),
     
                 # Image index selection: used in "single" mode to select a specific image
                 "image_index": ("INT", {
@@ -209,12 +246,217 @@ class BatchImageLoadOutput:
                     "min": 0,
                     "max": 1000000,  # Large max value to accommodate directories with many images
                 }),
+            },
+            "optional": {
+                # Validation policy used while listing the directory:
+                # - "full-on-select": read headers only, fully decode just the picked image
+                # - "header": check the file signature and size
+                # - "verify": header plus PIL's integrity check
+                # - "none": trust the file extension (one stat per file)
+                "validation": (VALIDATION_POLICIES, {
+                    "default": "full-on-select",
+                    "tooltip": "How thoroughly images are checked while listing the directory.",
+                }),
+                # Worker pool used when new or changed images need to be checked
+                # (0 = one worker per CPU, 1 = check on the executor thread)
+                "scan_workers": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 256,
+                    "tooltip": "Workers used to check new or changed images (0 = one per CPU).",
+                }),
+                "scan_executor": (SCAN_EXECUTORS, {
+                    "default": "threads",
+                    "tooltip": "Run scan workers as threads or separate processes.",
+                }),
+                # Folder walking: depth limit and extra folders to prune
+                "max_depth": ("INT", {
+                    "default": -1,
+                    "min": -1,
+                    "max": 64,
+                    "tooltip": "Subfolder levels to include below the directory (-1 = all).",
+                }),
+                "ignore_globs": ("STRING", {
+                    "default": "",
+                    "tooltip": "Comma-separated folder name globs to skip; hidden folders always are.",
+                }),
+                # Metadata filter on the PNG text chunks (prompt, workflow), applied
+                # before an image is picked: plain text, "re:<pattern>" or a JSON
+                # path such as "$.prompt.*.inputs.text ~ castle"
+                "filter": ("STRING", {
+                    "default": "",
+                    "tooltip": "Only keep PNGs whose metadata contains this text; "
+                               "'re:' for a regex, '$.prompt.*.inputs.text ~ x' for a JSON path.",
+                }),
+                # Order and header-based filters, computed from the catalog's stat and
+                # header data without opening images; the order is reused until the
+                # directory changes. Dimension limits of 0 are off.
+                "sort": (SORT_KEYS, {
+                    "default": "path",
+                    "tooltip": "Order of the images: path, natural name, mtime, size, pixel count "
+                               "or aspect ratio.",
+                }),
+                "sort_descending": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Reverse the sort order (e.g. newest or largest first).",
+                }),
+                "min_width": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "tooltip": "Skip images narrower than this (0 = no limit).",
+                }),
+                "min_height": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "tooltip": "Skip images lower than this (0 = no limit).",
+                }),
+                "max_width": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "tooltip": "Skip images wider than this (0 = no limit).",
+                }),
+                "max_height": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "tooltip": "Skip images higher than this (0 = no limit).",
+                }),
+                "orientation": (ORIENTATION_FILTERS, {
+                    "default": "any",
+                    "tooltip": "Only keep landscape, portrait or square images.",
+                }),
+                "name_glob": ("STRING", {
+                    "default": "",
+                    "tooltip": "Comma-separated file name globs to keep, e.g. 'img_*.png'.",
+                }),
+                # Caption sidecar paired with each image (name.png + name.txt, as
+                # written by PipemindSaveImageWTxt); name.json is read as metadata
+                "caption_extension": (CAPTION_EXTENSIONS, {
+                    "default": ".txt",
+                    "tooltip": "Extension of the caption file saved next to each image.",
+                }),
+                # Shared cursor: several ComfyUI instances on the same folder
+                # each claim the next image instead of all processing the same ones
+                "cursor": (CURSOR_MODES, {
+                    "default": "local",
+                    "tooltip": "Sequential position kept per node, or claimed from a database "
+                               "in the base folder shared by several ComfyUI instances.",
+                }),
+                "lease_seconds": ("INT", {
+                    "default": DEFAULT_LEASE_SECONDS,
+                    "min": 1,
+                    "max": 604800,
+                    "tooltip": "How long a shared claim is kept before another worker may take it.",
+                }),
+                # Seed of the visiting order in shuffled mode; every epoch uses
+                # a different order derived from it
+                "shuffle_seed": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 0xffffffffffffffff,
+                    "tooltip": "Seed of the per-epoch visiting order in shuffled mode.",
+                }),
+                # Read-ahead depth for sequential mode (0 disables prefetching)
+                "prefetch": ("INT", {
+                    "default": 2,
+                    "min": 0,
+                    "max": 16,
+                    "tooltip": "Images decoded ahead on a background thread in sequential mode.",
+                }),
+                # Memory budget of the decoded-image cache shared by all loader nodes
+                "cache_mb": ("INT", {
+                    "default": DEFAULT_CACHE_MB,
+                    "min": 0,
+                    "max": 65536,
+                    "tooltip": "Decoded image cache budget in MB, shared by all loaders (0 = off).",
+                }),
+                "cache_uint8": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "Keep cached images as uint8 (4x smaller) and convert on hand-off.",
+                }),
+                # Persist decoded pixels on disk so later runs memory-map them
+                # instead of decoding the source files again
+                "disk_cache": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Persist decoded images as memory-mapped .npy files for later runs.",
+                }),
+                # Batch mode: load `batch_count` images starting at image_index,
+                # taking every `batch_step`-th image, and stack them into one tensor
+                "batch_count": ("INT", {
+                    "default": 16,
+                    "min": 1,
+                    "max": 4096,
+                    "tooltip": "Number of images stacked into one batch in batch mode.",
+                }),
+                "batch_step": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 1000000,
+                    "tooltip": "Stride between the indices loaded in batch mode.",
+                }),
+                "batch_fit": (BATCH_FIT_POLICIES, {
+                    "default": "resize",
+                    "tooltip": "How images of a different size are fitted to the first image.",
+                }),
+                # Bucketed mode: model family whose preset resolutions are the buckets
+                "bucket_family": (list(BUCKET_FAMILIES), {
+                    "default": "flux",
+                    "tooltip": "Preset resolutions images are bucketed into in bucketed mode.",
+                }),
+                # Frames mode: frames of the animated GIF/WebP/PNG at image_index,
+                # from frame_start every frame_step, at most max_frames of them
+                "frame_start": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 1000000,
+                    "tooltip": "First animation frame loaded in frames mode.",
+                }),
+                "frame_step": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 10000,
+                    "tooltip": "Stride between the animation frames loaded in frames mode.",
+                }),
+                "max_frames": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 100000,
+                    "tooltip": "Maximum number of frames loaded in frames mode (0 = all).",
+                }),
+                # Reduced-resolution decode: JPEG draft mode and Image.reduce shrink
+                # the image while decoding, before any float conversion (0 = off)
+                "max_side": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "tooltip": "Decode at reduced scale so the longest side fits (0 = full size).",
+                }),
+                "target_width": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "tooltip": "Decode at reduced scale so the width fits (0 = unconstrained).",
+                }),
+                "target_height": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "tooltip": "Decode at reduced scale so the height fits (0 = unconstrained).",
+                }),
             }
         }
 
     # Define the output types and names
-    RETURN_TYPES = ("IMAGE", "INT", "INT")
-    RETURN_NAMES = ("image", "image_count", "current_index")
+    # epoch and position report progress through shuffled mode
+    # (other modes report epoch 0 and the selected index as position);
+    # caption and metadata come from the sidecar files of the loaded image(s)
+    RETURN_TYPES = ("IMAGE", "INT", "INT", "INT", "INT", "STRING", "STRING")
+    RETURN_NAMES = (
+        "image", "image_count", "current_index", "epoch", "position", "caption", "metadata",
+    )
     
     # The function that will be called to process the inputs
     FUNCTION = "load_image"
@@ -222,7 +464,9 @@ class BatchImageLoadOutput:
     # The category this node will appear in within the ComfyUI interface
     CATEGORY = "Pipemind"
 
-    def get_image_files(self, directory):
+    def get_image_files(self, directory, validation="full-on-select", workers=0,
+                        executor="threads", max_depth=-1, ignore_globs="", text_filter="",
+                        selection=None, show_progress=True):
         """
         Get a list of valid image files from a directory or file path.
         
@@ -232,63 +476,506 @@ class BatchImageLoadOutput:
         
         Each image is validated to ensure it can be properly loaded, helping to
         avoid runtime errors when processing corrupted or incompatible files.
+        Validation results are kept in the shared image catalog, so only files
+        whose (size, mtime) changed since the last scan are validated again.
         
         Args:
             directory: Path to a directory or an image file
+            validation: Validation policy (see VALIDATION_POLICIES)
+            workers: Scan pool size for new or changed images (0 = one per CPU)
+            executor: "threads" or "processes"
+            max_depth: Subfolder levels to include (-1 = unlimited)
+            ignore_globs: Comma-separated folder name globs to skip, on top of
+                hidden folders and DEFAULT_IGNORE_GLOBS
+            text_filter: Metadata filter expression (see compile_text_filter);
+                empty keeps every image
+            selection: ImageSelection with the sort order and the dimension,
+                orientation and file name filters (default: every image by path)
+            show_progress: Drive the ComfyUI progress bar (off outside executions)
             
         Returns:
             list: Sorted list of valid image file paths
         """
-        image_files = []
-        # Define allowed image file extensions
-        allowed_extensions = {'.png', '.jpg', '.jpeg', '.gif', '.webp'}
-    
-        # Case 1: directory is actually a file path
-        if os.path.isfile(directory):
-            # Check if it's an image file with allowed extension
-            if any(directory.lower().endswith(ext) for ext in allowed_extensions):
-                # Validate that the image is not corrupted
-                if validate_image(directory):
-                    image_files = [directory]
-        # Case 2: directory is a directory path
+        image_files = get_catalog().get_image_files(
+            directory, validation, workers, executor,
+            progress=comfy_progress() if show_progress else None,
+            max_depth=max_depth, ignore_globs=DEFAULT_IGNORE_GLOBS + parse_globs(ignore_globs),
+            selection=selection,
+        )
+
+        # Narrow the listing down by metadata before any index is applied to it
+        predicate = compile_text_filter(text_filter)
+        if predicate is None:
+            return image_files
+        return get_catalog().filter_images(image_files, predicate, workers)
+
+    @classmethod
+    def list_preview_images(cls, full_path, listing):
+        """
+        List full_path for the thumbnail route like load_image would.
+        
+        The listing inputs go through the same ImageSelection and get_image_files
+        as in load_image, so an image_index picks the same image in both.
+        
+        Args:
+            full_path: Folder to list
+            listing: The node's listing inputs by name, as strings from the
+                route's query (missing inputs use their defaults)
+            
+        Raises:
+            ValueError: For malformed numbers
+        """
+        def number(name, default):
+            return int(listing.get(name, default))
+        
+        selection = ImageSelection(
+            listing.get("sort", "path"),
+            listing.get("sort_descending", "false").lower() == "true",
+            number("min_width", 0), number("min_height", 0),
+            number("max_width", 0), number("max_height", 0),
+            listing.get("orientation", "any"), parse_globs(listing.get("name_glob", "")),
+        )
+        return cls().get_image_files(
+            full_path, listing.get("validation", "full-on-select"),
+            max_depth=number("max_depth", -1), ignore_globs=listing.get("ignore_globs", ""),
+            text_filter=listing.get("filter", ""), selection=selection, show_progress=False,
+        )
+
+    def load_sidecars(self, paths, caption_extension=".txt", workers=0):
+        """
+        Get the caption and JSON metadata saved next to the loaded images.
+        
+        The sidecars are paired with the images through the catalog, which
+        records them while listing the directory, so no file is probed per
+        run; their content is read once and kept until the file changes.
+        Images without a sidecar get an empty caption and {} as metadata.
+        
+        Args:
+            paths: Paths of the loaded images, in batch order
+            caption_extension: Extension of the caption files (see CAPTION_EXTENSIONS)
+            workers: Pool size for sidecars that still need reading (0 = one per CPU)
+            
+        Returns:
+            tuple: (caption, metadata_json); for a batch of several images the
+            captions are joined one per line and the metadata is a JSON list,
+            so line i and list entry i belong to image i of the batch (an
+            image without a caption gives an empty line)
+        """
+        sidecars = get_catalog().get_sidecars(paths, caption_extension, workers)
+        if len(paths) == 1:
+            caption, metadata = sidecars[paths[0]]
+            return caption, json.dumps(metadata)
+        # Empty captions are kept as empty lines so the lines stay paired with the images
+        return (
+            "\n".join(sidecars[path][0] for path in paths),
+            json.dumps([sidecars[path][1] for path in paths]),
+        )
+
+    def decode_mode(self):
+        """
+        Describe the current decoding variant for cache keys.
+        
+        Images decoded with different reduced-resolution limits are different
+        cache entries, so the limits in decode_size are part of the mode.
+        
+        Returns:
+            str: The target mode, e.g. "RGB@0:0x0" for full-size RGB
+        """
+        max_side, target_width, target_height = self.decode_size
+        return f"RGB@{max_side}:{target_width}x{target_height}"
+
+    def decode_pixels(self, image_path):
+        """
+        Decode an image file into uint8 RGB pixels.
+        
+        The image is fully decoded, EXIF orientation is applied and it is
+        converted to RGB. With disk_cache enabled the pixels are stored once as
+        a .npy file; later calls memory-map that file as long as the source
+        file's mtime and size are unchanged, skipping decoding entirely.
+        
+        Args:
+            image_path: Path to the image file
+            
+        Returns:
+            numpy.ndarray: HxWx3 uint8 array (memory-mapped on a disk cache hit)
+        """
+        def decode(path):
+            return open_pixels(path, *self.decode_size)
+
+        # Fall back to plain decoding if the cache folder cannot be created
+        disk_cache = get_disk_cache() if self.disk_cache else None
+        if disk_cache is None:
+            return decode(image_path)
+        return disk_cache.load(image_path, decode, self.decode_mode())
+
+    def decode_image(self, image_path, pool=None):
+        """
+        Decode an image file into the tensor returned by the node.
+        
+        The pixels come from decode_pixels and are turned into a tensor in the
+        format ComfyUI expects. This is also what the prefetcher runs on its
+        background thread.
+        
+        Decoded images are kept in the shared LRU cache, keyed by path, mtime,
+        size and target mode, so re-selecting an image skips disk I/O and decoding.
+        The target mode includes the reduced-resolution limits in decode_size.
+        The cache keeps its own copy, so the returned tensor belongs to the caller.
+        
+        Args:
+            image_path: Path to the image file
+            pool: Optional TensorBufferPool to decode into, for tensors the
+                caller releases again (never for tensors returned to ComfyUI)
+            
+        Returns:
+            torch.Tensor: The decoded image tensor
+        """
+        return get_tensor_cache().load(
+            image_path,
+            lambda path: array2tensor(self.decode_pixels(path), pool),
+            target_mode=self.decode_mode(),
+        )
+
+    def decode_stacked(self, paths, fit, size=None):
+        """
+        Decode images in parallel and stack them into one batch.
+        
+        The per-image tensors are only needed until they are copied into the
+        batch, so they are decoded into buffers of the shared TensorBufferPool
+        and released right after, for the next batch to reuse. Images that
+        fail to decode are marked invalid and left out of the batch.
+        
+        Args:
+            paths: Image paths to load
+            fit: How images of a different size are fitted (see BATCH_FIT_POLICIES)
+            size: Optional (width, height) of the batch instead of the first image's
+            
+        Returns:
+            tuple: (batch, loaded_paths), or (None, []) if no image could be decoded
+        """
+        pool = get_buffer_pool()
+        images = decode_many(
+            paths, lambda path: self.decode_image(path, pool), get_catalog().mark_invalid
+        )
+        loaded = [path for path, image in zip(paths, images) if image is not None]
+        images = [image for image in images if image is not None]
+        if not images:
+            return None, []
+    
+        batch = stack_images(images, fit, size)
+        for image in images:
+            pool.release(image)
+        return batch, loaded
+
+    def load_preview(self, index):
+        """
+        Return the thumbnail of the image at index instead of decoding it fully.
+        
+        Thumbnails come from the shared on-disk cache (see ThumbnailCache).
+        The thumbnails of the images after index, and then of the rest of the
+        listing, are built on a background thread, so stepping through the
+        folder finds them ready. If the picked image turns out to be corrupt,
+        it is marked invalid and the next image is previewed instead.
+        
+        Args:
+            index: Index of the image to preview
+            
+        Returns:
+            tuple: (previewed_index, thumbnail_tensor)
+        """
+        thumbnails = get_thumbnail_cache()
+        if thumbnails is None:
+            # No writable cache folder: decode a reduced image every time
+            def preview(path):
+                return array2tensor(open_pixels(path, THUMBNAIL_SIZE))
         else:
+            thumbnails.schedule(self.image_files[index + 1:] + self.image_files[:index])
+    
+            def preview(path):
+                return array2tensor(thumbnails.load(path))
+    
+        return decode_with_fallback(self.image_files, index, get_catalog().mark_invalid, preview)
+
+    def shuffled_path(self, files, seed, epoch, position):
+        """
+        Return the image visited at a position of a shuffled epoch.
+        
+        Each epoch's order is an IndexPermutation of (seed, epoch), computed on
+        demand, so no shuffled list has to be built or stored even for
+        millions of files.
+        
+        Args:
+            files: The listing the epoch is an order of
+            seed: The shuffle seed
+            epoch: The epoch number
+            position: Position within the epoch
+            
+        Returns:
+            str: Path of the image
+        """
+        return files[IndexPermutation(len(files), seed, epoch)[position]]
+
+    def next_shuffled(self, seed, decode):
+        """
+        Decode the image at the next position of the shuffled order.
+        
+        An epoch is an order of the listing as it was when the epoch started
+        (shuffle_files), so images that are added, removed or marked invalid
+        meanwhile cannot shift the rest of the epoch: removed images are
+        skipped and new ones join in the next epoch. Images that fail to
+        decode are marked invalid and the next shuffled position is used.
+        
+        Args:
+            seed: The shuffle seed
+            decode: Function turning a path into the image tensor
+            
+        Returns:
+            tuple: (image_index, epoch, position, image_tensor)
+        """
+        listed = {path: index for index, path in enumerate(self.image_files)}
+    
+        # At most the rest of this epoch and one whole new epoch
+        for _ in range(len(self.shuffle_files) + self.total_files):
+            if self.shuffle_position >= len(self.shuffle_files):
+                # A new epoch orders the listing as it is now
+                self.shuffle_epoch += 1
+                self.shuffle_position = 0
+                self.shuffle_files = self.image_files
+    
+            epoch, position = self.shuffle_epoch, self.shuffle_position
+            path = self.shuffled_path(self.shuffle_files, seed, epoch, position)
+            self.shuffle_position += 1
+            if path not in listed:
+                # Removed or marked invalid since the epoch started
+                continue
             try:
-                # Walk the directory recursively
-                for root, _, files in os.walk(directory):
-                    for file in files:
-                        # Build full path to the file
-                        file_path = os.path.join(root, file)
-                        # Check if it's an image file with allowed extension
-                        if any(file.lower().endswith(ext) for ext in allowed_extensions):
-                            # Validate that the image is not corrupted
-                            if validate_image(file_path):
-                                image_files.append(file_path)
+                return listed[path], epoch, position, decode(path)
             except Exception as e:
-                print(f"Error walking directory {directory}: {e}")
+                print(f"Skipping invalid image {path}: {e}")
+                get_catalog().mark_invalid(path)
     
-        # Return sorted list for consistent order of images
-        return sorted(image_files)
+        raise ValueError("None of the images could be decoded")
+
+    def upcoming_shuffled(self, seed, count):
+        """
+        Return the paths of the next count positions of the shuffled order.
+        
+        Positions past the end of the epoch continue in the next epoch, which
+        will order the current listing.
+        """
+        epoch, position, files = self.shuffle_epoch, self.shuffle_position, self.shuffle_files
+        paths = []
+        while len(paths) < count:
+            if position >= len(files):
+                epoch, position, files = epoch + 1, 0, self.image_files
+            paths.append(self.shuffled_path(files, seed, epoch, position))
+            position += 1
+        return paths
 
-    def load_image(self, directory: str, mode: str, image_index: int):
+    def claim_next(self, base_dir, full_path, source, lease_seconds):
+        """
+        Claim the next image from the shared cursor and decode it.
+        
+        The cursor database lives in the base folder, so every ComfyUI
+        instance using the same (network) folder draws from one position.
+        Images are claimed by their path relative to full_path, since the
+        listings of the workers can differ (see SharedCursor). Claiming the
+        next image completes this node's previous claim; if this worker
+        crashes, the lease on its claim expires and another worker takes the
+        image over. Images that fail to decode are marked invalid and the next
+        image is claimed instead.
+        
+        Args:
+            base_dir: Shared base folder holding the cursor database
+            full_path: The listed folder (or archive) the paths are relative to
+            source: Name of the listing, identical on every worker (see listing_source)
+            lease_seconds: How long the claim is reserved for this worker
+            
+        Returns:
+            tuple: (image_index, epoch, image_tensor)
+        """
+        shared_cursor = get_shared_cursor(base_dir)
+        worker = worker_id(self)
+        # "/" separated, so workers on other operating systems use the same names
+        root = full_path if os.path.isdir(full_path) else os.path.dirname(full_path)
+        paths = [os.path.relpath(path, root).replace(os.sep, "/") for path in self.image_files]
+    
+        for _ in range(self.total_files):
+            # The previous claim is finished now that the next image is needed
+            release = None
+            if self.shared_claim is not None:
+                if self.shared_claim[0] == source:
+                    release = self.shared_claim[1]
+                else:
+                    shared_cursor.complete(*self.shared_claim, worker)
+    
+            index, epoch = shared_cursor.claim(source, paths, worker, lease_seconds, release)
+            self.shared_claim = (source, paths[index])
+            try:
+                return index, epoch, self.decode_image(self.image_files[index])
+            except Exception as e:
+                print(f"Skipping unreadable image {self.image_files[index]}: {e}")
+                get_catalog().mark_invalid(self.image_files[index])
+    
+        raise ValueError("None of the claimed images could be decoded")
+
+    def load_batch(self, start, count, step, fit):
+        """
+        Load several images in one execution and stack them into a single batch.
+        
+        The images are decoded in parallel (through the shared image cache, see
+        decode_stacked). Images that fail to decode are marked invalid and left
+        out of the batch.
+        
+        Args:
+            start: Index of the first image
+            count: Maximum number of images to load
+            step: Stride between the loaded indices
+            fit: How images of a different size are fitted (see BATCH_FIT_POLICIES)
+            
+        Returns:
+            tuple: (batch, loaded_paths), a (N, H, W, C) batch with the size of
+            the first image and the paths of the images it holds
+        """
+        paths = self.image_files[start:start + count * step:step]
+        print(f"Loading batch of {len(paths)} images from index {start} (step {step})")
+    
+        batch, loaded = self.decode_stacked(paths, fit)
+        if batch is None:
+            raise ValueError("None of the images in the batch could be decoded")
+        return batch, loaded
+
+    def bucket_plan(self, family, workers=0):
+        """
+        Group the listed images by the nearest preset resolution of a model family.
+        
+        Only the image dimensions stored in the catalog are used, so no image is
+        decoded; images listed without reading their header are probed once.
+        
+        Args:
+            family: Model family (see BUCKET_FAMILIES)
+            workers: Pool size for images whose header still needs reading
+            
+        Returns:
+            list: ((width, height), [image paths]) per non-empty bucket
+        """
+        sizes = get_catalog().get_dimensions(self.image_files, workers)
+        listed = [path for path in self.image_files if path in sizes]
+        return [
+            (size, [listed[i] for i in group])
+            for size, group in plan_buckets([sizes[path] for path in listed], family)
+        ]
+
+    def plan_bucket_batches(self, family, batch_count, workers=0):
+        """
+        Split the bucket plan into batches of at most batch_count images.
+        
+        The plan is kept until the family, batch size or listing changes, which
+        also starts the batch position over at the first batch.
+        
+        Returns:
+            list: ((width, height), [image paths]) per batch, bucket by bucket
+        """
+        source = (family, batch_count, self.image_files)
+        if source != self.bucket_source:
+            self.bucket_batches = [
+                (size, paths[start:start + batch_count])
+                for size, paths in self.bucket_plan(family, workers)
+                for start in range(0, len(paths), batch_count)
+            ]
+            self.bucket_source = source
+            self.bucket_counter = 0
+        return self.bucket_batches
+
+    def load_bucket(self, paths, size, fit):
+        """
+        Load the images of one bucket batch, fitted to the bucket resolution.
+        
+        Args:
+            paths: Image paths of the batch
+            size: (width, height) of the bucket
+            fit: How images are fitted to the bucket (see BATCH_FIT_POLICIES)
+            
+        Returns:
+            tuple: (batch, loaded_paths), a (N, height, width, C) batch and the
+            paths of the images it holds
+        """
+        print(f"Loading bucket batch of {len(paths)} images at {size[0]}x{size[1]}")
+    
+        batch, loaded = self.decode_stacked(paths, fit, size)
+        if batch is None:
+            raise ValueError("None of the images in the bucket batch could be decoded")
+        return batch, loaded
+
+    def load_image(self, directory: str, mode: str, image_index: int,
+                   validation: str = "full-on-select", scan_workers: int = 0,
+                   scan_executor: str = "threads", prefetch: int = 2,
+                   cache_mb: int = DEFAULT_CACHE_MB, cache_uint8: bool = True,
+                   batch_count: int = 16, batch_step: int = 1, batch_fit: str = "resize",
+                   max_side: int = 0, target_width: int = 0, target_height: int = 0,
+                   disk_cache: bool = False, max_depth: int = -1, ignore_globs: str = "",
+                   shuffle_seed: int = 0, cursor: str = "local",
+                   lease_seconds: int = DEFAULT_LEASE_SECONDS, filter: str = "",
+                   sort: str = "path", sort_descending: bool = False,
+                   min_width: int = 0, min_height: int = 0, max_width: int = 0,
+                   max_height: int = 0, orientation: str = "any", name_glob: str = "",
+                   frame_start: int = 0, frame_step: int = 1, max_frames: int = 0,
+                   bucket_family: str = "flux", caption_extension: str = ".txt"):
         """
         Main processing function for the BatchImageLoad node.
         
         This method:
         1. Resolves the full path to the selected directory in the output folder
         2. Collects all valid images from that directory
-        3. Selects an image based on the mode (single or sequential)
-        4. Loads, processes, and returns the selected image as a tensor
+        3. Selects an image based on the mode (single, sequential or shuffled)
+        4. Loads, processes, and returns the selected image as a tensor,
+           together with its caption and JSON metadata sidecars
         
         Error handling is comprehensive to ensure the node doesn't crash the workflow
         when issues occur with directories or images.
         
         Args:
             directory: The relative path to the directory containing images
-            mode: Either "single" (select by index) or "sequential" (advance automatically)
+            mode: "single" (select by index), "sequential" (advance automatically),
+                "shuffled" (seeded random order, each image once per epoch)
+                "batch" (stack several images starting at image_index)
+                "frames" (frames of the animated image at image_index),
+                "bucketed" (batches of one aspect ratio bucket at a time) or
+                "preview" (thumbnail of the image at image_index)
             image_index: The index of the image to load in "single" mode
+            validation: How thoroughly images are checked while listing the directory
+            scan_workers: Worker pool size for checking new or changed images
+            scan_executor: Whether scan workers are threads or processes
+            prefetch: Number of images decoded ahead in sequential mode
+            cache_mb: Memory budget of the shared decoded-image cache (0 disables it)
+            cache_uint8: Store cached images as uint8 instead of float32
+            batch_count: Number of images loaded in batch mode
+            batch_step: Stride between the indices loaded in batch mode
+            batch_fit: How mixed image sizes are fitted in batch mode
+            frame_start: First animation frame loaded in frames mode
+            frame_step: Stride between the frames loaded in frames mode
+            max_frames: Maximum number of frames in frames mode (0 = all)
+            bucket_family: Model family whose presets are the buckets in bucketed mode
+            max_side: Longest side to decode at (0 = full resolution)
+            target_width: Width limit to decode at (0 = unconstrained)
+            target_height: Height limit to decode at (0 = unconstrained)
+            disk_cache: Persist decoded images as memory-mapped .npy files
+            max_depth: Subfolder levels to include (-1 = unlimited)
+            ignore_globs: Comma-separated folder name globs to skip
+            filter: Metadata filter on the PNG text chunks (empty = no filter)
+            sort: Order of the images (see SORT_KEYS)
+            sort_descending: Reverse the sort order
+            min_width, min_height: Smallest image size to keep (0 = no limit)
+            max_width, max_height: Largest image size to keep (0 = no limit)
+            orientation: "any", "landscape", "portrait" or "square"
+            name_glob: Comma-separated file name globs to keep (empty = all)
+            shuffle_seed: Seed of the visiting order in shuffled mode
+            cursor: "local" or "shared" position for sequential mode
+            lease_seconds: Lease duration of shared cursor claims
+            caption_extension: Extension of the caption files next to the images
             
         Returns:
-            tuple: (image_tensor, total_image_count, current_index)
+            tuple: (image_tensor, total_image_count, current_index, epoch, position,
+            caption, metadata_json)
         """
         try:
             # Reset cached files list to ensure we're working with current data
@@ -296,8 +983,8 @@ class BatchImageLoadOutput:
             self.image_files = []
             self.total_files = 0
             
-            # Step 1: Use the output directory as the base directory
-            base_dir = COMFY_OUTPUT_DIR
+            # Step 1: Use the node's base folder (input or output) as the base directory
+            base_dir = self.get_base_dir()
             # Combine the base directory with the selected relative directory
             full_path = os.path.join(base_dir, directory)
                 
@@ -305,16 +992,34 @@ class BatchImageLoadOutput:
             if not os.path.exists(full_path):
                 print(f"Path does not exist: {full_path}")
                 # Return a small empty image and zeros for counts on error
-                return (create_empty_image(), 0, 0)
+                return (create_empty_image(), 0, 0, 0, 0, "", "{}")
+    
+            # Apply the cache settings (the cache is shared by all loader nodes)
+            get_tensor_cache().configure(cache_mb * 1024 * 1024, cache_uint8)
     
-            # Step 2: Collect and validate all image files in the directory
-            self.image_files = self.get_image_files(full_path)
+            # Prefetched images were decoded with the old settings, so drop them on change
+            decode_size = (max_side, target_width, target_height)
+            if (decode_size, disk_cache) != (self.decode_size, self.disk_cache):
+                self.prefetcher.reset()
+                self.decode_size = decode_size
+                self.disk_cache = disk_cache
+    
+            # Step 2: Collect and validate all image files in the directory,
+            # filtered and ordered as selected
+            selection = ImageSelection(
+                sort, sort_descending, min_width, min_height, max_width, max_height,
+                orientation, parse_globs(name_glob),
+            )
+            self.image_files = self.get_image_files(
+                full_path, validation, scan_workers, scan_executor, max_depth, ignore_globs,
+                filter, selection,
+            )
             self.total_files = len(self.image_files)
     
             # If no valid images were found, return an empty image
             if self.total_files == 0:
                 print("No valid images found")
-                return (create_empty_image(), 0, 0)
+                return (create_empty_image(), 0, 0, 0, 0, "", "{}")
     
             # Ensure image_index is an integer and within valid range
             if isinstance(image_index, str):
@@ -324,42 +1029,149 @@ class BatchImageLoadOutput:
                     print(f"Warning: Invalid image_index value '{image_index}'. Using 0 instead.")
                     image_index = 0
             
+            # Batch mode loads a range of images in one go and leaves the
+            # sequential position untouched
+            if mode == "batch":
+                self.prefetcher.reset()
+                start = min(max(0, image_index), self.total_files - 1)
+                batch, loaded = self.load_batch(start, batch_count, batch_step, batch_fit)
+                return (batch, self.total_files, start, 0, start,
+                        *self.load_sidecars(loaded, caption_extension, scan_workers))
+
+            # Frames mode decodes frames of one (animated) image into a batch by
+            # seeking, holding only the requested frames in memory; position
+            # reports the first frame number
+            if mode == "frames":
+                self.prefetcher.reset()
+                selected_index = min(max(0, image_index), self.total_files - 1)
+                image_path = self.image_files[selected_index]
+                frames, indices, frame_count = load_frames(
+                    image_path, frame_start, frame_step, max_frames, *self.decode_size
+                )
+                print(f"Loading {len(indices)} of {frame_count} frames from {image_path}")
+                return (frames, self.total_files, selected_index, 0, indices[0],
+                        *self.load_sidecars([image_path], caption_extension))
+
+            # Preview mode returns a small cached thumbnail, so browsing a large
+            # folder by image_index does not decode full-resolution files
+            if mode == "preview":
+                self.prefetcher.reset()
+                selected_index, preview = self.load_preview(
+                    min(max(0, image_index), self.total_files - 1)
+                )
+                image_path = self.image_files[selected_index]
+                print(f"Previewing image {selected_index + 1}/{self.total_files}: {image_path}")
+                return (preview, self.total_files, selected_index, 0, selected_index,
+                        *self.load_sidecars([image_path], caption_extension))
+
+            # Bucketed mode walks the listing bucket by bucket: every batch holds
+            # images of one aspect ratio bucket, fitted to the bucket's resolution.
+            # position counts batches within the epoch.
+            if mode == "bucketed":
+                self.prefetcher.reset()
+                batches = self.plan_bucket_batches(bucket_family, batch_count, scan_workers)
+                if not batches:
+                    raise ValueError("None of the images has known dimensions")
+                epoch, position = divmod(self.bucket_counter, len(batches))
+                self.bucket_counter += 1
+                size, paths = batches[position]
+                batch, loaded = self.load_bucket(paths, size, batch_fit)
+                return (batch, self.total_files, self.image_files.index(paths[0]), epoch, position,
+                        *self.load_sidecars(loaded, caption_extension, scan_workers))
+            
+            # With the shared cursor, the next image is claimed from the database
+            # in the base folder, so every worker gets a different image
+            if mode == "sequential" and cursor == "shared":
+                self.prefetcher.reset()
+                # Workers only share a position when they list the same images
+                source = listing_source(
+                    directory, validation, max_depth, ignore_globs, filter, selection
+                )
+                selected_index, epoch, tensor_image = self.claim_next(
+                    base_dir, full_path, source, lease_seconds
+                )
+                print(f"Claimed image {selected_index + 1}/{self.total_files}: "
+                      f"{self.image_files[selected_index]}")
+                return (tensor_image, self.total_files, selected_index, epoch, selected_index,
+                        *self.load_sidecars([self.image_files[selected_index]], caption_extension))
+            
             # If this is the first run or directory has changed, initialize current_index with image_index
             if self.current_index >= self.total_files:
                 self.current_index = min(max(0, image_index), self.total_files - 1)
                 
             # Step 3: Select an image based on the operating mode
+            epoch = 0
             if mode == "sequential":
                 # In sequential mode, use the current index for this execution
                 selected_index = self.current_index
+                position = selected_index
                 # Advance the index for next time, wrapping around if needed
                 self.current_index = (self.current_index + 1) % self.total_files
+            elif mode == "shuffled":
+                # Selecting another listing (any listing input) or seed starts over at epoch 0
+                source = (
+                    listing_source(directory, validation, max_depth, ignore_globs, filter, selection),
+                    shuffle_seed,
+                )
+                if source != self.shuffle_source:
+                    self.shuffle_source = source
+                    self.shuffle_files = self.image_files
+                    self.shuffle_epoch = self.shuffle_position = 0
+                # The image is picked while decoding (see next_shuffled)
+                selected_index = None
             else:  # single mode
                 # In single mode, always use the provided index (capped to valid range)
                 selected_index = min(max(0, image_index), self.total_files - 1)
+                position = selected_index
                 # Also update the current index to match (for potential future sequential use)
                 self.current_index = selected_index
     
             # Step 4: Load and process the selected image
-            image_path = self.image_files[selected_index]
-            # Log info about the image being loaded (1-based index for user-friendly display)
-            print(f"Loading image {selected_index + 1}/{self.total_files}: {image_path}")
+            # In sequential and shuffled mode the image was usually decoded ahead
+            # of time by the prefetcher; in single mode any pending read-ahead is dropped.
+            if mode in ("sequential", "shuffled"):
+                self.prefetcher.depth = prefetch
+                decode = self.prefetcher.load
+            else:
+                self.prefetcher.reset()
+                decode = self.decode_image
     
-            # Open the image file using PIL
-            image = Image.open(image_path)
-            # Apply EXIF orientation correction (e.g., for photos from phones/cameras)
-            image = ImageOps.exif_transpose(image)
+            # Only the picked image is fully decoded. If it turns out to be
+            # corrupt, it is marked invalid in the catalog and we fall through
+            # to the next image.
+            picked_index = selected_index
+            if mode == "shuffled":
+                # Corrupt images are skipped in shuffled order, not file order
+                selected_index, epoch, position, tensor_image = self.next_shuffled(
+                    shuffle_seed, decode
+                )
+            else:
+                selected_index, tensor_image = decode_with_fallback(
+                    self.image_files, selected_index, get_catalog().mark_invalid, decode
+                )
     
-            # Ensure the image is in RGB mode (convert if it's not)
-            # This handles grayscale, RGBA, or other color formats
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
+            if mode == "sequential":
+                if selected_index != picked_index:
+                    # Continue after the image that was actually used
+                    self.current_index = (selected_index + 1) % self.total_files
+                # Start decoding the images the next executions will pick
+                self.prefetcher.schedule([
+                    self.image_files[(self.current_index + i) % self.total_files]
+                    for i in range(min(prefetch, self.total_files))
+                ])
+            elif mode == "shuffled":
+                # The next positions of the shuffled order (possibly in the next epoch)
+                self.prefetcher.schedule(
+                    self.upcoming_shuffled(shuffle_seed, min(prefetch, self.total_files))
+                )
     
-            # Convert the PIL image to a tensor in the format ComfyUI expects
-            tensor_image = pil2tensor(image)
+            image_path = self.image_files[selected_index]
+            # Log info about the image being loaded (1-based index for user-friendly display)
+            print(f"Loading image {selected_index + 1}/{self.total_files}: {image_path}")
     
-            # Return the image tensor and metadata
-            return (tensor_image, self.total_files, selected_index)
+            # Return the image tensor, its position and its sidecars
+            return (tensor_image, self.total_files, selected_index, epoch, position,
+                    *self.load_sidecars([image_path], caption_extension))
     
         except Exception as e:
             # Comprehensive error handling to prevent workflow crashes
@@ -368,7 +1180,7 @@ class BatchImageLoadOutput:
             import traceback
             traceback.print_exc()
             # Return a fallback empty image on error
-            return (create_empty_image(), 0, 0)
+            return (create_empty_image(), 0, 0, 0, 0, "", "{}")
 
     @staticmethod
     def IS_CHANGED(**kwargs):
@@ -386,4 +1198,326 @@ class BatchImageLoadOutput:
         Returns:
             float: NaN to indicate the node should always be considered changed
         """
-        return float("NaN")
\ No newline at end of file
+        return float("NaN")
+
+
+class BatchImageListLoadOutput(BatchImageLoadOutput):
+    """
+    ComfyUI custom node emitting every image of a directory as an IMAGE list.
+    
+    Stacking a batch forces every image to one size, which is wrong for
+    mixed-resolution datasets. This variant uses OUTPUT_IS_LIST instead, so each
+    image keeps its own resolution and downstream nodes run once per image
+    within a single execution, without re-queuing the prompt N times.
+    
+    Images are decoded through a bounded window of in-flight decodes. ComfyUI
+    keeps the whole emitted list alive, so use `count` to bound how many images
+    (and how much memory) one execution produces.
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        """
+        Define the input UI elements for the list loader node.
+        
+        Returns:
+            dict: Dictionary defining all the input fields and their properties
+        """
+        # Get list of all directories from the base folder
+        base_dirs = list_image_directories(cls.get_base_dir(), cls.ROOT_LABEL)
+    
+        # Provide placeholder if no directories are found
+        if not base_dirs:
+            base_dirs = ["[No directories found]"]
+    
+        return {
+            "required": {
+                # Directory dropdown: shows directories from the base folder
+                "directory": (base_dirs,),
+    
+                # Slice of the directory to emit: `count` images from `start_index`,
+                # taking every `step`-th image (count 0 = until the end)
+                "start_index": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 1000000,
+                }),
+                "count": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 1000000,
+                    "tooltip": "Number of images to emit (0 = every image from start_index).",
+                }),
+                "step": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 1000000,
+                }),
+            },
+            "optional": {
+                "validation": (VALIDATION_POLICIES, {"default": "full-on-select"}),
+                "scan_workers": ("INT", {"default": 0, "min": 0, "max": 256}),
+                "scan_executor": (SCAN_EXECUTORS, {"default": "threads"}),
+                "max_depth": ("INT", {"default": -1, "min": -1, "max": 64}),
+                "ignore_globs": ("STRING", {"default": ""}),
+                "filter": ("STRING", {"default": ""}),
+                "sort": (SORT_KEYS, {"default": "path"}),
+                "sort_descending": ("BOOLEAN", {"default": False}),
+                "min_width": ("INT", {"default": 0, "min": 0, "max": 16384}),
+                "min_height": ("INT", {"default": 0, "min": 0, "max": 16384}),
+                "max_width": ("INT", {"default": 0, "min": 0, "max": 16384}),
+                "max_height": ("INT", {"default": 0, "min": 0, "max": 16384}),
+                "orientation": (ORIENTATION_FILTERS, {"default": "any"}),
+                "name_glob": ("STRING", {"default": ""}),
+                "caption_extension": (CAPTION_EXTENSIONS, {"default": ".txt"}),
+                # Upper bound on images being decoded at the same time
+                "decode_window": ("INT", {
+                    "default": 4,
+                    "min": 1,
+                    "max": 64,
+                    "tooltip": "Maximum number of images being decoded at once.",
+                }),
+                # Reduced-resolution decode: JPEG draft mode and Image.reduce shrink
+                # the image while decoding, before any float conversion (0 = off)
+                "max_side": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "tooltip": "Decode at reduced scale so the longest side fits (0 = full size).",
+                }),
+                "target_width": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "tooltip": "Decode at reduced scale so the width fits (0 = unconstrained).",
+                }),
+                "target_height": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "tooltip": "Decode at reduced scale so the height fits (0 = unconstrained).",
+                }),
+                "disk_cache": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Persist decoded images as memory-mapped .npy files for later runs.",
+                }),
+            }
+        }
+
+    # Images, their paths and sidecars are emitted as lists; the counts are single values
+    RETURN_TYPES = ("IMAGE", "STRING", "INT", "INT", "STRING", "STRING")
+    RETURN_NAMES = ("images", "paths", "image_count", "start_index", "captions", "metadata")
+    OUTPUT_IS_LIST = (True, True, False, False, True, True)
+    FUNCTION = "load_images"
+
+    def load_images(self, directory: str, start_index: int, count: int, step: int,
+                    validation: str = "full-on-select", scan_workers: int = 0,
+                    scan_executor: str = "threads", decode_window: int = 4,
+                    max_side: int = 0, target_width: int = 0, target_height: int = 0,
+                    disk_cache: bool = False, max_depth: int = -1,
+                    ignore_globs: str = "", filter: str = "", sort: str = "path",
+                    sort_descending: bool = False, min_width: int = 0, min_height: int = 0,
+                    max_width: int = 0, max_height: int = 0, orientation: str = "any",
+                    name_glob: str = "", caption_extension: str = ".txt"):
+        """
+        Decode the selected slice of the directory and emit it as lists.
+        
+        Args:
+            directory: The relative path to the directory containing images
+            start_index: Index of the first image to emit
+            count: Number of images to emit (0 = every image from start_index)
+            step: Stride between the emitted indices
+            validation: How thoroughly images are checked while listing the directory
+            scan_workers: Worker pool size for checking new or changed images
+            scan_executor: Whether scan workers are threads or processes
+            decode_window: Maximum number of images being decoded at once
+            max_side: Longest side to decode at (0 = full resolution)
+            target_width: Width limit to decode at (0 = unconstrained)
+            target_height: Height limit to decode at (0 = unconstrained)
+            disk_cache: Persist decoded images as memory-mapped .npy files
+            max_depth: Subfolder levels to include (-1 = unlimited)
+            ignore_globs: Comma-separated folder name globs to skip
+            filter: Metadata filter on the PNG text chunks (empty = no filter)
+            sort: Order of the images (see SORT_KEYS)
+            sort_descending: Reverse the sort order
+            min_width, min_height: Smallest image size to keep (0 = no limit)
+            max_width, max_height: Largest image size to keep (0 = no limit)
+            orientation: "any", "landscape", "portrait" or "square"
+            name_glob: Comma-separated file name globs to keep (empty = all)
+            caption_extension: Extension of the caption files next to the images
+            
+        Returns:
+            tuple: (image_tensors, image_paths, total_image_count, start_index,
+            captions, metadata_jsons)
+        """
+        try:
+            # Resolve the selected directory in the base folder
+            full_path = os.path.join(self.get_base_dir(), directory)
+    
+            if not os.path.exists(full_path):
+                print(f"Path does not exist: {full_path}")
+                return ([create_empty_image()], [""], 0, 0, [""], ["{}"])
+    
+            # Collect, validate, filter and order the image files in the directory
+            selection = ImageSelection(
+                sort, sort_descending, min_width, min_height, max_width, max_height,
+                orientation, parse_globs(name_glob),
+            )
+            self.image_files = self.get_image_files(
+                full_path, validation, scan_workers, scan_executor, max_depth, ignore_globs,
+                filter, selection,
+            )
+            self.total_files = len(self.image_files)
+    
+            if self.total_files == 0:
+                print("No valid images found")
+                return ([create_empty_image()], [""], 0, 0, [""], ["{}"])
+    
+            # Select the slice of images to emit
+            start = min(max(0, start_index), self.total_files - 1)
+            stop = start + count * step if count > 0 else None
+            paths = self.image_files[start:stop:step]
+            print(f"Loading {len(paths)} images from index {start} (step {step})")
+    
+            self.decode_size = (max_side, target_width, target_height)
+            self.disk_cache = disk_cache
+    
+            # Stream the images through a bounded decode window. They bypass the
+            # shared LRU cache so emitting a whole directory does not evict the
+            # images other loader nodes keep coming back to.
+            def decode(path):
+                return array2tensor(self.decode_pixels(path))
+    
+            images, names = [], []
+            for image_path, image in iter_decoded(
+                paths, decode, decode_window, get_catalog().mark_invalid
+            ):
+                if image is not None:
+                    images.append(image)
+                    names.append(image_path)
+    
+            if not images:
+                return ([create_empty_image()], [""], self.total_files, start, [""], ["{}"])
+    
+            # Caption and metadata sidecars, one list entry per emitted image
+            sidecars = get_catalog().get_sidecars(names, caption_extension, scan_workers)
+            return (
+                images, names, self.total_files, start,
+                [sidecars[name][0] for name in names],
+                [json.dumps(sidecars[name][1]) for name in names],
+            )
+    
+        except Exception as e:
+            # Comprehensive error handling to prevent workflow crashes
+            print(f"Error loading images: {e}")
+            import traceback
+            traceback.print_exc()
+            return ([create_empty_image()], [""], 0, 0, [""], ["{}"])
+
+
+class AspectBucketPlanOutput(BatchImageLoadOutput):
+    """
+    ComfyUI custom node assigning every image of a directory to an aspect ratio bucket.
+    
+    The buckets are the preset resolutions of the Flux, SDXL or Qwen aspect ratio
+    nodes (in both orientations). Every image goes to the bucket with the closest
+    aspect ratio, computed from the image dimensions stored in the catalog, so
+    nothing is decoded. The node emits one list entry per non-empty bucket; the
+    loader's "bucketed" mode loads batches following the same plan.
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        """
+        Define the input UI elements for the bucket plan node.
+        
+        Returns:
+            dict: Dictionary defining all the input fields and their properties
+        """
+        # Get list of all directories from the base folder
+        base_dirs = list_image_directories(cls.get_base_dir(), cls.ROOT_LABEL)
+    
+        # Provide placeholder if no directories are found
+        if not base_dirs:
+            base_dirs = ["[No directories found]"]
+    
+        return {
+            "required": {
+                # Directory dropdown: shows directories from the base folder
+                "directory": (base_dirs,),
+                # Model family whose preset resolutions are the buckets
+                "bucket_family": (list(BUCKET_FAMILIES),),
+            },
+            "optional": {
+                "validation": (VALIDATION_POLICIES, {"default": "full-on-select"}),
+                "scan_workers": ("INT", {"default": 0, "min": 0, "max": 256}),
+                "scan_executor": (SCAN_EXECUTORS, {"default": "threads"}),
+                "max_depth": ("INT", {"default": -1, "min": -1, "max": 64}),
+                "ignore_globs": ("STRING", {"default": ""}),
+                "filter": ("STRING", {"default": ""}),
+            }
+        }
+
+    # One entry per bucket: newline-separated image paths, bucket size and image count
+    RETURN_TYPES = ("STRING", "INT", "INT", "INT")
+    RETURN_NAMES = ("paths", "width", "height", "image_count")
+    OUTPUT_IS_LIST = (True, True, True, True)
+    FUNCTION = "make_plan"
+
+    def make_plan(self, directory: str, bucket_family: str,
+                  validation: str = "full-on-select", scan_workers: int = 0,
+                  scan_executor: str = "threads", max_depth: int = -1,
+                  ignore_globs: str = "", filter: str = ""):
+        """
+        Bucket the images of the directory and emit the plan as lists.
+        
+        Args:
+            directory: The relative path to the directory containing images
+            bucket_family: Model family whose presets are the buckets
+            validation: How thoroughly images are checked while listing the directory
+            scan_workers: Worker pool size for checking new or changed images
+            scan_executor: Whether scan workers are threads or processes
+            max_depth: Subfolder levels to include (-1 = unlimited)
+            ignore_globs: Comma-separated folder name globs to skip
+            filter: Metadata filter on the PNG text chunks (empty = no filter)
+            
+        Returns:
+            tuple: (paths per bucket, bucket widths, bucket heights, image counts)
+        """
+        try:
+            # Resolve the selected directory in the base folder
+            full_path = os.path.join(self.get_base_dir(), directory)
+    
+            if not os.path.exists(full_path):
+                print(f"Path does not exist: {full_path}")
+                return ([""], [0], [0], [0])
+    
+            # Collect the images, then assign them to buckets from their headers
+            self.image_files = self.get_image_files(
+                full_path, validation, scan_workers, scan_executor, max_depth, ignore_globs,
+                filter,
+            )
+            plan = self.bucket_plan(bucket_family, scan_workers)
+            if not plan:
+                print("No valid images found")
+                return ([""], [0], [0], [0])
+    
+            for (width, height), paths in plan:
+                print(f"Bucket {width}x{height}: {len(paths)} images")
+            return (
+                ["\n".join(paths) for _, paths in plan],
+                [width for (width, _), _ in plan],
+                [height for (_, height), _ in plan],
+                [len(paths) for _, paths in plan],
+            )
+    
+        except Exception as e:
+            # Comprehensive error handling to prevent workflow crashes
+            print(f"Error planning buckets: {e}")
+            import traceback
+            traceback.print_exc()
+            return ([""], [0], [0], [0])
+
+
+# Let the thumbnail route serve previews of output images, listed like the node does
+register_root("output", COMFY_OUTPUT_DIR, BatchImageLoadOutput.list_preview_images)
@@ -0,0 +1,151 @@
+"""
+Image Archive - read images straight out of tar and zip shards for the Pipemind
+batch image loaders.
+
+Datasets stored as shards (including WebDataset-style tars, where each sample is
+a group of members sharing a key) no longer have to be unpacked into the
+ComfyUI input folder. A shard is indexed once: the name, data offset, stored
+size and compression of every member, in archive order. Members are then read
+with a single seek and read, without extracting anything.
+
+Members are addressed with virtual paths of the form "<archive>::<member>", so
+they flow through the catalog, caches and decoders like ordinary file paths.
+"""
+
+import io
+import os
+import struct
+import tarfile
+import zipfile
+import zlib
+
+# Archive formats that can be used as an image source. Tars must be
+# uncompressed: a gzip stream cannot be entered at a member's offset.
+ARCHIVE_EXTENSIONS = {'.tar', '.zip'}
+
+# Separates the archive path from the member name in a virtual path
+MEMBER_SEPARATOR = "::"
+
+# Compression of an indexed member (zip method numbers)
+COMPRESSION_STORED = zipfile.ZIP_STORED
+COMPRESSION_DEFLATED = zipfile.ZIP_DEFLATED
+
+# Fixed part of a zip local file header: signature, version, flags, method,
+# time, date, crc, compressed size, size, name length, extra length
+_ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_ZIP_LOCAL_SIGNATURE = b"PK\x03\x04"
+
+
+def is_archive_file(file_name):
+    """Check whether a file name carries one of the supported archive extensions."""
+    return os.path.splitext(file_name)[1].lower() in ARCHIVE_EXTENSIONS
+
+
+def member_path(archive_path, name):
+    """Build the virtual path of an archive member."""
+    return f"{archive_path}{MEMBER_SEPARATOR}{name}"
+
+
+def split_member_path(path):
+    """
+    Split a virtual member path into its archive path and member name.
+
+    Returns:
+        tuple: (archive_path, member_name), or (path, None) for a plain file
+    """
+    path = os.fspath(path)
+    index = path.find(MEMBER_SEPARATOR)
+    while index != -1:
+        if is_archive_file(path[:index]):
+            return path[:index], path[index + len(MEMBER_SEPARATOR):]
+        index = path.find(MEMBER_SEPARATOR, index + 1)
+    return path, None
+
+
+def source_stat(path):
+    """os.stat() of a file, or of the archive holding a virtual member path."""
+    return os.stat(split_member_path(path)[0])
+
+
+def _normalize_name(name):
+    while name.startswith("./"):
+        name = name[2:]
+    return name
+
+
+def _index_tar(archive_path, select):
+    entries = []
+    # Plain "r:" reads header blocks and seeks over the member data
+    with tarfile.open(archive_path, "r:") as tar:
+        for info in tar:
+            name = _normalize_name(info.name)
+            if info.isfile() and select(name):
+                entries.append((name, info.offset_data, info.size, COMPRESSION_STORED))
+    return entries
+
+
+def _index_zip(archive_path, select):
+    entries = []
+    with open(archive_path, "rb") as f, zipfile.ZipFile(f) as archive:
+        for info in sorted(archive.infolist(), key=lambda i: i.header_offset):
+            name = _normalize_name(info.filename)
+            if info.is_dir() or not select(name) or info.flag_bits & 0x1:
+                continue  # Encrypted members cannot be read by offset
+
+            # The data starts after the local header, whose extra field may
+            # differ from the one in the central directory
+            f.seek(info.header_offset)
+            header = _ZIP_LOCAL_HEADER.unpack(f.read(_ZIP_LOCAL_HEADER.size))
+            if header[0] != _ZIP_LOCAL_SIGNATURE:
+                continue
+            offset = info.header_offset + _ZIP_LOCAL_HEADER.size + header[9] + header[10]
+            entries.append((name, offset, info.compress_size, info.compress_type))
+    return entries
+
+
+def index_archive(archive_path, select=None):
+    """
+    List the members of an archive with the location of their data.
+
+    Args:
+        archive_path: Path to a .tar or .zip file
+        select: Optional predicate on member names (e.g. an image extension check)
+
+    Returns:
+        list: (name, offset, size, compression) tuples in archive order
+
+    Raises:
+        tarfile.TarError, zipfile.BadZipFile, OSError: For unreadable archives
+    """
+    select = select or (lambda name: True)
+    if os.path.splitext(archive_path)[1].lower() == ".zip":
+        return _index_zip(archive_path, select)
+    return _index_tar(archive_path, select)
+
+
+def read_member(archive_path, name, offset, size, compression=COMPRESSION_STORED):
+    """
+    Read the bytes of one archive member by seeking to its indexed offset.
+
+    Returns:
+        bytes: The uncompressed member data
+    """
+    with open(archive_path, "rb") as f:
+        f.seek(offset)
+        data = f.read(size)
+    if len(data) != size:
+        raise OSError(f"Archive member {name} in {archive_path} is truncated")
+
+    if compression == COMPRESSION_STORED:
+        return data
+    if compression == COMPRESSION_DEFLATED:
+        return zlib.decompress(data, -zlib.MAX_WBITS)
+
+    # Other zip methods (bzip2, lzma) go through zipfile
+    with zipfile.ZipFile(archive_path) as archive:
+        return archive.read(name)
+
+
+def open_member(archive_path, name, offset, size, compression=COMPRESSION_STORED):
+    """Return a member as a file-like object PIL can open."""
+    return io.BytesIO(read_member(archive_path, name, offset, size, compression))
@@ -0,0 +1,89 @@
+"""
+Image Buckets - aspect-ratio bucketing for the Pipemind batch image loaders.
+
+Instead of picking a Flux, SDXL or Qwen resolution by hand for every image,
+a whole listing is assigned to the nearest preset resolution ("bucket") of a
+model family at once. Only the image dimensions stored in the catalog are
+needed, so no pixels are decoded, and the assignment is a single vectorized
+NumPy computation over all images. Loading bucket by bucket then gives
+batches whose images share one resolution, so nothing has to be padded.
+"""
+
+import numpy as np
+
+try:
+    from .pipemind_flux_2m_aspect_ratio import PRESETS as FLUX_PRESETS
+    from .pipemind_qwen_aspect_ratio import PRESETS as QWEN_PRESETS
+    from .pipemind_sdxl_aspect_ratio import PRESETS as SDXL_PRESETS
+except ImportError:
+    from pipemind_flux_2m_aspect_ratio import PRESETS as FLUX_PRESETS
+    from pipemind_qwen_aspect_ratio import PRESETS as QWEN_PRESETS
+    from pipemind_sdxl_aspect_ratio import PRESETS as SDXL_PRESETS
+
+
+def _both_orientations(presets):
+    """List the preset sizes in landscape and portrait orientation, without duplicates."""
+    sizes = []
+    for width, height in presets.values():
+        for size in ((width, height), (height, width)):
+            if size not in sizes:
+                sizes.append(size)
+    return sizes
+
+
+# Bucket resolutions per model family: the presets of the aspect ratio nodes,
+# in both orientations
+BUCKET_FAMILIES = {
+    "flux": _both_orientations(FLUX_PRESETS),
+    "sdxl": _both_orientations(SDXL_PRESETS),
+    "qwen": _both_orientations(QWEN_PRESETS),
+}
+
+
+def assign_buckets(sizes, buckets):
+    """
+    Find the bucket whose aspect ratio is closest to each image's.
+
+    Ratios are compared on a log scale, so 2:1 and 1:2 are equally far from 1:1.
+
+    Args:
+        sizes: (N, 2) array-like of image (width, height)
+        buckets: Sequence of bucket (width, height)
+
+    Returns:
+        np.ndarray: N bucket indices into buckets
+    """
+    sizes = np.asarray(sizes, dtype=np.float64).reshape(-1, 2)
+    buckets = np.asarray(buckets, dtype=np.float64)
+
+    image_ratios = np.log(np.maximum(sizes[:, 0], 1.0) / np.maximum(sizes[:, 1], 1.0))
+    bucket_ratios = np.log(buckets[:, 0] / buckets[:, 1])
+    return np.abs(image_ratios[:, None] - bucket_ratios[None, :]).argmin(axis=1)
+
+
+def plan_buckets(sizes, family):
+    """
+    Group images by the nearest bucket of a model family.
+
+    Args:
+        sizes: Sequence of upright image (width, height), one per listed image
+        family: Key of BUCKET_FAMILIES
+
+    Returns:
+        list: ((bucket_width, bucket_height), [image indices]) for every
+        non-empty bucket, in the family's bucket order; indices keep the
+        order of sizes
+    """
+    buckets = BUCKET_FAMILIES[family]
+    if len(sizes) == 0:
+        return []
+
+    assigned = assign_buckets(sizes, buckets)
+    # A stable sort groups the images by bucket while keeping the listing order
+    order = np.argsort(assigned, kind="stable")
+    counts = np.bincount(assigned, minlength=len(buckets))
+    groups = np.split(order, np.cumsum(counts)[:-1])
+    return [
+        (buckets[bucket], group.tolist())
+        for bucket, group in enumerate(groups) if len(group)
+    ]
@@ -0,0 +1,328 @@
+"""
+Image Cache - memory-budgeted LRU cache of decoded images for the Pipemind
+batch image loaders.
+
+Workflows that keep returning to the same few reference images used to decode
+them from disk on every execution. Decoded tensors are kept here, keyed by
+(path, mtime, size, target mode) so an edited file is never served stale, and
+the least recently used entries are evicted once the byte budget is exceeded.
+Entries can be stored as compact uint8 arrays (a quarter of the float32 size)
+that are only converted to float32 when they are handed back to the node.
+
+DiskArrayCache is an opt-in, persistent layer below it for dataset folders that
+are iterated many times: each decoded image is written once as a uint8 .npy
+file, recorded in an append-only manifest with the source mtime and size, and
+later passes memory-map the file instead of decoding the source again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np  # NumPy for array operations
+import torch  # PyTorch for tensor manipulation
+
+try:
+    from .pipemind_image_archive import source_stat
+except ImportError:
+    from pipemind_image_archive import source_stat
+
+# Default byte budget shared by all loader nodes
+DEFAULT_CACHE_MB = 512
+
+# Where decoded images are persisted when the disk cache is enabled
+DISK_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "cache", "decoded"
+)
+
+
+def cache_key(image_path, target_mode="RGB"):
+    """Build the cache key for an image file (or archive member) as it currently is on disk."""
+    st = source_stat(image_path)
+    return (os.path.abspath(image_path), st.st_mtime_ns, st.st_size, target_mode)
+
+
+class ImageTensorCache:
+    """
+    Thread-safe LRU cache of decoded image tensors with a byte budget.
+
+    Tensors are ComfyUI IMAGE tensors (float32, values in [0.0, 1.0]). The
+    cache never shares a tensor with its callers: put() stores a copy and get()
+    hands out a new tensor, so a downstream node changing its IMAGE input in
+    place cannot corrupt later hits.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_MB * 1024 * 1024, store_uint8=True):
+        """
+        Args:
+            max_bytes: Byte budget for all cached entries (0 disables the cache)
+            store_uint8: Store entries as uint8 and convert to float32 on hand-off
+        """
+        self.max_bytes = max_bytes
+        self.store_uint8 = store_uint8
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, max_bytes=None, store_uint8=None):
+        """Change the budget or storage format; entries in another format are dropped."""
+        with self._lock:
+            if store_uint8 is not None and store_uint8 != self.store_uint8:
+                self.store_uint8 = store_uint8
+                self._entries.clear()
+                self.current_bytes = 0
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        while self._entries and self.current_bytes > self.max_bytes:
+            _, stored = self._entries.popitem(last=False)
+            self.current_bytes -= stored.element_size() * stored.nelement()
+            self.evictions += 1
+
+    def get(self, key):
+        """Return a new tensor with the cached image for key (marking it recently used), or None."""
+        with self._lock:
+            stored = self._entries.get(key)
+            if stored is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        if stored.dtype == torch.uint8:
+            return stored.to(torch.float32).div_(255.0)
+        return stored.clone()
+
+    def put(self, key, tensor):
+        """Store a copy of a decoded float32 image tensor under key."""
+        if self.store_uint8:
+            size = tensor.nelement()
+        else:
+            size = tensor.element_size() * tensor.nelement()
+        if size > self.max_bytes:
+            return
+
+        if self.store_uint8:
+            stored = tensor.mul(255.0).round_().to(torch.uint8)
+        else:
+            stored = tensor.clone()
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous.element_size() * previous.nelement()
+            self._entries[key] = stored
+            self.current_bytes += size
+            self._evict()
+
+    def load(self, image_path, decode, target_mode="RGB"):
+        """
+        Return the decoded image for image_path, decoding it only on a cache miss.
+
+        Args:
+            image_path: Path to the image file
+            decode: Function turning the path into a float32 image tensor
+            target_mode: Color mode the decoder produces (part of the key)
+
+        Returns:
+            torch.Tensor: The decoded image tensor
+        """
+        if self.max_bytes <= 0:
+            return decode(image_path)
+
+        key = cache_key(image_path, target_mode)
+        tensor = self.get(key)
+        if tensor is None:
+            tensor = decode(image_path)
+            self.put(key, tensor)
+        return tensor
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Return hit, miss and eviction counters plus current usage."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class DiskArrayCache:
+    """
+    Persistent cache of decoded images as memory-mapped uint8 .npy files.
+
+    manifest.jsonl holds one line per write with the source path, target mode,
+    mtime and size; the last line for a source wins. An entry is only used
+    while the source file still has the recorded mtime and size.
+    """
+
+    MANIFEST_NAME = "manifest.jsonl"
+
+    def __init__(self, root=DISK_CACHE_DIR):
+        """
+        Args:
+            root: Directory holding the .npy files and the manifest
+        """
+        self.root = root
+        self.manifest_path = os.path.join(root, self.MANIFEST_NAME)
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(root, exist_ok=True)
+        self._read_manifest()
+
+    def _read_manifest(self):
+        lines = 0
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                        key = (record["path"], record["mode"])
+                        self._entries[key] = (record["mtime_ns"], record["size"], record["file"])
+                    except (ValueError, KeyError, TypeError):
+                        continue  # Skip a line cut short by an interrupted write
+        except FileNotFoundError:
+            return
+
+        # Rewrite the manifest once superseded lines dominate it
+        if lines > 2 * len(self._entries) + 64:
+            self._write_manifest()
+
+    def _write_manifest(self):
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for (path, mode), (mtime_ns, size, file_name) in self._entries.items():
+                f.write(self._manifest_line(path, mode, mtime_ns, size, file_name))
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def _manifest_line(path, mode, mtime_ns, size, file_name):
+        return json.dumps({
+            "path": path, "mode": mode, "mtime_ns": mtime_ns, "size": size, "file": file_name,
+        }) + "\n"
+
+    @staticmethod
+    def _file_name(path, mode):
+        return hashlib.sha1(f"{path}\0{mode}".encode("utf-8")).hexdigest() + ".npy"
+
+    def get(self, image_path, target_mode="RGB", stat=None):
+        """Return a memory-mapped uint8 array for image_path, or None if stale or absent."""
+        path = os.path.abspath(image_path)
+        st = stat or source_stat(path)
+        with self._lock:
+            entry = self._entries.get((path, target_mode))
+
+        if entry is None or entry[:2] != (st.st_mtime_ns, st.st_size):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            # Copy-on-write mapping: pages are read lazily and never written back
+            array = np.load(os.path.join(self.root, entry[2]), mmap_mode="c")
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return array
+
+    def put(self, image_path, array, target_mode="RGB", stat=None):
+        """Persist a decoded uint8 array for the current version of image_path."""
+        path = os.path.abspath(image_path)
+        st = stat or source_stat(path)
+        file_name = self._file_name(path, target_mode)
+        file_path = os.path.join(self.root, file_name)
+
+        # Write to a temporary file first so readers never map a partial array
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(array, dtype=np.uint8))
+        os.replace(tmp_path, file_path)
+
+        line = self._manifest_line(path, target_mode, st.st_mtime_ns, st.st_size, file_name)
+        with self._lock:
+            with open(self.manifest_path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self._entries[(path, target_mode)] = (st.st_mtime_ns, st.st_size, file_name)
+
+    def load(self, image_path, decode, target_mode="RGB"):
+        """
+        Return the uint8 pixels of image_path, decoding and persisting them on a miss.
+
+        Args:
+            image_path: Path to the image file
+            decode: Function turning the path into a uint8 HxWxC array
+            target_mode: Decoding variant (color mode, decode size) of the entry
+
+        Returns:
+            numpy.ndarray: A memory-mapped array on a hit, the decoded array otherwise
+        """
+        st = source_stat(image_path)
+        array = self.get(image_path, target_mode, stat=st)
+        if array is not None:
+            return array
+
+        array = decode(image_path)
+        try:
+            self.put(image_path, array, target_mode, stat=st)
+        except OSError as e:
+            print(f"Could not write decoded image cache for {image_path}: {e}")
+        return array
+
+    def clear(self):
+        """Delete every cached file and the manifest."""
+        with self._lock:
+            for name in os.listdir(self.root):
+                if name.endswith(".npy") or name == self.MANIFEST_NAME:
+                    os.remove(os.path.join(self.root, name))
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit and miss counters plus the number of entries."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+_tensor_cache = ImageTensorCache()
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+
+def get_tensor_cache():
+    """Return the process-wide cache shared by all batch image loader nodes."""
+    return _tensor_cache
+
+
+def get_disk_cache():
+    """Return the process-wide disk cache, or None if its folder is not writable."""
+    global _disk_cache
+    with _disk_cache_lock:
+        if _disk_cache is None:
+            try:
+                _disk_cache = DiskArrayCache()
+            except OSError as e:
+                print(f"Could not open decoded image cache at {DISK_CACHE_DIR}: {e}")
+                return None
+        return _disk_cache
@@ -0,0 +1,1279 @@
+"""
+Image Catalog - persistent SQLite index shared by the Pipemind batch image loaders.
+
+Scanning a directory used to mean walking the whole tree and fully decoding every
+image on every execution. The catalog remembers what it has already seen (path,
+size, mtime, dimensions, mode, validity and EXIF orientation) so that a rescan
+only has to stat each file and re-validate the ones whose (size, mtime) changed.
+
+Tar and zip shards are cataloged too: their member offset index is stored once
+per (size, mtime) of the archive, so members can be listed and read by seek.
+
+PNG text chunks (prompt, workflow) are stored alongside, so loaders can filter
+images by their metadata without opening every file again. Listings can be
+sorted and filtered by the stored stat and header data (see ImageSelection),
+and the resulting order is kept in memory until something in the catalog changes.
+
+Caption (.txt) and metadata (.json) sidecars written next to an image, or
+stored under the same key in a shard, are recorded by the same walk, so the
+loaders can pair them with an image by a catalog lookup instead of probing the
+file system; their content is read once and kept until the file changes.
+"""
+
+import os
+import re
+import json
+import sqlite3
+import threading
+from fnmatch import fnmatch, translate
+from functools import lru_cache
+from typing import NamedTuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from PIL import Image  # Pillow for image processing
+
+try:
+    from .pipemind_image_archive import (
+        index_archive, is_archive_file, member_path, open_member, read_member,
+        split_member_path,
+    )
+    from .pipemind_image_metadata import read_png_text
+except ImportError:
+    from pipemind_image_archive import (
+        index_archive, is_archive_file, member_path, open_member, read_member,
+        split_member_path,
+    )
+    from pipemind_image_metadata import read_png_text
+
+# Image file extensions recognised by the batch image loaders
+ALLOWED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp'}
+
+# Sidecar files sharing an image's name: captions (as written by
+# PipemindSaveImageWTxt) and JSON metadata
+CAPTION_EXTENSIONS = [".txt", ".caption"]
+METADATA_EXTENSION = ".json"
+SIDECAR_EXTENSIONS = set(CAPTION_EXTENSIONS) | {METADATA_EXTENSION}
+
+# Folders never descended into while walking (matched against the folder name,
+# case-sensitively, on top of hidden folders whose name starts with ".")
+DEFAULT_IGNORE_GLOBS = ("__pycache__", "__MACOSX", "@eaDir", "$RECYCLE.BIN", "*.thumbnails")
+
+# EXIF tag holding the camera orientation (1-8)
+EXIF_ORIENTATION_TAG = 0x0112
+
+# EXIF orientations stored sideways (rotated by 90 degrees)
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+# Orders a listing can be sorted in:
+# - "path": by full path (archive members keep their archive order)
+# - "natural": by path with digit runs compared as numbers (img2 before img10)
+# - "mtime", "size": by modification time or file size
+# - "pixels", "aspect": by pixel count or width / height of the upright image
+SORT_KEYS = ["path", "natural", "mtime", "size", "pixels", "aspect"]
+
+# Shapes a listing can be restricted to (of the upright image)
+ORIENTATION_FILTERS = ["any", "landscape", "portrait", "square"]
+
+# Listing orders kept in memory per catalog (oldest dropped first)
+ORDER_CACHE_SIZE = 32
+
+# How thoroughly files are checked while listing a directory:
+# - "full-on-select": read the header while listing, fully decode only the picked image
+# - "header": open the file and read its signature, size and mode
+# - "verify": header plus PIL's verify() integrity check
+# - "none": trust the file extension, listing costs a single stat per file
+VALIDATION_POLICIES = ["full-on-select", "header", "verify", "none"]
+
+# Check levels stored per catalog row; a cached result is reused when it was
+# produced by at least the requested level (or already found the file invalid)
+CHECK_NONE = 0
+CHECK_HEADER = 1
+CHECK_VERIFY = 2
+CHECK_FULL = 3
+
+_POLICY_LEVELS = {
+    "none": CHECK_NONE,
+    "header": CHECK_HEADER,
+    "verify": CHECK_VERIFY,
+    "full-on-select": CHECK_HEADER,
+}
+
+# Default location of the catalog database (inside this custom node's folder)
+CATALOG_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "cache", "image_catalog.sqlite3"
+)
+
+# Worker pools used to probe new or changed files. PIL releases the GIL while
+# decoding, so threads scale well; processes avoid the GIL for header parsing.
+SCAN_EXECUTORS = ["threads", "processes"]
+
+# Below this many files to probe, a worker pool costs more than it saves
+PARALLEL_SCAN_MIN_FILES = 16
+
+# Paths looked up per query when reading stored metadata (SQLite variable limit)
+_QUERY_BATCH = 500
+
+# Bump whenever the tables below change; outdated catalogs are rebuilt
+SCHEMA_VERSION = 6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    mode TEXT,
+    valid INTEGER NOT NULL,
+    orientation INTEGER,
+    checked INTEGER NOT NULL,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS images_directory ON images (directory);
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    subdirs TEXT NOT NULL,
+    has_images INTEGER NOT NULL,
+    archives TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS archives (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS archive_members (
+    archive TEXT NOT NULL,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    compression INTEGER NOT NULL,
+    valid INTEGER NOT NULL,
+    text TEXT,
+    width INTEGER,
+    height INTEGER,
+    orientation INTEGER,
+    PRIMARY KEY (archive, name)
+);
+CREATE INDEX IF NOT EXISTS archive_members_position ON archive_members (archive, position);
+CREATE TABLE IF NOT EXISTS sidecars (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content TEXT
+);
+CREATE TABLE IF NOT EXISTS archive_sidecars (
+    archive TEXT NOT NULL,
+    name TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    compression INTEGER NOT NULL,
+    content TEXT,
+    PRIMARY KEY (archive, name)
+);
+"""
+
+
+def is_image_file(file_name):
+    """Check whether a file name carries one of the allowed image extensions."""
+    dot = file_name.rfind('.')
+    return dot > 0 and file_name[dot:].lower() in ALLOWED_EXTENSIONS
+
+
+def is_sidecar_file(file_name):
+    """Check whether a file name carries a caption or metadata sidecar extension."""
+    return os.path.splitext(file_name)[1].lower() in SIDECAR_EXTENSIONS
+
+
+def parse_globs(text):
+    """Split a comma- or newline-separated list of glob patterns."""
+    return tuple(glob.strip() for glob in re.split(r"[,\n]", text or "") if glob.strip())
+
+
+@lru_cache(maxsize=32)
+def _ignore_pattern(ignore_globs):
+    return re.compile("|".join(translate(glob) for glob in ignore_globs) or r"(?!)")
+
+
+def is_ignored_directory(name, ignore_globs=DEFAULT_IGNORE_GLOBS):
+    """Check whether a folder is pruned from walks (hidden or matching a glob)."""
+    return name.startswith('.') or bool(_ignore_pattern(tuple(ignore_globs)).match(name))
+
+
+def walk_image_files(path, max_depth=-1, ignore_globs=DEFAULT_IGNORE_GLOBS, sidecars=None):
+    """
+    Yield every image file below path together with its stat result.
+
+    Uses os.scandir so each directory is listed once and DirEntry results are
+    reused; hidden and ignored folders are pruned before they are entered.
+
+    Args:
+        path: Directory to walk
+        max_depth: How many folder levels below path to descend (-1 = unlimited)
+        ignore_globs: Folder name globs to prune (hidden folders always are)
+        sidecars: Optional list that collects (file_path, os.stat_result) of
+            the caption and metadata sidecars met on the way
+
+    Yields:
+        tuple: (file_path, os.stat_result)
+    """
+    pattern = _ignore_pattern(tuple(ignore_globs))
+    stack = [(path, 0)]
+    while stack:
+        current, depth = stack.pop()
+        descend = max_depth < 0 or depth < max_depth
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    name = entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if descend and not (name.startswith('.') or pattern.match(name)):
+                                stack.append((entry.path, depth + 1))
+                        elif is_image_file(name):
+                            yield entry.path, entry.stat()
+                        elif sidecars is not None and is_sidecar_file(name):
+                            sidecars.append((entry.path, entry.stat()))
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"Error walking directory {current}: {e}")
+
+
+def upright_size(width, height, orientation):
+    """Size of an image once its EXIF orientation is applied (0 for unknown sides)."""
+    width, height = width or 0, height or 0
+    return (height, width) if orientation in ROTATED_ORIENTATIONS else (width, height)
+
+
+def file_name(path):
+    """File name of an image path, or of the member for a virtual member path."""
+    archive_path, name = split_member_path(path)
+    return os.path.basename(archive_path if name is None else name)
+
+
+_DIGITS = re.compile(r"(\d+)")
+
+
+def natural_key(path):
+    """Sort key comparing digit runs as numbers, case-insensitively."""
+    parts = _DIGITS.split(path.lower())
+    parts[1::2] = map(int, parts[1::2])
+    return parts
+
+
+class ImageSelection(NamedTuple):
+    """
+    How a listing is filtered and ordered, using only stat and header data.
+
+    Dimension limits of 0 are off; name_globs are matched against file names
+    (any of them may match).
+    """
+
+    sort: str = "path"
+    descending: bool = False
+    min_width: int = 0
+    min_height: int = 0
+    max_width: int = 0
+    max_height: int = 0
+    orientation: str = "any"
+    name_globs: tuple = ()
+
+    @property
+    def needs_header(self):
+        """Whether image dimensions are needed, so headers must have been read."""
+        return (
+            self.sort in ("pixels", "aspect") or self.orientation != "any"
+            or any((self.min_width, self.min_height, self.max_width, self.max_height))
+        )
+
+
+def select_images(info, selection):
+    """
+    Filter and order images by their cataloged stat and header data.
+
+    Args:
+        info: Ordered dict of path -> (size, mtime_ns, width, height, orientation),
+            in the order used by the "path" sort
+        selection: ImageSelection to apply
+
+    Returns:
+        list: The selected paths in the requested order
+    """
+    def upright(row):
+        return upright_size(*row[2:5])
+
+    def keep(path, row):
+        if selection.name_globs and not any(
+            fnmatch(file_name(path), glob) for glob in selection.name_globs
+        ):
+            return False
+        if not selection.needs_header:
+            return True
+        width, height = upright(row)
+        if width < selection.min_width or height < selection.min_height:
+            return False
+        if 0 < selection.max_width < width or 0 < selection.max_height < height:
+            return False
+        return {
+            "landscape": width > height,
+            "portrait": height > width,
+            "square": width == height,
+        }.get(selection.orientation, True)
+
+    paths = [path for path, row in info.items() if keep(path, row)]
+
+    sort_keys = {
+        "natural": natural_key,
+        "mtime": lambda path: info[path][1],
+        "size": lambda path: info[path][0],
+        "pixels": lambda path: upright(info[path])[0] * upright(info[path])[1],
+        "aspect": lambda path: upright(info[path])[0] / max(1, upright(info[path])[1]),
+    }
+    key = sort_keys.get(selection.sort)
+    if key is not None:
+        # Stable, so ties keep the path order
+        paths.sort(key=key, reverse=selection.descending)
+    elif selection.descending:
+        paths.reverse()
+    return paths
+
+
+def policy_level(policy):
+    """Map a validation policy name to the check level used while listing."""
+    return _POLICY_LEVELS.get(policy, CHECK_HEADER)
+
+
+def read_orientation(img):
+    """Read the EXIF orientation without forcing a pixel decode."""
+    if img.format == "PNG":
+        # PngImageFile.getexif() loads the whole image when the eXIf chunk
+        # comes after the image data, so only use what the header provided
+        raw = img.info.get("exif")
+        if not raw:
+            return None
+        exif = Image.Exif()
+        exif.load(raw)
+    else:
+        exif = img.getexif()
+    return exif.get(EXIF_ORIENTATION_TAG)
+
+
+def probe_image(image_path, level=CHECK_FULL):
+    """
+    Validate an image and read the header fields stored in the catalog.
+
+    Args:
+        image_path: Path to the image file
+        level: How thoroughly to check the file (CHECK_NONE ... CHECK_FULL)
+
+    Returns:
+        dict: width, height, mode, orientation, valid flag, check level and
+        text chunks (as JSON, None when not read)
+    """
+    record = {
+        "width": None, "height": None, "mode": None, "orientation": None,
+        "valid": level == CHECK_NONE, "checked": level, "text": None,
+    }
+    if level == CHECK_NONE:
+        return record
+
+    try:
+        with Image.open(image_path) as img:
+            record["width"], record["height"] = img.size
+            record["mode"] = img.mode
+            record["orientation"] = read_orientation(img)
+            is_png = img.format == "PNG"
+            if level >= CHECK_VERIFY:
+                img.verify()
+        # The file is in the page cache now, so reading its text chunks is cheap
+        record["text"] = json.dumps(read_png_text(image_path) if is_png else {})
+        if level >= CHECK_FULL:
+            # Some issues only appear when fully loading
+            with Image.open(image_path) as img:
+                img.load()
+        record["valid"] = True
+    except Exception as e:
+        print(f"Invalid image {image_path}: {e}")
+
+    return record
+
+
+def default_scan_workers():
+    """Number of scan workers used when the node asks for "auto" (0)."""
+    return os.cpu_count() or 1
+
+
+def comfy_progress():
+    """
+    Return a progress callback that drives the ComfyUI progress bar of the
+    executing node, or None when running outside ComfyUI.
+    """
+    try:
+        import comfy.utils
+    except ImportError:
+        return None
+
+    bar = None
+
+    def report(done, total):
+        nonlocal bar
+        if bar is None:
+            bar = comfy.utils.ProgressBar(total)
+        bar.update_absolute(done, total)
+
+    return report
+
+
+def probe_images(paths, level, workers=0, executor="threads", progress=None):
+    """
+    Probe many images, fanning the work out over a worker pool.
+
+    Args:
+        paths: Image paths to probe
+        level: Check level passed to probe_image
+        workers: Pool size (0 = one per CPU, 1 = probe on the calling thread)
+        executor: "threads" or "processes"
+        progress: Optional callback receiving (done, total)
+
+    Returns:
+        list: probe_image records, in the same order as paths
+    """
+    total = len(paths)
+    workers = workers or default_scan_workers()
+    # Report roughly every percent so the UI is not flooded with updates
+    step = max(1, total // 100)
+
+    def tick(done):
+        if progress is not None and (done % step == 0 or done == total):
+            progress(done, total)
+
+    if workers <= 1 or total < PARALLEL_SCAN_MIN_FILES:
+        records = []
+        for done, image_path in enumerate(paths, 1):
+            records.append(probe_image(image_path, level))
+            tick(done)
+        return records
+
+    print(f"Scanning {total} new or changed images with {workers} {executor}")
+    pool_class = ProcessPoolExecutor if executor == "processes" else ThreadPoolExecutor
+    records = []
+    with pool_class(max_workers=workers) as pool:
+        chunksize = max(1, min(64, total // (workers * 4)))
+        # map() keeps the input order, so results line up with paths
+        results = pool.map(probe_image, paths, repeat(level), chunksize=chunksize)
+        for done, record in enumerate(results, 1):
+            records.append(record)
+            tick(done)
+    return records
+
+
+def _prefix_bounds(directory):
+    """Return the [low, high) key range matching every path below a directory."""
+    prefix = os.path.join(directory, "")
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class ImageCatalog:
+    """
+    Persistent catalog of image files and the directories that contain them.
+
+    A single catalog is shared between threads (ComfyUI builds INPUT_TYPES on the
+    server thread and runs nodes on the executor thread), so every database access
+    goes through one lock.
+    """
+
+    def __init__(self, db_path=CATALOG_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        # Listing orders, keyed by what was listed and how, tagged with the
+        # generation they were computed at; any catalog write bumps the generation
+        self._generation = 0
+        self._orders = {}
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            # The catalog is only a cache, so an outdated layout is simply rebuilt
+            self._conn.executescript(
+                "DROP TABLE IF EXISTS images; DROP TABLE IF EXISTS directories; "
+                "DROP TABLE IF EXISTS archives; DROP TABLE IF EXISTS archive_members; "
+                "DROP TABLE IF EXISTS sidecars; DROP TABLE IF EXISTS archive_sidecars;"
+            )
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.commit()
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _ordered(self, key, info, selection):
+        """Select and order images, reusing the order computed for an unchanged listing."""
+        with self._lock:
+            cached = self._orders.get(key)
+            if cached is not None and cached[:2] == (self._generation, len(info)):
+                return list(cached[2])
+            generation = self._generation
+
+        paths = select_images(info, selection)
+        with self._lock:
+            self._orders.pop(key, None)
+            self._orders[key] = (generation, len(info), paths)
+            if len(self._orders) > ORDER_CACHE_SIZE:
+                del self._orders[next(iter(self._orders))]
+        return list(paths)
+
+    def _scan_directories(self, base_dir, ignore_globs=DEFAULT_IGNORE_GLOBS):
+        """
+        Walk base_dir for directories that directly contain images and for archives.
+
+        Directory listings are cached against the directory mtime, so unchanged
+        folders are skipped without listing their (possibly huge) contents.
+        Hidden and ignored folders are pruned like in walk_image_files.
+
+        Returns:
+            tuple: (directories containing images, archive file paths)
+        """
+        lo, hi = _prefix_bounds(base_dir)
+        cached = {
+            row[0]: row[1:]
+            for row in self._conn.execute(
+                "SELECT path, mtime_ns, subdirs, has_images, archives FROM directories "
+                "WHERE path = ? OR (path >= ? AND path < ?)",
+                (base_dir, lo, hi),
+            )
+        }
+
+        found = []
+        found_archives = []
+        seen = set()
+        updates = []
+        stack = [base_dir]
+        while stack:
+            current = stack.pop()
+            try:
+                mtime_ns = os.stat(current).st_mtime_ns
+            except OSError:
+                continue
+            seen.add(current)
+
+            row = cached.get(current)
+            if row is not None and row[0] == mtime_ns:
+                subdirs = json.loads(row[1])
+                has_images = bool(row[2])
+                archives = json.loads(row[3])
+            else:
+                subdirs = []
+                has_images = False
+                archives = []
+                try:
+                    with os.scandir(current) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry.name)
+                            elif is_archive_file(entry.name):
+                                archives.append(entry.name)
+                            elif not has_images and is_image_file(entry.name):
+                                has_images = True
+                except OSError as e:
+                    print(f"Error walking directory {current}: {e}")
+                    continue
+                updates.append((
+                    current, mtime_ns, json.dumps(subdirs), int(has_images), json.dumps(archives),
+                ))
+
+            if has_images:
+                found.append(current)
+            found_archives.extend(os.path.join(current, name) for name in archives)
+            stack.extend(
+                os.path.join(current, name) for name in subdirs
+                if not is_ignored_directory(name, ignore_globs)
+            )
+
+        stale = [(path,) for path in cached if path not in seen]
+        if updates or stale:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?, ?)", updates
+            )
+            self._conn.executemany("DELETE FROM directories WHERE path = ?", stale)
+            self._conn.commit()
+
+        return found, found_archives
+
+    def list_image_directories(self, base_dir):
+        """
+        Get the directories below base_dir that directly contain image files.
+
+        Args:
+            base_dir: Base directory to search
+
+        Returns:
+            list: Sorted relative paths (forward slashes, '' for base_dir itself)
+        """
+        base_dir = os.path.abspath(base_dir)
+        with self._lock:
+            found, _ = self._scan_directories(base_dir)
+
+        result = set()
+        for path in found:
+            rel_path = os.path.relpath(path, base_dir).replace('\\', '/')
+            result.add('' if rel_path == '.' else rel_path)
+        return sorted(result)
+
+    def list_archives(self, base_dir):
+        """
+        Get the tar and zip shards below base_dir.
+
+        Args:
+            base_dir: Base directory to search
+
+        Returns:
+            list: Sorted relative paths of the archive files (forward slashes)
+        """
+        base_dir = os.path.abspath(base_dir)
+        with self._lock:
+            _, archives = self._scan_directories(base_dir)
+
+        return sorted(os.path.relpath(path, base_dir).replace('\\', '/') for path in archives)
+
+    def _stat_candidates(self, path, max_depth=-1, ignore_globs=DEFAULT_IGNORE_GLOBS,
+                         sidecars=None):
+        """Collect (path, stat) for every image file at or below path (and its sidecars)."""
+        if os.path.isfile(path):
+            if not is_image_file(os.path.basename(path)):
+                return []
+            if sidecars is not None:
+                stem = os.path.splitext(path)[0]
+                for extension in SIDECAR_EXTENSIONS:
+                    try:
+                        sidecars.append((stem + extension, os.stat(stem + extension)))
+                    except OSError:
+                        continue
+            return [(path, os.stat(path))]
+        return list(walk_image_files(path, max_depth, ignore_globs, sidecars))
+
+    def _update_sidecars(self, path, sidecars):
+        """Record the sidecars found at or below path; changed ones are read again later."""
+        with self._lock:
+            if os.path.isdir(path):
+                lo, hi = _prefix_bounds(path)
+                rows = self._conn.execute(
+                    "SELECT path, size, mtime_ns FROM sidecars WHERE path >= ? AND path < ?",
+                    (lo, hi),
+                )
+            else:
+                stem = os.path.splitext(path)[0]
+                names = [stem + extension for extension in SIDECAR_EXTENSIONS]
+                rows = self._conn.execute(
+                    "SELECT path, size, mtime_ns FROM sidecars "
+                    f"WHERE path IN ({', '.join('?' * len(names))})",
+                    names,
+                )
+            known = {row[0]: row[1:] for row in rows}
+
+        updates = []
+        for file_path, st in sidecars:
+            if known.pop(file_path, None) != (st.st_size, st.st_mtime_ns):
+                updates.append((file_path, st.st_size, st.st_mtime_ns))
+        gone = [(p,) for p in known if not os.path.exists(p)]
+        if updates or gone:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO sidecars VALUES (?, ?, ?, NULL)", updates
+                )
+                self._conn.executemany("DELETE FROM sidecars WHERE path = ?", gone)
+                self._conn.commit()
+
+    def get_image_files(self, path, validation="full-on-select", workers=0,
+                        executor="threads", progress=None, max_depth=-1,
+                        ignore_globs=DEFAULT_IGNORE_GLOBS, selection=None):
+        """
+        Get the sorted list of valid image files at or below path.
+
+        Files are only re-validated when their (size, mtime) differs from the
+        catalog or when they were previously checked less thoroughly than the
+        requested policy; entries for files that disappeared are dropped.
+        Files that do need probing (e.g. on the first scan of a directory) are
+        spread over a pool of workers.
+
+        An archive path lists its image members instead, in archive order (see
+        get_archive_members); members are not probed while listing.
+
+        A selection filters and sorts the listing by stored stat and header
+        data only; if it needs image dimensions, files are checked at least at
+        the "header" level. The order is reused until the catalog changes.
+
+        Args:
+            path: Path to a directory, an image file or a tar/zip archive
+            validation: One of VALIDATION_POLICIES
+            workers: Scan pool size (0 = one per CPU, 1 = no pool)
+            executor: One of SCAN_EXECUTORS
+            progress: Optional callback receiving (done, total) while probing
+            max_depth: Folder levels below path to include (-1 = unlimited)
+            ignore_globs: Folder name globs to skip (hidden folders always are)
+            selection: Optional ImageSelection (default: every image by path)
+
+        Returns:
+            list: Sorted list of valid image file paths
+        """
+        path = os.path.abspath(path)
+        selection = selection or ImageSelection()
+        if is_archive_file(path) and os.path.isfile(path):
+            return self.get_archive_members(path, selection)
+
+        level = policy_level(validation)
+        if selection.needs_header:
+            level = max(level, CHECK_HEADER)
+        sidecars = []
+        candidates = self._stat_candidates(path, max_depth, ignore_globs, sidecars)
+        self._update_sidecars(path, sidecars)
+
+        with self._lock:
+            if os.path.isdir(path):
+                lo, hi = _prefix_bounds(path)
+                rows = self._conn.execute(
+                    "SELECT path, size, mtime_ns, valid, checked, width, height, orientation "
+                    "FROM images WHERE path >= ? AND path < ?",
+                    (lo, hi),
+                )
+            else:
+                rows = self._conn.execute(
+                    "SELECT path, size, mtime_ns, valid, checked, width, height, orientation "
+                    "FROM images WHERE path = ?",
+                    (path,),
+                )
+            known = {row[0]: row[1:] for row in rows}
+
+        # path -> (size, mtime_ns, width, height, orientation) of every valid image
+        image_files = {}
+        to_probe = []
+        for file_path, st in candidates:
+            row = known.pop(file_path, None)
+            if (row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns
+                    and (not row[2] or row[3] >= level)):
+                if row[2]:
+                    image_files[file_path] = (row[0], row[1]) + row[4:]
+            else:
+                to_probe.append((file_path, st))
+
+        records = probe_images(
+            [file_path for file_path, _ in to_probe], level, workers, executor, progress
+        )
+        updates = []
+        for (file_path, st), record in zip(to_probe, records):
+            updates.append((
+                file_path, os.path.dirname(file_path), st.st_size, st.st_mtime_ns,
+                record["width"], record["height"], record["mode"],
+                int(record["valid"]), record["orientation"], record["checked"],
+                record["text"],
+            ))
+            if record["valid"]:
+                image_files[file_path] = (
+                    st.st_size, st.st_mtime_ns,
+                    record["width"], record["height"], record["orientation"],
+                )
+
+        # Whatever is left in `known` was deleted or pruned from this walk (by
+        # depth or ignore globs); only forget the files that are really gone
+        gone = [(p,) for p in known if not os.path.exists(p)]
+        if updates or gone:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", updates
+                )
+                self._conn.executemany("DELETE FROM images WHERE path = ?", gone)
+                self._conn.commit()
+                self._generation += 1
+
+        info = {file_path: image_files[file_path] for file_path in sorted(image_files)}
+        key = (path, max_depth, tuple(ignore_globs), level, selection)
+        return self._ordered(key, info, selection)
+
+    def get_archive_members(self, archive_path, selection=None):
+        """
+        Get the image members of a tar or zip archive, indexing it if needed.
+
+        The offset index is rebuilt only when the archive's (size, mtime)
+        changed. Members that failed to decode earlier are left out.
+
+        Args:
+            archive_path: Path to the archive file
+            selection: Optional ImageSelection; members share the archive's
+                mtime, their size is the stored (possibly compressed) size,
+                and their headers are read once when dimensions are needed
+
+        Returns:
+            list: Virtual member paths ("<archive>::<member>") in archive order
+            (or the selection's order)
+        """
+        selection = selection or ImageSelection()
+        archive_path = os.path.abspath(archive_path)
+        try:
+            st = os.stat(archive_path)
+        except OSError as e:
+            print(f"Error reading archive {archive_path}: {e}")
+            return []
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns FROM archives WHERE path = ?", (archive_path,)
+            ).fetchone()
+
+        if row != (st.st_size, st.st_mtime_ns):
+            try:
+                entries = index_archive(
+                    archive_path, lambda name: is_image_file(name) or is_sidecar_file(name)
+                )
+            except Exception as e:
+                print(f"Error indexing archive {archive_path}: {e}")
+                return []
+            images = [entry for entry in entries if is_image_file(entry[0])]
+
+            with self._lock:
+                self._conn.execute(
+                    "DELETE FROM archive_members WHERE archive = ?", (archive_path,)
+                )
+                self._conn.execute(
+                    "DELETE FROM archive_sidecars WHERE archive = ?", (archive_path,)
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO archive_members "
+                    "VALUES (?, ?, ?, ?, ?, ?, 1, NULL, NULL, NULL, NULL)",
+                    [
+                        (archive_path, name, position, offset, size, compression)
+                        for position, (name, offset, size, compression) in enumerate(images)
+                    ],
+                )
+                # WebDataset samples keep their caption and JSON under the image's key
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO archive_sidecars VALUES (?, ?, ?, ?, ?, NULL)",
+                    [
+                        (archive_path, name, offset, size, compression)
+                        for name, offset, size, compression in entries
+                        if not is_image_file(name)
+                    ],
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO archives VALUES (?, ?, ?)",
+                    (archive_path, st.st_size, st.st_mtime_ns),
+                )
+                self._conn.commit()
+                self._generation += 1
+
+        if selection.needs_header:
+            self._probe_members(archive_path)
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, size, width, height, orientation FROM archive_members "
+                "WHERE archive = ? AND valid = 1 ORDER BY position",
+                (archive_path,),
+            ).fetchall()
+        info = {
+            member_path(archive_path, name): (size, st.st_mtime_ns, width, height, orientation)
+            for name, size, width, height, orientation in rows
+        }
+        return self._ordered((archive_path, selection), info, selection)
+
+    def _probe_members(self, archive_path):
+        """Read and store the dimensions of archive members not probed yet."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, offset, size, compression FROM archive_members "
+                "WHERE archive = ? AND valid = 1 AND width IS NULL",
+                (archive_path,),
+            ).fetchall()
+        if not rows:
+            return
+
+        updates = []
+        for name, offset, size, compression in rows:
+            try:
+                with Image.open(open_member(archive_path, name, offset, size, compression)) as img:
+                    updates.append((*img.size, read_orientation(img), 1, archive_path, name))
+            except Exception as e:
+                print(f"Invalid image {member_path(archive_path, name)}: {e}")
+                updates.append((None, None, None, 0, archive_path, name))
+
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE archive_members SET width = ?, height = ?, orientation = ?, valid = ? "
+                "WHERE archive = ? AND name = ?",
+                updates,
+            )
+            self._conn.commit()
+            self._generation += 1
+
+    def member_location(self, path):
+        """
+        Look up where an archive member's data is stored.
+
+        Returns:
+            tuple or None: (archive, name, offset, size, compression), or None
+            if path is not a member of an indexed archive
+        """
+        archive_path, name = split_member_path(path)
+        if name is None:
+            return None
+
+        archive_path = os.path.abspath(archive_path)
+        query = (
+            "SELECT offset, size, compression FROM archive_members "
+            "WHERE archive = ? AND name = ?"
+        )
+        with self._lock:
+            row = self._conn.execute(query, (archive_path, name)).fetchone()
+        if row is None:
+            # Not indexed yet (or the archive changed): index it and look again
+            self.get_archive_members(archive_path)
+            with self._lock:
+                row = self._conn.execute(query, (archive_path, name)).fetchone()
+        if row is None:
+            return None
+        return (archive_path, name) + tuple(row)
+
+    def _read_text(self, image_path):
+        """Read the text chunks of a file or archive member ({} for non-PNGs)."""
+        if not image_path.lower().endswith(".png"):
+            return {}
+        try:
+            if split_member_path(image_path)[1] is None:
+                return read_png_text(image_path)
+            location = self.member_location(image_path)
+            return read_png_text(open_member(*location)) if location else {}
+        except OSError as e:
+            print(f"Error reading metadata of {image_path}: {e}")
+            return {}
+
+    def get_text_metadata(self, paths, workers=0):
+        """
+        Get the PNG text chunks of many images.
+
+        Text stored while scanning is reused; images scanned without opening
+        them (validation "none") or archive members are read once, by chunk
+        headers only, and stored until their (size, mtime) changes.
+
+        Args:
+            paths: Image file or virtual member paths (as listed by the catalog)
+            workers: Pool size for images that still need reading (0 = one per CPU)
+
+        Returns:
+            dict: path -> {keyword: text}
+        """
+        stored = {}
+        files = [path for path in paths if split_member_path(path)[1] is None]
+        archives = {}
+        for path in paths:
+            archive_path, name = split_member_path(path)
+            if name is not None:
+                archives.setdefault(archive_path, []).append(path)
+
+        with self._lock:
+            for start in range(0, len(files), _QUERY_BATCH):
+                batch = files[start:start + _QUERY_BATCH]
+                stored.update(self._conn.execute(
+                    "SELECT path, text FROM images WHERE text IS NOT NULL AND path IN "
+                    f"({', '.join('?' * len(batch))})",
+                    batch,
+                ))
+            for archive_path in archives:
+                stored.update(
+                    (member_path(archive_path, name), text)
+                    for name, text in self._conn.execute(
+                        "SELECT name, text FROM archive_members "
+                        "WHERE archive = ? AND text IS NOT NULL",
+                        (os.path.abspath(archive_path),),
+                    )
+                )
+
+        missing = [path for path in paths if path not in stored]
+        if missing:
+            workers = workers or default_scan_workers()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                texts = [json.dumps(text) for text in pool.map(self._read_text, missing)]
+
+            file_updates, member_updates = [], []
+            for path, text in zip(missing, texts):
+                stored[path] = text
+                archive_path, name = split_member_path(path)
+                if name is None:
+                    file_updates.append((text, path))
+                else:
+                    member_updates.append((text, os.path.abspath(archive_path), name))
+            with self._lock:
+                self._conn.executemany("UPDATE images SET text = ? WHERE path = ?", file_updates)
+                self._conn.executemany(
+                    "UPDATE archive_members SET text = ? WHERE archive = ? AND name = ?",
+                    member_updates,
+                )
+                self._conn.commit()
+
+        return {path: json.loads(stored[path]) for path in paths}
+
+    def get_dimensions(self, paths, workers=0):
+        """
+        Get the upright (width, height) of many images from their stored headers.
+
+        Images listed without reading their header (validation "none") and
+        archive members are probed once and the result is stored.
+
+        Args:
+            paths: Image file or virtual member paths (as listed by the catalog)
+            workers: Pool size for images that still need probing (0 = one per CPU)
+
+        Returns:
+            dict: path -> (width, height); images that turn out to be invalid
+            are left out
+        """
+        rows = {}
+        files = [path for path in paths if split_member_path(path)[1] is None]
+        archives = {
+            split_member_path(path)[0] for path in paths if split_member_path(path)[1] is not None
+        }
+
+        def read_rows():
+            with self._lock:
+                for start in range(0, len(files), _QUERY_BATCH):
+                    batch = files[start:start + _QUERY_BATCH]
+                    rows.update(
+                        (row[0], row[1:]) for row in self._conn.execute(
+                            "SELECT path, width, height, orientation FROM images "
+                            f"WHERE valid = 1 AND path IN ({', '.join('?' * len(batch))})",
+                            batch,
+                        )
+                    )
+                for archive_path in archives:
+                    rows.update(
+                        (member_path(archive_path, row[0]), row[1:]) for row in self._conn.execute(
+                            "SELECT name, width, height, orientation FROM archive_members "
+                            "WHERE archive = ? AND valid = 1",
+                            (os.path.abspath(archive_path),),
+                        )
+                    )
+
+        read_rows()
+        missing = [path for path in files if path in rows and rows[path][0] is None]
+        if missing:
+            records = probe_images(missing, CHECK_HEADER, workers)
+            with self._lock:
+                self._conn.executemany(
+                    "UPDATE images SET width = ?, height = ?, mode = ?, orientation = ?, "
+                    "valid = ?, checked = MAX(checked, ?) WHERE path = ?",
+                    [
+                        (r["width"], r["height"], r["mode"], r["orientation"], int(r["valid"]),
+                         CHECK_HEADER, path)
+                        for path, r in zip(missing, records)
+                    ],
+                )
+                self._conn.commit()
+                self._generation += 1
+        for archive_path in archives:
+            self._probe_members(os.path.abspath(archive_path))
+        if missing or archives:
+            rows.clear()
+            read_rows()
+
+        return {
+            path: upright_size(*rows[path])
+            for path in paths if path in rows and rows[path][0] is not None
+        }
+
+    def filter_images(self, paths, predicate, workers=0):
+        """
+        Keep the images whose PNG text chunks satisfy a predicate.
+
+        Args:
+            paths: Image paths, in the order to keep
+            predicate: Callable receiving the {keyword: text} dict of an image
+                (see pipemind_image_metadata.compile_text_filter)
+            workers: Pool size for images whose metadata still needs reading
+
+        Returns:
+            list: The matching paths, in their original order
+        """
+        metadata = self.get_text_metadata(paths, workers)
+        return [path for path in paths if predicate(metadata[path])]
+
+    def _read_sidecar(self, path, location):
+        """Read a sidecar file, or an archive sidecar at location, as text."""
+        try:
+            if location is None:
+                with open(path, "rb") as f:
+                    data = f.read()
+            else:
+                data = read_member(*location)
+        except OSError as e:
+            print(f"Error reading sidecar {path}: {e}")
+            return ""
+        return data.decode("utf-8", errors="replace")
+
+    def get_sidecars(self, paths, caption_extension=".txt", workers=0):
+        """
+        Get the caption and JSON metadata stored next to many images.
+
+        The sidecars are paired by name from the catalog, as recorded by the
+        last listing (get_image_files, get_archive_members); nothing is looked
+        up on disk. Their content is read on first use and stored until the
+        sidecar changes.
+
+        Args:
+            paths: Image file or virtual member paths (as listed by the catalog)
+            caption_extension: Extension of the caption sidecars (CAPTION_EXTENSIONS)
+            workers: Pool size for sidecars that still need reading (0 = one per CPU)
+
+        Returns:
+            dict: path -> (caption, metadata); "" and {} when an image has no
+            such sidecar (or its JSON is invalid)
+        """
+        def stem(path):
+            archive_path, name = split_member_path(path)
+            if name is None:
+                return os.path.splitext(path)[0], None
+            archive_path = os.path.abspath(archive_path)
+            return member_path(archive_path, os.path.splitext(name)[0]), archive_path
+
+        # Sidecar path -> archive holding it (None for plain files)
+        stems = {path: stem(path) for path in paths}
+        wanted = {
+            image_stem + extension: archive_path
+            for image_stem, archive_path in stems.values()
+            for extension in (caption_extension, METADATA_EXTENSION)
+        }
+        files = [path for path, archive_path in wanted.items() if archive_path is None]
+        archives = {archive_path for archive_path in wanted.values() if archive_path is not None}
+
+        # Sidecar path -> (content or None if not read yet, archive location)
+        found = {}
+        with self._lock:
+            for start in range(0, len(files), _QUERY_BATCH):
+                batch = files[start:start + _QUERY_BATCH]
+                for path, content in self._conn.execute(
+                    "SELECT path, content FROM sidecars WHERE path IN "
+                    f"({', '.join('?' * len(batch))})",
+                    batch,
+                ):
+                    found[path] = (content, None)
+            for archive_path in archives:
+                for name, offset, size, compression, content in self._conn.execute(
+                    "SELECT name, offset, size, compression, content FROM archive_sidecars "
+                    "WHERE archive = ?",
+                    (archive_path,),
+                ):
+                    path = member_path(archive_path, name)
+                    if path in wanted:
+                        found[path] = (content, (archive_path, name, offset, size, compression))
+
+        unread = [
+            (path, location) for path, (content, location) in found.items() if content is None
+        ]
+        if unread:
+            workers = workers or default_scan_workers()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                texts = list(pool.map(lambda item: self._read_sidecar(*item), unread))
+
+            file_updates, member_updates = [], []
+            for (path, location), text in zip(unread, texts):
+                found[path] = (text, location)
+                if location is None:
+                    file_updates.append((text, path))
+                else:
+                    member_updates.append((text, location[0], location[1]))
+            with self._lock:
+                self._conn.executemany(
+                    "UPDATE sidecars SET content = ? WHERE path = ?", file_updates
+                )
+                self._conn.executemany(
+                    "UPDATE archive_sidecars SET content = ? WHERE archive = ? AND name = ?",
+                    member_updates,
+                )
+                self._conn.commit()
+
+        result = {}
+        for path, (image_stem, _) in stems.items():
+            caption = found.get(image_stem + caption_extension, ("", None))[0]
+            metadata = found.get(image_stem + METADATA_EXTENSION, ("", None))[0]
+            try:
+                metadata = json.loads(metadata) if metadata.strip() else {}
+            except ValueError as e:
+                print(f"Invalid JSON sidecar {image_stem + METADATA_EXTENSION}: {e}")
+                metadata = {}
+            result[path] = (caption, metadata)
+        return result
+
+    def mark_invalid(self, image_path):
+        """Record that an image failed to decode so later listings skip it."""
+        archive_path, name = split_member_path(image_path)
+        with self._lock:
+            if name is not None:
+                self._conn.execute(
+                    "UPDATE archive_members SET valid = 0 WHERE archive = ? AND name = ?",
+                    (os.path.abspath(archive_path), name),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE images SET valid = 0, checked = ? WHERE path = ?",
+                    (CHECK_FULL, os.path.abspath(image_path)),
+                )
+            self._conn.commit()
+            self._generation += 1
+
+    def get_record(self, image_path):
+        """
+        Look up the cataloged header data for a single image.
+
+        Returns:
+            dict or None: The catalog row as a dict, or None if not cataloged
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT * FROM images WHERE path = ?", (os.path.abspath(image_path),)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip([c[0] for c in cursor.description], row))
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Return the process-wide catalog shared by all batch image loader nodes."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            try:
+                _catalog = ImageCatalog()
+            except (OSError, sqlite3.Error) as e:
+                # Fall back to an in-memory catalog if the cache folder is not writable
+                print(f"Could not open image catalog at {CATALOG_PATH}: {e}")
+                _catalog = ImageCatalog(":memory:")
+        return _catalog
+
+
+def open_source(image_path):
+    """
+    Return what PIL should open for an image path.
+
+    Plain files are opened by path; archive members are read from their
+    indexed offset into memory.
+    """
+    if split_member_path(image_path)[1] is None:
+        return image_path
+
+    location = get_catalog().member_location(image_path)
+    if location is None:
+        raise FileNotFoundError(f"Archive member not found: {image_path}")
+    return open_member(*location)
@@ -0,0 +1,213 @@
+"""
+Image Cursor - sequential position shared by several ComfyUI instances.
+
+Each loader node normally keeps its own current_index, so several ComfyUI
+workers pointed at the same (network) folder all process the same images. With
+the shared cursor the position lives in a small SQLite database inside the
+shared folder instead, and every worker atomically claims the next image.
+
+Claims are stored by the image's path relative to the selected folder, not by
+its index: every worker builds its own listing, and those can differ (new files
+arrive between executions, a worker drops an image it could not decode), so
+the same index may name different files on different workers. The shared
+position is only a hint where to start looking for an unclaimed path.
+
+Claims are leases: a claim is completed when the same worker claims its next
+image (ComfyUI runs one prompt at a time, so the previous image is done by
+then). If a worker crashes, its lease expires and the image is handed to the
+next worker that asks, before any new image.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+# Cursor modes for sequential loading:
+# - "local": position kept by the node itself (per ComfyUI instance)
+# - "shared": position claimed from a database in the shared base folder
+CURSOR_MODES = ["local", "shared"]
+
+# File name of the shared cursor database, created in the loader's base folder
+CURSOR_DB_NAME = ".pipemind_cursor.sqlite3"
+
+# Default lease duration; an image claimed longer ago than this is handed out again
+DEFAULT_LEASE_SECONDS = 600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursors (
+    source TEXT PRIMARY KEY,
+    next_index INTEGER NOT NULL,
+    epoch INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS path_claims (
+    source TEXT NOT NULL,
+    path TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    expires REAL NOT NULL,
+    done INTEGER NOT NULL,
+    PRIMARY KEY (source, path)
+);
+CREATE INDEX IF NOT EXISTS path_claims_expiry ON path_claims (source, done, expires);
+"""
+
+
+def worker_id(owner=None):
+    """Identify this worker: host, process and (optionally) the owning node."""
+    parts = [socket.gethostname(), str(os.getpid())]
+    if owner is not None:
+        parts.append(f"{id(owner):x}")
+    return ":".join(parts)
+
+
+class SharedCursor:
+    """
+    Atomic, lease-based claiming of image paths across processes and hosts.
+
+    The database uses a rollback journal rather than WAL, because WAL needs
+    shared memory that network file systems do not provide; every claim is a
+    single short BEGIN IMMEDIATE transaction. Lease expiry compares wall-clock
+    times, so the clocks of the participating hosts should be in sync.
+    """
+
+    def __init__(self, db_path, timeout=30.0):
+        """
+        Args:
+            db_path: Path of the cursor database (in the shared folder)
+            timeout: Seconds to wait for another worker's transaction
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            db_path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def claim(self, source, paths, worker, lease_seconds=DEFAULT_LEASE_SECONDS, release=None):
+        """
+        Claim the next unprocessed image of a source for a worker.
+
+        Expired claims of crashed workers are handed out first; otherwise the
+        first path after the shared position that nobody claimed in this epoch
+        is taken, wrapping around to the start of the listing. Once every path
+        of the worker's listing is claimed, a new epoch starts at index 0.
+
+        Args:
+            source: Name identifying the image listing (same on every worker)
+            paths: The worker's listing, as paths relative to the listed folder
+            worker: Identifier of the claiming worker
+            lease_seconds: How long the claim stays reserved for this worker
+            release: Path previously claimed by this worker, now completed
+
+        Returns:
+            tuple: (index into paths, epoch)
+
+        Raises:
+            ValueError: If paths is empty
+        """
+        total = len(paths)
+        if total == 0:
+            raise ValueError("Cannot claim from an empty listing")
+
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if release is not None:
+                    conn.execute(
+                        "UPDATE path_claims SET done = 1 WHERE source = ? AND path = ? AND worker = ?",
+                        (source, release, worker),
+                    )
+
+                row = conn.execute(
+                    "SELECT next_index, epoch FROM cursors WHERE source = ?", (source,)
+                ).fetchone()
+                next_index, epoch = row if row is not None else (0, 0)
+
+                index = self._expired_index(source, paths, now)
+                if index is None:
+                    index = self._unclaimed_index(source, paths, min(next_index, total))
+                    if index is None:
+                        # Every listed path was handed out: start the next epoch
+                        epoch += 1
+                        conn.execute("DELETE FROM path_claims WHERE source = ?", (source,))
+                        index = 0
+                    conn.execute(
+                        "INSERT OR REPLACE INTO cursors VALUES (?, ?, ?)",
+                        (source, index + 1, epoch),
+                    )
+
+                conn.execute(
+                    "INSERT OR REPLACE INTO path_claims VALUES (?, ?, ?, ?, 0)",
+                    (source, paths[index], worker, now + lease_seconds),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return index, epoch
+
+    def _expired_index(self, source, paths, now):
+        """Index of the oldest expired claim that is in paths, or None."""
+        expired = self._conn.execute(
+            "SELECT path FROM path_claims WHERE source = ? AND done = 0 AND expires < ? "
+            "ORDER BY expires",
+            (source, now),
+        )
+        listed = None
+        for (path,) in expired:
+            if listed is None:
+                # Only built when a lease expired, which is rare
+                listed = {p: i for i, p in enumerate(paths)}
+            if path in listed:
+                return listed[path]
+        return None
+
+    def _unclaimed_index(self, source, paths, start):
+        """First index from start (wrapping around) whose path is unclaimed, or None."""
+        total = len(paths)
+        for offset in range(total):
+            index = (start + offset) % total
+            claimed = self._conn.execute(
+                "SELECT 1 FROM path_claims WHERE source = ? AND path = ?",
+                (source, paths[index]),
+            ).fetchone()
+            if claimed is None:
+                return index
+        return None
+
+    def complete(self, source, path, worker):
+        """Mark a path claimed by worker as processed."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE path_claims SET done = 1 WHERE source = ? AND path = ? AND worker = ?",
+                (source, path, worker),
+            )
+
+    def reset(self, source):
+        """Forget the position and claims of a source."""
+        with self._lock:
+            self._conn.execute("DELETE FROM cursors WHERE source = ?", (source,))
+            self._conn.execute("DELETE FROM path_claims WHERE source = ?", (source,))
+
+
+_cursors = {}
+_cursors_lock = threading.Lock()
+
+
+def get_shared_cursor(base_dir):
+    """Return the (per process) shared cursor stored in base_dir."""
+    db_path = os.path.join(os.path.abspath(base_dir), CURSOR_DB_NAME)
+    with _cursors_lock:
+        cursor = _cursors.get(db_path)
+        if cursor is None:
+            cursor = _cursors[db_path] = SharedCursor(db_path)
+        return cursor
@@ -0,0 +1,583 @@
+"""
+Image Decode - shared decoding helpers for the Pipemind batch image loaders.
+
+Listing a directory no longer fully decodes every file (see the validation
+policies in pipemind_image_catalog), so the image that is actually picked may
+turn out to be corrupt. These helpers decode the picked image and fall through
+to the next one that decodes cleanly. In sequential mode the next images are
+also predictable, so ImagePrefetcher decodes them on a background thread.
+Batch mode decodes a whole range of images in parallel and stacks them into a
+single IMAGE tensor, fitting mixed sizes to a common resolution, while the list
+loaders stream images through a bounded window of in-flight decodes.
+
+When the graph only needs a smaller image anyway, open_image can decode at a
+reduced scale (JPEG draft mode, then Image.reduce) before any float conversion,
+which saves decode time and most of the peak memory on camera-sized inputs.
+
+Animated GIF, WebP and PNG files can also be loaded frame by frame: load_frames
+seeks to just the requested frames and writes each one straight into a batch
+allocated for exactly that many frames, so memory never depends on the length
+of the animation.
+
+pil2tensor turns a decoded image into a float32 tensor with a single uint8 view
+and one in-place normalization into an output buffer. Batch and bucketed mode
+lease those buffers from a TensorBufferPool: the per-image tensors only live
+until they are stacked into the batch, so they are released right after and
+the next batch reuses them instead of allocating (and page-faulting in) new
+ones for every image.
+"""
+
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps  # Pillow for image processing
+import numpy as np  # NumPy for array operations
+import torch  # PyTorch for tensor manipulation
+import torch.nn.functional as F
+
+try:
+    from .pipemind_image_catalog import open_source, read_orientation
+except ImportError:
+    from pipemind_image_catalog import open_source, read_orientation
+
+# How images of a different size are fitted into a stacked batch:
+# - "resize": stretch to the batch size
+# - "pad": scale to fit inside and pad the borders with black
+# - "crop": scale to cover and crop the overflow around the center
+BATCH_FIT_POLICIES = ["resize", "pad", "crop"]
+
+# Byte budget of the buffers kept by the shared TensorBufferPool
+DEFAULT_POOL_MB = 256
+
+
+class TensorBufferPool:
+    """
+    Reusable float32 buffers keyed by shape, handed out as explicit leases.
+
+    acquire() leases a buffer and release() hands it back; a buffer is only
+    leased again after it was released. Release a buffer only once neither it
+    nor any view of it is used anymore. Tensors passed on to ComfyUI may be kept
+    alive by its output cache or by downstream nodes for as long as they like,
+    so only temporaries are released, such as the per-image tensors of a batch
+    once they were copied into it. The released buffers of the shapes used
+    least recently are dropped to stay within max_bytes.
+    """
+
+    def __init__(self, max_per_shape=16, max_bytes=DEFAULT_POOL_MB * 1024 * 1024):
+        """
+        Args:
+            max_per_shape: Maximum number of released buffers kept for each shape
+            max_bytes: Byte budget of all released buffers together
+        """
+        self.max_per_shape = max_per_shape
+        self.max_bytes = max_bytes
+        self.allocated = 0
+        self.reused = 0
+        self.pooled_bytes = 0
+        self._free = OrderedDict()  # (shape, dtype) -> released buffers, least recent first
+        self._lock = threading.Lock()
+
+    def acquire(self, shape, dtype=torch.float32):
+        """Lease a buffer of the given shape, reusing a released one if possible."""
+        key = (tuple(shape), dtype)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                self.reused += 1
+                buffer = free.pop()
+                self.pooled_bytes -= buffer.element_size() * buffer.nelement()
+                return buffer
+            self.allocated += 1
+        return torch.empty(key[0], dtype=dtype)
+
+    def release(self, buffer):
+        """
+        Hand a buffer back for reuse.
+
+        Buffers that were not leased from the pool can be released too, as long
+        as nothing else uses them anymore.
+        """
+        key = (tuple(buffer.shape), buffer.dtype)
+        size = buffer.element_size() * buffer.nelement()
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            free = self._free.setdefault(key, [])
+            self._free.move_to_end(key)
+            if (len(free) >= self.max_per_shape
+                    or any(b.data_ptr() == buffer.data_ptr() for b in free)):
+                return
+            free.append(buffer)
+            self.pooled_bytes += size
+
+            # Drop buffers of the least recently released shapes
+            while self.pooled_bytes > self.max_bytes:
+                oldest, buffers = next(iter(self._free.items()))
+                if not buffers:
+                    del self._free[oldest]
+                    continue
+                dropped = buffers.pop(0)
+                self.pooled_bytes -= dropped.element_size() * dropped.nelement()
+
+    def clear(self):
+        """Drop every released buffer."""
+        with self._lock:
+            self._free.clear()
+            self.pooled_bytes = 0
+
+    def stats(self):
+        """Return allocation and reuse counters and the released buffers held."""
+        with self._lock:
+            pooled = sum(len(free) for free in self._free.values())
+            return {
+                "allocated": self.allocated,
+                "reused": self.reused,
+                "pooled": pooled,
+                "bytes": self.pooled_bytes,
+            }
+
+
+_buffer_pool = TensorBufferPool()
+
+
+def get_buffer_pool():
+    """Return the process-wide buffer pool used for the per-image tensors of batches."""
+    return _buffer_pool
+
+
+def pil2tensor(image, pool=None):
+    """
+    Convert a PIL image to a float32 tensor with values in [0.0, 1.0].
+
+    The pixels are viewed as uint8 straight from Pillow's raw bytes and divided
+    into the output buffer in a single pass, so the only full-size float32
+    allocation is the output itself (and none when a pooled buffer is reused).
+
+    Args:
+        image: PIL Image object
+        pool: Optional TensorBufferPool providing the output buffer
+
+    Returns:
+        torch.Tensor: (1, H, W, C) tensor
+    """
+    return array2tensor(np.asarray(image), pool)
+
+
+def array2tensor(array, pool=None):
+    """Convert a uint8 HxW or HxWxC array (e.g. a memory map) like pil2tensor."""
+    if array.ndim == 2:
+        array = array[..., None]
+
+    shape = (1, *array.shape)
+    if pool is not None:
+        output = pool.acquire(shape)
+    else:
+        output = torch.empty(shape, dtype=torch.float32)
+
+    # Same float32 arithmetic as astype(np.float32) / 255.0, without temporaries
+    np.divide(array, np.float32(255.0), out=output.numpy()[0])
+    return output
+
+
+def fit_within(width, height, max_side=0, target_width=0, target_height=0):
+    """
+    Largest size with the same aspect ratio that fits the given limits.
+
+    Limits of 0 are ignored and images are never upscaled.
+
+    Returns:
+        tuple: (width, height) after fitting
+    """
+    scale = 1.0
+    if max_side > 0:
+        scale = min(scale, max_side / max(width, height))
+    if target_width > 0:
+        scale = min(scale, target_width / width)
+    if target_height > 0:
+        scale = min(scale, target_height / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _load_reduced(image, max_side, target_width, target_height):
+    """Decode an opened image at (or just above) the requested size, then resize to it."""
+    # The limits apply to the upright image; rotated photos are stored sideways
+    if read_orientation(image) in (5, 6, 7, 8):
+        target_width, target_height = target_height, target_width
+
+    width, height = fit_within(*image.size, max_side, target_width, target_height)
+    if (width, height) == image.size:
+        image.load()
+        return image
+
+    # JPEG decodes directly at 1/2, 1/4 or 1/8 scale (never below the request);
+    # other formats ignore the draft request
+    image.draft("RGB", (width, height))
+    image.load()
+
+    # Cheap integer box downscale while staying at or above the target size
+    factor = min(image.width // width, image.height // height)
+    if factor >= 2:
+        image = image.reduce(factor)
+    if image.size != (width, height):
+        image = image.resize((width, height), Image.Resampling.LANCZOS)
+    return image
+
+
+def open_image(image_path, max_side=0, target_width=0, target_height=0):
+    """
+    Open an image file and fully decode it as an upright RGB image.
+
+    Args:
+        image_path: Path to the image file or to an archive member
+        max_side: Optional limit for the longest side (0 = full resolution)
+        target_width: Optional width limit (0 = unconstrained)
+        target_height: Optional height limit (0 = unconstrained)
+
+    Returns:
+        PIL.Image.Image: The decoded image with EXIF orientation applied
+
+    Raises:
+        Exception: Whatever PIL raises for unreadable or truncated files
+    """
+    image = Image.open(open_source(image_path))
+    if max_side > 0 or target_width > 0 or target_height > 0:
+        image = _load_reduced(image, max_side, target_width, target_height)
+    else:
+        image.load()
+
+    # Apply EXIF orientation correction (e.g., for photos from phones/cameras)
+    ImageOps.exif_transpose(image, in_place=True)
+
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return image
+
+
+def open_pixels(image_path, max_side=0, target_width=0, target_height=0):
+    """Decode an image like open_image and return its pixels as a uint8 HxWx3 array."""
+    return np.asarray(open_image(image_path, max_side, target_width, target_height))
+
+
+def frame_indices(frame_count, start=0, step=1, max_frames=0):
+    """
+    Pick the frame numbers to load from an animation.
+
+    Args:
+        frame_count: Number of frames in the animation
+        start: First frame to load
+        step: Stride between loaded frames
+        max_frames: Maximum number of frames (0 = until the end)
+
+    Returns:
+        range: The selected frame numbers
+    """
+    indices = range(max(0, start), frame_count, max(1, step))
+    return indices[:max_frames] if max_frames > 0 else indices
+
+
+def _frame_pixels(image, index, max_side=0, target_width=0, target_height=0):
+    """Seek an opened animation to a frame and return it as upright uint8 RGB pixels."""
+    image.seek(index)
+    # convert() composites the frame onto the canvas (palette and transparency included)
+    frame = image.convert("RGB")
+    ImageOps.exif_transpose(frame, in_place=True)
+
+    width, height = fit_within(*frame.size, max_side, target_width, target_height)
+    if (width, height) != frame.size:
+        frame = frame.resize((width, height), Image.Resampling.LANCZOS)
+    return np.asarray(frame)
+
+
+def load_frames(image_path, start=0, step=1, max_frames=0,
+                max_side=0, target_width=0, target_height=0):
+    """
+    Decode selected frames of an animated image into one IMAGE batch.
+
+    Frames are reached with seek(), so frames before start and between the
+    picked ones are never converted, and the output batch is allocated once
+    for the picked frames only. Still images have a single frame 0.
+
+    Args:
+        image_path: Path to the image file or to an archive member
+        start: First frame to load
+        step: Stride between loaded frames
+        max_frames: Maximum number of frames (0 = until the end)
+        max_side, target_width, target_height: Optional size limits (0 = off)
+
+    Returns:
+        tuple: (float32 tensor of shape (frames, H, W, 3), loaded frame numbers,
+        frame count of the animation)
+
+    Raises:
+        ValueError: If start is past the last frame
+    """
+    with Image.open(open_source(image_path)) as image:
+        frame_count = getattr(image, "n_frames", 1)
+        indices = frame_indices(frame_count, start, step, max_frames)
+        if not indices:
+            raise ValueError(f"{image_path} has {frame_count} frames, none from frame {start}")
+
+        batch = None
+        for position, index in enumerate(indices):
+            pixels = _frame_pixels(image, index, max_side, target_width, target_height)
+            if batch is None:
+                batch = torch.empty((len(indices), *pixels.shape), dtype=torch.float32)
+            np.divide(pixels, np.float32(255.0), out=batch.numpy()[position])
+
+    return batch, list(indices), frame_count
+
+
+def decode_with_fallback(image_files, start_index, on_invalid=None, decode=open_image):
+    """
+    Decode image_files[start_index], falling through to the next valid index.
+
+    Args:
+        image_files: List of candidate image paths
+        start_index: Index of the image that was picked
+        on_invalid: Optional callback receiving the path of each corrupt image
+        decode: Function turning a path into the decoded result
+
+    Returns:
+        tuple: (index, result) of the first image that decoded successfully
+
+    Raises:
+        ValueError: If none of the images can be decoded
+    """
+    total = len(image_files)
+    for offset in range(total):
+        index = (start_index + offset) % total
+        try:
+            return index, decode(image_files[index])
+        except Exception as e:
+            print(f"Skipping invalid image {image_files[index]}: {e}")
+            if on_invalid is not None:
+                on_invalid(image_files[index])
+
+    raise ValueError("None of the images could be decoded")
+
+
+def decode_many(image_paths, decode, on_invalid=None, workers=0):
+    """
+    Decode several images in parallel on a thread pool.
+
+    PIL releases the GIL while decoding, so threads decode concurrently.
+
+    Args:
+        image_paths: Paths of the images to decode
+        decode: Function turning a path into the decoded result
+        on_invalid: Optional callback receiving the path of each corrupt image
+        workers: Pool size (0 = one per CPU)
+
+    Returns:
+        list: Decoded results in input order, None for images that failed
+    """
+    def safe_decode(image_path):
+        try:
+            return decode(image_path)
+        except Exception as e:
+            print(f"Skipping invalid image {image_path}: {e}")
+            if on_invalid is not None:
+                on_invalid(image_path)
+            return None
+
+    workers = min(workers or os.cpu_count() or 1, len(image_paths))
+    if workers <= 1:
+        return [safe_decode(image_path) for image_path in image_paths]
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipemind-decode") as pool:
+        return list(pool.map(safe_decode, image_paths))
+
+
+def iter_decoded(image_paths, decode, window=4, on_invalid=None):
+    """
+    Decode images in order while keeping at most `window` decodes in flight.
+
+    Unlike decode_many, the paths are consumed lazily, so only a bounded number
+    of images is ever being decoded (or waiting to be consumed) at once.
+
+    Args:
+        image_paths: Iterable of image paths
+        decode: Function turning a path into the decoded result
+        window: Maximum number of decodes in flight
+        on_invalid: Optional callback receiving the path of each corrupt image
+
+    Yields:
+        tuple: (path, result) in input order, result is None if decoding failed
+    """
+    paths = iter(image_paths)
+    window = max(1, window)
+    with ThreadPoolExecutor(max_workers=window, thread_name_prefix="pipemind-stream") as pool:
+        pending = deque()
+        for image_path in paths:
+            pending.append((image_path, pool.submit(decode, image_path)))
+            if len(pending) >= window:
+                break
+
+        while pending:
+            image_path, future = pending.popleft()
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Skipping invalid image {image_path}: {e}")
+                if on_invalid is not None:
+                    on_invalid(image_path)
+                result = None
+
+            # Refill the window before handing the result over
+            next_path = next(paths, None)
+            if next_path is not None:
+                pending.append((next_path, pool.submit(decode, next_path)))
+            yield image_path, result
+
+
+def _resample(image, height, width):
+    """Resample a (B, C, H, W) tensor to height x width."""
+    return F.interpolate(
+        image, size=(height, width), mode="bilinear", align_corners=False, antialias=True
+    )
+
+
+def fit_image(image, width, height, fit="resize"):
+    """
+    Fit a (1, H, W, C) image tensor to width x height.
+
+    Args:
+        image: Image tensor in ComfyUI's (batch, height, width, channels) layout
+        width: Target width
+        height: Target height
+        fit: One of BATCH_FIT_POLICIES
+
+    Returns:
+        torch.Tensor: The fitted (1, height, width, C) tensor
+    """
+    _, h, w, _ = image.shape
+    if (w, h) == (width, height):
+        return image
+
+    x = image.movedim(-1, 1)
+    if fit == "resize":
+        x = _resample(x, height, width)
+    else:
+        scale = min(width / w, height / h) if fit == "pad" else max(width / w, height / h)
+        new_h = max(1, round(h * scale))
+        new_w = max(1, round(w * scale))
+        x = _resample(x, new_h, new_w)
+        if fit == "pad":
+            new_h, new_w = min(new_h, height), min(new_w, width)
+            top = (height - new_h) // 2
+            left = (width - new_w) // 2
+            x = F.pad(x[:, :, :new_h, :new_w],
+                      (left, width - new_w - left, top, height - new_h - top))
+        else:
+            top = (new_h - height) // 2
+            left = (new_w - width) // 2
+            x = x[:, :, top:top + height, left:left + width]
+    return x.movedim(1, -1)
+
+
+def stack_images(images, fit="resize", size=None):
+    """
+    Stack (1, H, W, C) image tensors into one batch the size of the first image.
+
+    Args:
+        images: Image tensors to stack
+        fit: How images of a different size are fitted (see BATCH_FIT_POLICIES)
+        size: Optional (width, height) of the batch instead of the first image's
+
+    Returns:
+        torch.Tensor: A (N, H, W, C) batch tensor
+    """
+    if size is None:
+        _, height, width, _ = images[0].shape
+    else:
+        width, height = size
+    return torch.cat([fit_image(image, width, height, fit) for image in images], dim=0)
+
+
+class ImagePrefetcher:
+    """
+    Decode upcoming images on a background thread.
+
+    The loader asks for an image with load(); if it was scheduled earlier the
+    ready result is handed over (a hit), otherwise it is decoded synchronously
+    (a miss). Whenever the requested image was not the next one in line (the
+    directory or index changed) all pending work is dropped.
+    """
+
+    def __init__(self, load_fn, depth=2):
+        """
+        Args:
+            load_fn: Function turning an image path into the value to return
+            depth: Maximum number of images decoded ahead (0 disables prefetching)
+        """
+        self.load_fn = load_fn
+        self.depth = depth
+        self.hits = 0
+        self.misses = 0
+        self._pending = OrderedDict()  # path -> Future, in the order they will be used
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @staticmethod
+    def _drop(futures):
+        for future in futures:
+            future.cancel()
+
+    def load(self, image_path):
+        """Return the decoded image for image_path, using prefetched work if possible."""
+        with self._lock:
+            future = self._pending.get(image_path)
+            stale = []
+            # Everything scheduled before the requested image will not be used
+            while self._pending:
+                path, pending = self._pending.popitem(last=False)
+                if path == image_path:
+                    break
+                stale.append(pending)
+            if future is None or future.cancelled():
+                future = None
+                stale.extend(self._pending.values())
+                self._pending.clear()
+                self.misses += 1
+            else:
+                self.hits += 1
+        self._drop(stale)
+
+        if future is None:
+            return self.load_fn(image_path)
+        return future.result()
+
+    def schedule(self, image_paths):
+        """
+        Start decoding the given upcoming images (at most `depth` of them).
+
+        Pending work for images no longer in the list is cancelled.
+        """
+        wanted = list(OrderedDict.fromkeys(image_paths))[:self.depth]
+        with self._lock:
+            if wanted and self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="pipemind-prefetch"
+                )
+            stale = [f for path, f in self._pending.items() if path not in wanted]
+            pending = OrderedDict()
+            for path in wanted:
+                future = self._pending.get(path)
+                if future is None or future.cancelled():
+                    future = self._executor.submit(self.load_fn, path)
+                pending[path] = future
+            self._pending = pending
+        self._drop(stale)
+
+    def reset(self):
+        """Cancel all pending prefetches."""
+        with self._lock:
+            stale = list(self._pending.values())
+            self._pending.clear()
+        self._drop(stale)
+
+    def stats(self):
+        """Return the hit/miss counters and the number of pending decodes."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "pending": len(self._pending)}
@@ -0,0 +1,192 @@
+"""
+Image Metadata - PNG text chunks and metadata filters for the Pipemind batch
+image loaders.
+
+ComfyUI (and PipemindSaveImageWTxt) store the prompt and workflow JSON of a
+render in the tEXt/iTXt chunks of the PNG. Finding the images whose prompt
+mentions something used to mean opening every file with PIL. The chunks are
+read here by walking the chunk headers and seeking over the pixel data, so no
+pixels are ever decompressed; the catalog stores the result per (size, mtime).
+"""
+
+import io
+import os
+import re
+import json
+import struct
+import zlib
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Chunk types carrying text: plain latin-1, compressed latin-1 and international (UTF-8)
+TEXT_CHUNKS = {b"tEXt", b"zTXt", b"iTXt"}
+
+# Text chunks larger than this (after decompression) are skipped
+MAX_TEXT_BYTES = 8 * 1024 * 1024
+
+# Prefixes selecting the kind of filter expression (see compile_text_filter)
+REGEX_PREFIX = "re:"
+JSON_PATH_PREFIX = "$."
+
+_CHUNK_HEADER = struct.Struct(">I4s")
+
+# JSON path filter: "$.<path>" optionally followed by "= value" or "~ pattern"
+_JSON_PATH_FILTER = re.compile(r"\$\.(?P<path>[^=~]+?)\s*(?:(?P<op>[=~])\s*(?P<value>.*))?")
+
+
+def _decompress(data):
+    inflater = zlib.decompressobj()
+    text = inflater.decompress(data, MAX_TEXT_BYTES)
+    if inflater.unconsumed_tail:
+        raise ValueError("text chunk too large")
+    return text
+
+
+def _parse_text_chunk(chunk_type, data):
+    key, _, rest = data.partition(b"\0")
+    key = key.decode("latin-1")
+    if chunk_type == b"tEXt":
+        return key, rest.decode("latin-1")
+    if chunk_type == b"zTXt":
+        # One compression method byte (always zlib), then the compressed text
+        return key, _decompress(rest[1:]).decode("latin-1")
+
+    # iTXt: compression flag, method, language tag, translated keyword, text
+    compressed = rest[:1] == b"\x01"
+    _language, _, rest = rest[2:].partition(b"\0")
+    _translated, _, text = rest.partition(b"\0")
+    if compressed:
+        text = _decompress(text)
+    return key, text.decode("utf-8")
+
+
+def _read_chunks(f):
+    if f.read(len(PNG_SIGNATURE)) != PNG_SIGNATURE:
+        return {}
+
+    text = {}
+    while True:
+        header = f.read(_CHUNK_HEADER.size)
+        if len(header) < _CHUNK_HEADER.size:
+            break
+        length, chunk_type = _CHUNK_HEADER.unpack(header)
+        if chunk_type == b"IEND":
+            break
+        if chunk_type in TEXT_CHUNKS and length <= MAX_TEXT_BYTES:
+            data = f.read(length)
+            f.seek(4, io.SEEK_CUR)  # CRC
+            try:
+                key, value = _parse_text_chunk(chunk_type, data)
+            except (ValueError, zlib.error):
+                continue  # A malformed chunk does not make the image unusable
+            text[key] = value
+        else:
+            # Pixel data and every other chunk are skipped without reading them
+            f.seek(length + 4, io.SEEK_CUR)
+    return text
+
+
+def read_png_text(source):
+    """
+    Read the text chunks of a PNG without decoding its pixels.
+
+    Chunks after the image data (PIL only reports those after a full load) are
+    found too, since the pixel data is skipped with a seek.
+
+    Args:
+        source: Path of the PNG file, or a binary file object
+
+    Returns:
+        dict: Keyword -> text for every tEXt, zTXt and iTXt chunk; empty for
+        files that are not PNGs
+    """
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, "rb") as f:
+            return _read_chunks(f)
+    return _read_chunks(source)
+
+
+def _resolve(value, keys):
+    """Yield every value reached by following keys ("*" matches any) from value."""
+    if not keys:
+        yield value
+        return
+    if isinstance(value, str):
+        # Chunk texts such as "prompt" and "workflow" hold JSON documents
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return
+
+    key, rest = keys[0], keys[1:]
+    if isinstance(value, dict):
+        children = value.values() if key == "*" else [value[key]] if key in value else []
+    elif isinstance(value, list):
+        if key == "*":
+            children = value
+        elif key.lstrip("-").isdigit() and -len(value) <= int(key) < len(value):
+            children = [value[int(key)]]
+        else:
+            children = []
+    else:
+        children = []
+
+    for child in children:
+        yield from _resolve(child, rest)
+
+
+def _as_text(value):
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def compile_text_filter(expression):
+    """
+    Build a predicate over the text metadata of an image.
+
+    Expressions:
+    - "cat": case-insensitive substring of any text chunk
+    - "re:<pattern>": regular expression searched in every text chunk
+    - "$.<key>.<field>...": JSON path into a chunk ("*" matches any field or
+      list item); matches when the path exists, or when a value found there
+      equals ("= value") or matches a regular expression ("~ pattern"), e.g.
+      "$.prompt.*.inputs.text ~ (?i)castle" or "$.prompt.3.inputs.seed = 42"
+
+    Args:
+        expression: The filter text from the node input
+
+    Returns:
+        callable or None: predicate(metadata dict) -> bool, or None for an
+        empty expression
+
+    Raises:
+        ValueError: For an invalid regular expression
+    """
+    expression = (expression or "").strip()
+    if not expression:
+        return None
+
+    def compile_regex(pattern):
+        try:
+            return re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Invalid filter pattern {pattern!r}: {e}") from e
+
+    if expression.startswith(REGEX_PREFIX):
+        regex = compile_regex(expression[len(REGEX_PREFIX):])
+        return lambda metadata: any(regex.search(text) for text in metadata.values())
+
+    match = _JSON_PATH_FILTER.fullmatch(expression)
+    if expression.startswith(JSON_PATH_PREFIX) and match:
+        keys = [key.strip() for key in match["path"].split(".")]
+        op, value = match["op"], (match["value"] or "").strip()
+        regex = compile_regex(value) if op == "~" else None
+
+        def test(found):
+            if op == "~":
+                return regex.search(_as_text(found)) is not None
+            return op is None or _as_text(found) == value
+
+        return lambda metadata: any(test(found) for found in _resolve(metadata, keys))
+
+    needle = expression.casefold()
+    return lambda metadata: any(needle in text.casefold() for text in metadata.values())
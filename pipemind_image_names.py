@@ -0,0 +1,184 @@
+"""
+Image Names - collision-free file name allocation for PipemindSaveImageWTxt.
+
+Finding the next free "<prefix>_<counter>" name used to list the whole target
+folder and parse every file name on every save, which is O(n) per call and
+raced when two workers saved into the same folder at once. Names are now
+claimed by creating the file with O_EXCL, which the OS guarantees only one
+process wins. The next counter per (folder, prefix) is kept in memory and
+persisted in the folder as a hint once per batch, so the folder is only
+scanned the first time a prefix is used there.
+
+The hint is only a starting point and may be stale: processes saving it at
+the same time can overwrite each other's update. A stale hint costs claim() a
+few extra O_EXCL attempts; it never makes two savers share a name.
+"""
+
+import json
+import os
+import threading
+
+# Hint file in each target folder: {prefix: next counter}
+COUNTER_FILE_NAME = ".pipemind_counters.json"
+
+# Digits of the zero-padded counter in a file name
+COUNTER_DIGITS = 5
+
+
+def format_name(prefix, counter, extension=".png"):
+    """Build the file name for a counter, e.g. tag_00042.png."""
+    return f"{prefix}_{counter:0{COUNTER_DIGITS}}{extension}"
+
+
+def scan_next_counter(folder, prefix):
+    """
+    Find the counter after the highest one used by files with the prefix.
+
+    This is the one full scan of a folder, done when no hint exists yet.
+
+    Returns:
+        int: 0 for an empty or missing folder
+    """
+    try:
+        names = os.listdir(folder)
+    except FileNotFoundError:
+        return 0
+
+    counter = 0
+    for name in names:
+        if not name.startswith(prefix):
+            continue
+        try:
+            # The number between the last "_" and the extension
+            counter = max(counter, int(name.rsplit('_', 1)[1].split('.')[0]) + 1)
+        except (ValueError, IndexError):
+            continue
+    return counter
+
+
+class FilenameAllocator:
+    """
+    Hand out unused "<prefix>_<counter><extension>" names in a folder.
+
+    claim() creates the file empty with O_CREAT | O_EXCL, so a name is never
+    given to two savers, in this or any other process sharing the folder; the
+    caller then writes the real content over it. Counters taken by other
+    processes are skipped by trying the next one (after re-reading the hint).
+    Counters are only kept in memory until save_hints() is called.
+    """
+
+    def __init__(self):
+        self._next = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hint_path(folder):
+        return os.path.join(folder, COUNTER_FILE_NAME)
+
+    @staticmethod
+    def _hint_value(hints, prefix):
+        """The hinted counter of prefix, or None if missing or malformed."""
+        counter = hints.get(prefix)
+        if isinstance(counter, int) and not isinstance(counter, bool) and counter >= 0:
+            return counter
+        return None
+
+    def _read_hints(self, folder):
+        try:
+            with open(self._hint_path(folder), "r", encoding="utf-8") as f:
+                hints = json.load(f)
+            return hints if isinstance(hints, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def save_hints(self, folder):
+        """
+        Persist the next counters of folder, e.g. once after a batch was claimed.
+
+        Hints of other prefixes are kept, and hints that are already further
+        along (saved by another process) are not lowered. The read-merge-write
+        is not locked across processes, so a concurrent save may be lost; see
+        the module docstring for why that is harmless.
+        """
+        folder = os.path.abspath(folder)
+        with self._lock:
+            counters = {k[1]: v for k, v in self._next.items() if k[0] == folder}
+        if not counters:
+            return
+
+        hints = self._read_hints(folder)
+        changed = False
+        for prefix, counter in counters.items():
+            if (self._hint_value(hints, prefix) or 0) < counter:
+                hints[prefix] = counter
+                changed = True
+        if not changed:
+            return
+
+        tmp_path = f"{self._hint_path(folder)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(hints, f)
+            os.replace(tmp_path, self._hint_path(folder))
+        except OSError as e:
+            # Only the hint is lost; the next process scans the folder once
+            print(f"Could not store the file counter in {folder}: {e}")
+
+    def _start_counter(self, folder, prefix):
+        counter = self._hint_value(self._read_hints(folder), prefix)
+        if counter is not None:
+            return counter
+        return scan_next_counter(folder, prefix)
+
+    def claim(self, folder, prefix, extension=".png"):
+        """
+        Claim the next free name in folder by creating it.
+
+        Args:
+            folder: Existing target folder
+            prefix: File name prefix
+            extension: Extension of the claimed file
+
+        Returns:
+            tuple: (file_name, counter)
+        """
+        folder = os.path.abspath(folder)
+        key = (folder, prefix)
+        with self._lock:
+            counter = self._next.get(key)
+            if counter is None:
+                counter = self._start_counter(folder, prefix)
+
+            while True:
+                name = format_name(prefix, counter, extension)
+                try:
+                    fd = os.open(
+                        os.path.join(folder, name), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644
+                    )
+                except FileExistsError:
+                    # Taken by another process (or by hand): jump to its hint
+                    hint = self._hint_value(self._read_hints(folder), prefix)
+                    counter = max(counter + 1, hint or 0)
+                    continue
+                os.close(fd)
+                break
+
+            self._next[key] = counter + 1
+        return name, counter
+
+    def forget(self, folder=None):
+        """Drop the in-memory counters (of one folder), e.g. after files were removed."""
+        with self._lock:
+            if folder is None:
+                self._next.clear()
+            else:
+                folder = os.path.abspath(folder)
+                self._next = {k: v for k, v in self._next.items() if k[0] != folder}
+
+
+_allocator = FilenameAllocator()
+
+
+def get_filename_allocator():
+    """Return the process-wide allocator shared by all save nodes."""
+    return _allocator
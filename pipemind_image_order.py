@@ -0,0 +1,69 @@
+"""
+Image Order - seeded visiting orders for the Pipemind batch image loaders.
+
+Shuffled mode visits every image exactly once per epoch in a pseudo-random
+order. Instead of materializing and storing a shuffled list (which for millions
+of files costs memory and has to be kept in sync with the directory), the order
+is a bijection on range(count) computed on demand: a small Feistel network over
+the next power-of-two domain, with cycle-walking to stay inside range(count).
+Each (seed, epoch) pair gives a different, reproducible order.
+"""
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(value):
+    """SplitMix64 finalizer: a fast, well-distributed 64-bit integer hash."""
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+class IndexPermutation:
+    """
+    Pseudo-random bijection on range(count) that needs O(1) memory.
+
+    permutation[position] gives the index visited at that position; every
+    index appears exactly once over positions 0..count-1.
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, count, seed=0, epoch=0):
+        """
+        Args:
+            count: Number of items to permute
+            seed: User seed selecting the family of orders
+            epoch: Epoch number; each epoch gets its own order
+        """
+        self.count = count
+        # Split the smallest even-width power-of-two domain covering count into
+        # two halves, so cycle-walking needs fewer than four steps on average
+        bits = max(2, (max(count, 1) - 1).bit_length())
+        bits += bits % 2
+        self._half_bits = bits // 2
+        self._half_mask = (1 << self._half_bits) - 1
+
+        base = _mix64(_mix64(seed & _MASK64) ^ (epoch & _MASK64))
+        self._keys = [_mix64(base + round_index) for round_index in range(self.ROUNDS)]
+
+    def __len__(self):
+        return self.count
+
+    def _encrypt(self, value):
+        left = value >> self._half_bits
+        right = value & self._half_mask
+        for key in self._keys:
+            left, right = right, left ^ (_mix64(right ^ key) & self._half_mask)
+        return (left << self._half_bits) | right
+
+    def __getitem__(self, position):
+        if not 0 <= position < self.count:
+            raise IndexError(f"position {position} out of range for {self.count} items")
+
+        # Cycle-walk: re-encrypt until the value lands inside range(count)
+        value = self._encrypt(position)
+        while value >= self.count:
+            value = self._encrypt(value)
+        return value
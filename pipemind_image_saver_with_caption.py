@@ -1,9 +1,6 @@
 
 import os
 import json
-import numpy as np
-from PIL import Image
-from PIL.PngImagePlugin import PngInfo
 import sys
 
 # Add ComfyUI folder to path if needed
@@ -13,13 +10,36 @@ if comfy_path not in sys.path:
 
 import folder_paths
 
+try:
+    from .pipemind_image_names import get_filename_allocator
+    from .pipemind_image_writer import (
+        FORMAT_EXTENSIONS, PROFILE_NAMES, SAVE_FORMATS, SaveErrors, SaveStats, describe_options,
+        format_errors, format_stats, get_image_writer, images_to_uint8, resolve_save_options,
+        write_image, write_many,
+    )
+except ImportError:
+    from pipemind_image_names import get_filename_allocator
+    from pipemind_image_writer import (
+        FORMAT_EXTENSIONS, PROFILE_NAMES, SAVE_FORMATS, SaveErrors, SaveStats, describe_options,
+        format_errors, format_stats, get_image_writer, images_to_uint8, resolve_save_options,
+        write_image, write_many,
+    )
+
+# How images are written:
+# - "sync": encode and write on the executor thread before returning
+# - "async": hand the images to a bounded background writer pool and return at once
+SAVE_MODES = ["sync", "async"]
+
 
 class PipemindSaveImageWTxt:
     def __init__(self):
         self.type = "output"
         self.prefix_append = ""
-        self.compress_level = 4
         self.output_dir = folder_paths.get_output_directory()
+        # Size and encode time of async saves, reported on the next execution
+        self.background_stats = SaveStats()
+        # Async saves of this node that failed, reported on the next execution
+        self.background_errors = SaveErrors()
 
     @classmethod
     def INPUT_TYPES(s):
@@ -33,6 +53,18 @@ class PipemindSaveImageWTxt:
                 "caption_file_extension": ("STRING",
                                            {"default": ".txt", "tooltip": "The extension for the caption file."}),
                 "caption": ("STRING", {"forceInput": True, "tooltip": "string to save as .txt file"}),
+                "save_mode": (SAVE_MODES, {"default": "sync",
+                                           "tooltip": "Write in the background and return immediately (async)."}),
+                "workers": ("INT", {"default": 0, "min": 0, "max": 64,
+                                    "tooltip": "Threads encoding a batch in sync mode (0 = one per CPU)."}),
+                "profile": (PROFILE_NAMES, {"default": "custom",
+                                            "tooltip": "Preset trading speed for size; custom uses the inputs below."}),
+                "save_format": (SAVE_FORMATS, {"default": "png",
+                                               "tooltip": "File format (npy = raw array, no metadata)."}),
+                "compress_level": ("INT", {"default": 4, "min": 0, "max": 9,
+                                           "tooltip": "PNG level / lossless WebP effort (9 is very slow for WebP)."}),
+                "quality": ("INT", {"default": 90, "min": 1, "max": 100,
+                                    "tooltip": "Quality of lossy WebP and JPEG."}),
             },
             "hidden": {
                 "prompt": "PROMPT", "extra_pnginfo": "EXTRA_PNGINFO"
@@ -48,25 +80,15 @@ class PipemindSaveImageWTxt:
     CATEGORY = "Pipemind/image"
     DESCRIPTION = "Saves images with optional text files."
 
-    def count_existing_images(self, path, filename_prefix):
-        """Count existing images in the directory with the given prefix."""
-        if not os.path.exists(path):
-            return 0
-
-        count = 0
-        for filename in os.listdir(path):
-            if filename.startswith(filename_prefix) and filename.endswith('.png'):
-                try:
-                    # Extract the number from the filename
-                    number = int(filename.rsplit('_', 1)[1].split('.')[0])
-                    count = max(count, number + 1)
-                except (ValueError, IndexError):
-                    continue
-        return count
-
     def save_images(self, images, output_path, filename_prefix="tag", prompt=None, extra_pnginfo=None, caption=None,
-                    caption_file_extension=".txt"):
+                    caption_file_extension=".txt", save_mode="sync", workers=0, profile="custom",
+                    save_format="png", compress_level=4, quality=90):
         try:
+            options = resolve_save_options(profile, save_format, compress_level, quality)
+            label = describe_options(options)
+            if profile != "custom":
+                label = f"{profile} ({label})"
+
             # Handle output path
             if os.path.isabs(output_path):
                 full_path = output_path
@@ -79,40 +101,49 @@ class PipemindSaveImageWTxt:
             # Create directory if it doesn't exist
             os.makedirs(full_path, exist_ok=True)
 
-            # Get the starting counter value based on existing files
-            counter = self.count_existing_images(full_path, filename_prefix)
+            # Prepare metadata (PNG text chunks or EXIF, depending on the format)
+            metadata = {}
+            if prompt is not None:
+                metadata["prompt"] = json.dumps(prompt)
+            if extra_pnginfo is not None:
+                for x in extra_pnginfo:
+                    metadata[x] = json.dumps(extra_pnginfo[x])
 
             results = list()
-            for image in images:
-                i = 255. * image.cpu().numpy()
-                img = Image.fromarray(np.clip(i, 0, 255).astype(np.uint8))
-
-                # Prepare metadata
-                metadata = PngInfo() if prompt is not None or extra_pnginfo is not None else None
-                if metadata:
-                    if prompt is not None:
-                        metadata.add_text("prompt", json.dumps(prompt))
-                    if extra_pnginfo is not None:
-                        for x in extra_pnginfo:
-                            metadata.add_text(x, json.dumps(extra_pnginfo[x]))
-
-                # Create filenames
-                base_file_name = f"{filename_prefix}_{counter:05}"
-                file = f"{base_file_name}.png"
+            jobs = list()
+            sync_stats = SaveStats()
+            # Returned as is for an empty batch
+            file = ""
+            # One conversion and host transfer for the batch; frames are views into it
+            for pixels in images_to_uint8(images):
+                # Claim the next free filename (created empty, so no other saver
+                # in this or another process can take it)
+                file, counter = get_filename_allocator().claim(
+                    full_path, filename_prefix, FORMAT_EXTENSIONS[options.format]
+                )
+                base_file_name = os.path.splitext(file)[0]
                 file_path = os.path.join(full_path, file)
 
-                # Save image
-                img.save(file_path, pnginfo=metadata, compress_level=self.compress_level)
-
-                # Save caption if provided
+                # Caption file if provided
+                txt_path = None
                 if caption is not None:
                     txt_file = base_file_name + caption_file_extension
                     txt_path = os.path.join(full_path, txt_file)
-                    with open(txt_path, 'w', encoding='utf-8') as f:
-                        f.write(caption)
 
-                print(f"Saved: {file} (counter: {counter})")
-                counter += 1
+                # Save image and caption
+                if save_mode == "async":
+                    # Blocks while the writer queue is full
+                    get_image_writer().submit(
+                        file_path, write_image,
+                        pixels, file_path, metadata, options, txt_path, caption,
+                        self.background_stats, label,
+                        errors=self.background_errors,
+                    )
+                    print(f"Queued: {file} (counter: {counter})")
+                else:
+                    # Encoded together below; names are already claimed in batch order
+                    jobs.append((pixels, file_path, metadata, options, txt_path, caption,
+                                 sync_stats, label))
 
                 results.append({
                     "filename": file,
@@ -120,7 +151,31 @@ class PipemindSaveImageWTxt:
                     "type": self.type
                 })
 
-            return file,
+            # Persist the next counter once per batch (a hint for other processes)
+            if results:
+                get_filename_allocator().save_hints(full_path)
+
+            # Sync mode: encode and write the batch on a thread pool (zlib releases the GIL)
+            if jobs:
+                write_many(jobs, workers=workers)
+                for result in results:
+                    print(f"Saved: {result['filename']}")
+
+            # Encode time and size, shown on the node
+            report = format_stats(sync_stats.take())
+            if save_mode == "async":
+                report = f"Queued {len(results)} image(s) as {label}"
+            background = format_stats(self.background_stats.take())
+            if background:
+                report += f"\nBackground saves since the last run:\n{background}"
+            # Failed async saves of this node, shown here instead of failing this run
+            failures = self.background_errors.take()
+            if failures:
+                report += (f"\nFailed background saves since the last run ({len(failures)}):\n"
+                           f"{format_errors(failures)}")
+            print(report)
+
+            return {"ui": {"text": [report]}, "result": (file,)}
 
         except Exception as e:
             print(f"Error in save_images: {str(e)}")
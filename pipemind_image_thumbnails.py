@@ -0,0 +1,272 @@
+"""
+Image Thumbnails - on-disk thumbnail cache and preview route for the Pipemind
+batch image loaders.
+
+Browsing a folder in single mode by changing image_index used to decode every
+picked file at full resolution just to see what it is. Thumbnails (256px WebP)
+are stored once per (path, mtime, size), so an edited file gets a new one, and
+are built on a background thread in the order the images are likely to be
+picked next. The loaders' preview mode returns them, and the
+/pipemind/thumbnail route serves them to the frontend without running a prompt.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+from collections import deque
+import numpy as np  # NumPy for array operations
+from PIL import Image  # Pillow for image processing
+
+try:
+    from .pipemind_image_archive import source_stat, split_member_path
+    from .pipemind_image_catalog import get_catalog, is_image_file
+    from .pipemind_image_decode import open_image
+except ImportError:
+    from pipemind_image_archive import source_stat, split_member_path
+    from pipemind_image_catalog import get_catalog, is_image_file
+    from pipemind_image_decode import open_image
+
+# Longest side of a thumbnail
+THUMBNAIL_SIZE = 256
+
+# Thumbnails are lossy WebP: a few KB each, decoded in well under a millisecond
+THUMBNAIL_QUALITY = 80
+
+# Where thumbnails are stored (one subfolder per leading hash byte)
+THUMBNAIL_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "cache", "thumbnails"
+)
+
+# Route serving thumbnails: ?type=input|output and either filename=<relative
+# path> or directory=<relative folder>&index=<n>; any other parameters are the
+# loader node's listing inputs (sort, filters, ...), so index picks the same
+# image the node would load
+THUMBNAIL_ROUTE = "/pipemind/thumbnail"
+
+# Query parameters that are not listing inputs
+ROUTE_PARAMETERS = ("type", "filename", "directory", "index")
+
+
+class ThumbnailCache:
+    """
+    Persistent cache of small WebP previews, built on demand or in the background.
+
+    The file name of a thumbnail hashes the source path, mtime and size, so
+    looking one up costs a stat of the source and of the thumbnail; there is
+    no manifest to keep in sync. Thumbnails of replaced files are simply no
+    longer used.
+    """
+
+    def __init__(self, root=THUMBNAIL_DIR, size=THUMBNAIL_SIZE):
+        """
+        Args:
+            root: Directory holding the thumbnails
+            size: Longest side of a thumbnail
+        """
+        self.root = root
+        self.size = size
+        self.built = 0
+        self.failed = 0
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, image_path, stat=None):
+        """Where the thumbnail of the current version of image_path is stored."""
+        image_path = os.path.abspath(image_path)
+        st = stat or source_stat(image_path)
+        digest = hashlib.sha1(
+            f"{image_path}\0{st.st_mtime_ns}\0{st.st_size}\0{self.size}".encode("utf-8")
+        ).hexdigest()
+        return os.path.join(self.root, digest[:2], digest + ".webp")
+
+    def make(self, image_path):
+        """
+        Return the thumbnail file of image_path, creating it if needed.
+
+        Raises:
+            Exception: Whatever PIL raises for unreadable images
+        """
+        thumbnail_path = self.path(image_path)
+        if os.path.exists(thumbnail_path):
+            return thumbnail_path
+
+        # Reduced decoding (JPEG draft mode, Image.reduce) keeps this cheap
+        image = open_image(image_path, max_side=self.size)
+        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+        # Write to a temporary file first so readers never see a partial thumbnail
+        tmp_path = f"{thumbnail_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        image.save(tmp_path, format="WEBP", quality=THUMBNAIL_QUALITY)
+        os.replace(tmp_path, thumbnail_path)
+        return thumbnail_path
+
+    def load(self, image_path):
+        """Return the thumbnail of image_path as uint8 HxWx3 pixels."""
+        with Image.open(self.make(image_path)) as thumbnail:
+            return np.asarray(thumbnail.convert("RGB"))
+
+    def _build(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                image_path = self._queue.popleft()
+            try:
+                self.make(image_path)
+                self.built += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Could not create thumbnail for {image_path}: {e}")
+
+    def schedule(self, image_paths):
+        """
+        Build the thumbnails of image_paths in the background, in the given order.
+
+        Replaces whatever was still queued, so the images the user is most
+        likely to pick next come first; existing thumbnails are skipped.
+        """
+        with self._condition:
+            self._queue = deque(image_paths)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._build, name="pipemind-thumbnails", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def pending(self):
+        """Number of images still queued for a thumbnail."""
+        with self._condition:
+            return len(self._queue)
+
+    def stats(self):
+        """Return build counters plus the queue length."""
+        return {"built": self.built, "failed": self.failed, "pending": self.pending()}
+
+
+_thumbnail_cache = None
+_thumbnail_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache():
+    """Return the process-wide thumbnail cache, or None if its folder is not writable."""
+    global _thumbnail_cache
+    with _thumbnail_cache_lock:
+        if _thumbnail_cache is None:
+            try:
+                _thumbnail_cache = ThumbnailCache()
+            except OSError as e:
+                print(f"Could not open thumbnail cache at {THUMBNAIL_DIR}: {e}")
+                return None
+        return _thumbnail_cache
+
+
+# (base folder, listing function) the route may serve from, by its "type" parameter
+_roots = {}
+_routes_registered = False
+
+
+def resolve_image(root, filename="", directory="", index=0, listing=None):
+    """
+    Resolve a thumbnail request to an image path inside a registered base folder.
+
+    Args:
+        root: Name of the base folder ("input" or "output")
+        filename: Image path relative to the base folder (may be an archive member)
+        directory: Alternatively, a folder relative to the base folder ...
+        index: ... and the index of the image in its listing
+        listing: Listing inputs of the node (strings, as sent by the frontend),
+            passed to the function registered with the base folder
+
+    Returns:
+        str: The absolute image path
+
+    Raises:
+        ValueError: For unknown roots, paths outside the base folder or non-images
+        FileNotFoundError: If the image does not exist
+    """
+    if root not in _roots:
+        raise ValueError(f"Unknown image folder type: {root}")
+    base_dir, list_images = _roots[root]
+
+    if not filename:
+        folder = os.path.abspath(os.path.join(base_dir, directory))
+        if os.path.commonpath([base_dir, folder]) != base_dir:
+            raise ValueError(f"Folder outside of the {root} folder: {directory}")
+        if list_images is None:
+            image_files = get_catalog().get_image_files(folder, "none")
+        else:
+            image_files = list_images(folder, listing or {})
+        if not 0 <= index < len(image_files):
+            raise FileNotFoundError(f"No image {index} in {directory}")
+        return image_files[index]
+
+    image_path = os.path.abspath(os.path.join(base_dir, filename))
+    file_path, member = split_member_path(image_path)
+    if os.path.commonpath([base_dir, file_path]) != base_dir:
+        raise ValueError(f"Path outside of the {root} folder: {filename}")
+    if not is_image_file(member or file_path):
+        raise ValueError(f"Not an image: {filename}")
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(filename)
+    return image_path
+
+
+async def thumbnail_route(request):
+    """Serve the thumbnail of an input or output image (see THUMBNAIL_ROUTE)."""
+    from aiohttp import web
+
+    query = request.query
+    cache = get_thumbnail_cache()
+    if cache is None:
+        return web.Response(status=503, text="Thumbnail cache unavailable")
+
+    def make():
+        image_path = resolve_image(
+            query.get("type", "input"), query.get("filename", ""),
+            query.get("directory", ""), int(query.get("index", 0)),
+            {key: value for key, value in query.items() if key not in ROUTE_PARAMETERS},
+        )
+        return cache.make(image_path)
+
+    # Listing and decoding run off the event loop, so the UI stays responsive
+    try:
+        thumbnail_path = await asyncio.get_running_loop().run_in_executor(None, make)
+    except FileNotFoundError as e:
+        return web.Response(status=404, text=str(e))
+    except ValueError as e:
+        return web.Response(status=400, text=str(e))
+    except Exception as e:
+        return web.Response(status=415, text=f"Could not read image: {e}")
+
+    # The URL does not change when the image does, so let the browser revalidate
+    return web.FileResponse(thumbnail_path, headers={"Cache-Control": "no-cache"})
+
+
+def register_root(name, base_dir, list_images=None):
+    """
+    Let the thumbnail route serve images below base_dir as ?type=name.
+
+    list_images(folder, listing) returns the images of a folder as the loader
+    node lists them for its listing inputs; without it, folders are listed
+    unfiltered by path.
+
+    The route itself is registered with the ComfyUI server on the first call;
+    outside ComfyUI (e.g. in tests) only the folder is remembered.
+    """
+    global _routes_registered
+    _roots[name] = (os.path.abspath(base_dir), list_images)
+    if _routes_registered:
+        return
+
+    try:
+        from server import PromptServer
+    except ImportError:
+        return
+    if getattr(PromptServer, "instance", None) is None:
+        return
+    PromptServer.instance.routes.get(THUMBNAIL_ROUTE)(thumbnail_route)
+    _routes_registered = True
@@ -0,0 +1,432 @@
+"""
+Image Writer - bounded background writer pool for PipemindSaveImageWTxt.
+
+Saving used to PNG-encode and write every image on the executor thread, so the
+next prompt could not start sampling until the disk had caught up. In async
+mode the save node hands each image to this pool and returns its file name
+right away. The pool holds a limited number of pending saves: once it is full,
+submitting blocks until a save finishes (backpressure), so a fast sampler
+cannot queue up unbounded amounts of image memory. Failures are collected per
+save node (SaveErrors) and shown by that node on its next execution, and
+pending saves are flushed
+when the interpreter exits. In sync mode write_many() encodes the images of a
+batch on a short-lived thread pool instead of one after another.
+
+Images are written as PNG, lossless or lossy WebP, JPEG or raw .npy arrays
+(SaveOptions), chosen directly or through the named SAVE_PROFILES. Encode
+time and file size are collected per format in SaveStats for the node UI.
+"""
+
+import atexit
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np  # NumPy for array operations
+import torch  # PyTorch for tensor operations
+from PIL import Image  # Pillow for image processing
+from PIL.PngImagePlugin import PngInfo
+
+# Threads encoding and writing images (PNG encoding releases the GIL)
+DEFAULT_WRITER_WORKERS = 2
+
+# Saves accepted before submit() blocks
+DEFAULT_MAX_PENDING = 16
+
+# Output formats:
+# - "png": lossless, zlib compress_level 0-9, metadata as text chunks
+# - "webp-lossless": lossless, compress_level is the encoder effort, metadata as EXIF
+# - "webp" / "jpeg": lossy with the given quality, metadata as EXIF
+# - "npy": raw uint8 array for intermediate dumps, no metadata (not listed by the loaders)
+SAVE_FORMATS = ["png", "webp-lossless", "webp", "jpeg", "npy"]
+
+FORMAT_EXTENSIONS = {
+    "png": ".png",
+    "webp-lossless": ".webp",
+    "webp": ".webp",
+    "jpeg": ".jpg",
+    "npy": ".npy",
+}
+
+# JPEG stores EXIF in one APP1 segment, which is limited to 64 KB
+JPEG_MAX_EXIF = 65533
+
+# How an image is encoded
+SaveOptions = namedtuple("SaveOptions", ["format", "compress_level", "quality"])
+
+# Named lossless presets; "custom" uses the node's format inputs. Measured on a
+# 768x768 image: fastest ~110 ms / 1.1 MB, balanced ~200 ms / 1.0 MB, smallest
+# ~450 ms / 0.9 MB (WebP effort 9 took 30 s for the same size, so it is not used)
+SAVE_PROFILES = {
+    "fastest": SaveOptions("png", 1, 90),
+    "balanced": SaveOptions("png", 4, 90),
+    "smallest": SaveOptions("webp-lossless", 6, 90),
+}
+
+PROFILE_NAMES = ["custom"] + list(SAVE_PROFILES)
+
+
+def resolve_save_options(profile="custom", save_format="png", compress_level=4, quality=90):
+    """Return the SaveOptions of a profile, or of the given inputs for "custom"."""
+    if profile in SAVE_PROFILES:
+        return SAVE_PROFILES[profile]
+    if save_format not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Unknown save format: {save_format}")
+    return SaveOptions(save_format, compress_level, quality)
+
+
+def describe_options(options):
+    """Short human-readable form of SaveOptions, e.g. "png level 4"."""
+    if options.format == "png":
+        return f"png level {options.compress_level}"
+    if options.format == "webp-lossless":
+        return f"webp-lossless effort {options.compress_level}"
+    if options.format == "npy":
+        return "npy"
+    return f"{options.format} quality {options.quality}"
+
+
+def build_exif(metadata):
+    """
+    Store metadata texts as EXIF the way ComfyUI's WebP saver does.
+
+    The prompt goes into Model (0x0110) as "prompt:<json>", other entries
+    into Make (0x010f) and the tags below it as "<key>:<json>".
+    """
+    exif = Image.Exif()
+    tag = 0x010f
+    for key, text in metadata.items():
+        if key == "prompt":
+            exif[0x0110] = f"prompt:{text}"
+        else:
+            exif[tag] = f"{key}:{text}"
+            tag -= 1
+    return exif.tobytes()
+
+
+def encode_image(pixels, path, metadata, options):
+    """
+    Encode uint8 HxWxC pixels to path in the format of options.
+
+    Args:
+        pixels: Image pixels
+        path: Where to write (the extension is not used to pick the format)
+        metadata: Dict of metadata name to text (JSON), or None
+        options: SaveOptions
+    """
+    if options.format == "npy":
+        with open(path, "wb") as f:
+            np.save(f, pixels)
+        return
+
+    img = Image.fromarray(pixels)
+    if options.format == "png":
+        pnginfo = None
+        if metadata:
+            pnginfo = PngInfo()
+            for key, text in metadata.items():
+                pnginfo.add_text(key, text)
+        img.save(path, format="PNG", pnginfo=pnginfo, compress_level=options.compress_level)
+        return
+
+    exif = build_exif(metadata) if metadata else b""
+    if options.format == "webp-lossless":
+        # For lossless WebP, quality is the compression effort
+        level = options.compress_level
+        img.save(path, format="WEBP", lossless=True, exif=exif,
+                 method=round(level * 6 / 9), quality=round(level * 100 / 9))
+    elif options.format == "webp":
+        img.save(path, format="WEBP", quality=options.quality, exif=exif)
+    elif options.format == "jpeg":
+        if len(exif) > JPEG_MAX_EXIF:
+            print(f"Metadata too large for JPEG EXIF ({len(exif)} bytes), not embedded")
+            exif = b""
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.save(path, format="JPEG", quality=options.quality, exif=exif)
+    else:
+        raise ValueError(f"Unknown save format: {options.format}")
+
+
+class SaveStats:
+    """Count, total size and total encode time of writes, per label."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def add(self, label, size, seconds):
+        """Record one written file."""
+        with self._lock:
+            count, total_size, total_seconds = self._totals.get(label, (0, 0, 0.0))
+            self._totals[label] = (count + 1, total_size + size, total_seconds + seconds)
+
+    def take(self):
+        """Return {label: (count, bytes, seconds)} recorded since the last call."""
+        with self._lock:
+            totals, self._totals = self._totals, {}
+        return totals
+
+
+class SaveErrors:
+    """Failed background saves of one save node, until it reports them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._errors = []
+
+    def add(self, label, error):
+        """Record one failed save."""
+        with self._lock:
+            self._errors.append((label, error))
+
+    def take(self):
+        """Return the (label, exception) of every failure recorded since the last call."""
+        with self._lock:
+            errors, self._errors = self._errors, []
+        return errors
+
+
+def format_errors(errors, limit=10):
+    """Render SaveErrors failures as one line each, at most limit of them."""
+    lines = [f"{label}: {error}" for label, error in errors[:limit]]
+    if len(errors) > limit:
+        lines.append(f"... and {len(errors) - limit} more")
+    return "\n".join(lines)
+
+
+def format_stats(totals):
+    """Render SaveStats totals as one line per label."""
+    lines = []
+    for label, (count, size, seconds) in totals.items():
+        lines.append(
+            f"{label}: {count} image(s), {size / count / 1024:.0f} KB and "
+            f"{seconds / count * 1000:.0f} ms per image, {size / 1024 / 1024:.1f} MB total"
+        )
+    return "\n".join(lines)
+
+
+class BackgroundWriter:
+    """Run save jobs on a thread pool with a bounded number of pending jobs."""
+
+    def __init__(self, workers=DEFAULT_WRITER_WORKERS, max_pending=DEFAULT_MAX_PENDING):
+        """
+        Args:
+            workers: Number of writer threads
+            max_pending: Jobs queued or running before submit() blocks
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.written = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._errors = []
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="pipemind-writer"
+        )
+
+    def submit(self, label, job, *args, errors=None):
+        """
+        Queue job(*args), blocking while max_pending jobs are outstanding.
+
+        Args:
+            label: What the job writes (e.g. the file name), used in error reports
+            job: Function doing the encoding and writing
+            errors: Optional SaveErrors of the submitting node receiving a
+                failure (default: the writer's own list, see take_errors)
+        """
+        self._slots.acquire()
+        with self._lock:
+            self._pending += 1
+        try:
+            self._executor.submit(self._run, label, job, args, errors)
+        except BaseException:
+            self._finish()
+            raise
+
+    def _run(self, label, job, args, errors):
+        try:
+            job(*args)
+            with self._lock:
+                self.written += 1
+        except Exception as e:
+            print(f"Background save of {label} failed: {e}")
+            if errors is not None:
+                errors.add(label, e)
+            else:
+                with self._lock:
+                    self._errors.append((label, e))
+        finally:
+            self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.notify_all()
+        self._slots.release()
+
+    def pending(self):
+        """Number of jobs queued or running."""
+        with self._lock:
+            return self._pending
+
+    def take_errors(self):
+        """Return the (label, exception) of every failed job submitted without errors since the last call."""
+        with self._lock:
+            errors, self._errors = self._errors, []
+        return errors
+
+    def flush(self, timeout=None):
+        """
+        Wait until every submitted job has finished.
+
+        Returns:
+            bool: False if the timeout expired first
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def shutdown(self):
+        """Finish the pending jobs and stop the writer threads."""
+        self.flush()
+        self._executor.shutdown(wait=True)
+
+
+def write_atomic(file_path, write):
+    """
+    Write a file through a temporary name, so readers never see a partial file.
+
+    Args:
+        file_path: Final path of the file
+        write: Function writing the content to the path it is given
+    """
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def images_to_uint8(images):
+    """
+    Convert a whole IMAGE batch (BxHxWxC floats in 0..1) to rounded uint8 pixels.
+
+    The result is allocated once for the batch and indexing it gives each
+    frame as a view, so no per-frame arrays are created. GPU batches are
+    scaled, clamped and rounded on the device and copied to the host once, as
+    uint8. CPU batches are processed frame by frame through a single reused
+    float32 buffer: three passes over a cache-sized frame beat three passes
+    over a batch-sized temporary.
+
+    Returns:
+        numpy.ndarray: Contiguous BxHxWxC uint8 array
+    """
+    images = images.detach()
+    if images.device.type != "cpu":
+        pixels = images.mul(255.0).clamp_(0, 255).round_().to(torch.uint8)
+        return pixels.cpu().contiguous().numpy()
+
+    # NumPy has no bfloat16
+    frames = (images.float() if images.dtype == torch.bfloat16 else images).numpy()
+    pixels = np.empty(frames.shape, dtype=np.uint8)
+    scaled = np.empty(frames.shape[1:], dtype=np.float32)
+    for i, frame in enumerate(frames):
+        np.multiply(frame, 255.0, out=scaled, casting="same_kind")
+        np.clip(scaled, 0, 255, out=scaled)
+        np.rint(scaled, out=scaled)
+        pixels[i] = scaled
+    return pixels
+
+
+def write_image(pixels, file_path, metadata, options, caption_path=None, caption=None,
+                stats=None, label=None):
+    """
+    Encode pixels and write them over their claimed (empty) file, then the caption.
+
+    Args:
+        pixels: uint8 HxWxC pixels
+        file_path: Final path of the image
+        metadata: Dict of metadata name to text (JSON), or None
+        options: SaveOptions
+        caption_path: Where to write caption, if given
+        stats: Optional SaveStats recording size and encode time under label
+    """
+    start = time.perf_counter()
+    try:
+        write_atomic(file_path, lambda path: encode_image(pixels, path, metadata, options))
+    except BaseException:
+        # Don't leave the empty placeholder of the claimed name behind
+        if os.path.exists(file_path) and os.path.getsize(file_path) == 0:
+            os.remove(file_path)
+        raise
+    if stats is not None:
+        stats.add(label or describe_options(options), os.path.getsize(file_path),
+                  time.perf_counter() - start)
+
+    if caption_path is not None:
+        with open(caption_path, 'w', encoding='utf-8') as f:
+            f.write(caption)
+
+
+def write_many(jobs, write=write_image, workers=0):
+    """
+    Run several writes in parallel on a thread pool.
+
+    zlib releases the GIL while compressing, so PNG encoding scales with threads.
+    Every job runs even if an earlier one fails; the file names were claimed
+    beforehand, so the order of completion does not matter.
+
+    Args:
+        jobs: Argument tuples for write
+        write: Function doing the encoding and writing
+        workers: Pool size (0 = one per CPU)
+
+    Raises:
+        Exception: The first failure, in job order, after all jobs have finished
+    """
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        errors = []
+        for args in jobs:
+            try:
+                write(*args)
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipemind-encode") as pool:
+        futures = [pool.submit(write, *args) for args in jobs]
+    for future in futures:
+        future.result()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_image_writer():
+    """Return the process-wide background writer shared by all save nodes."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BackgroundWriter()
+        return _writer
+
+
+@atexit.register
+def flush_image_writer():
+    """Write out pending saves before the interpreter exits."""
+    with _writer_lock:
+        writer = _writer
+    if writer is not None and writer.pending():
+        print(f"Waiting for {writer.pending()} background image saves...")
+        writer.flush()
@@ -1,3 +1,12 @@
+# Preset dimensions in landscape orientation (optimized for Qwen-Image, official resolutions)
+PRESETS = {
+    "1:1 (1328x1328)": (1328, 1328),
+    "16:9 (1664x928)": (1664, 928),
+    "4:3 (1472x1140)": (1472, 1140),
+    "3:2 (1584x1056)": (1584, 1056),
+}
+
+
 class PipemindQwenAspectRatio:
     @classmethod
     def INPUT_TYPES(cls):
@@ -24,18 +33,10 @@ class PipemindQwenAspectRatio:
     CATEGORY = "Pipemind/Resolution"
 
     def select_resolution(self, mode, preset, manual_width, manual_height):
-        # Preset dimensions (optimized for Qwen-Image, official resolutions)
-        presets = {
-            "1:1 (1328x1328)": (1328, 1328),
-            "16:9 (1664x928)": (1664, 928),
-            "4:3 (1472x1140)": (1472, 1140),
-            "3:2 (1584x1056)": (1584, 1056),
-        }
-
         if preset == "Manual" or mode == "Manual":
             width, height = manual_width, manual_height
         else:
-            width, height = presets.get(preset, (1328, 1328))
+            width, height = PRESETS.get(preset, (1328, 1328))
             if mode == "Portrait":
                 width, height = height, width  # Swap for portrait mode
 
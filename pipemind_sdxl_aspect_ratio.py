@@ -1,3 +1,13 @@
+# Preset dimensions in landscape orientation (optimized for SDXL 1.5, maintaining aspect ratios)
+PRESETS = {
+    "1:1 (1024x1024)": (1024, 1024),
+    "3:2 (1216x832)": (1216, 832),
+    "4:3 (1152x896)": (1152, 896),
+    "16:9 (1344x768)": (1344, 768),
+    "2:1 (1280x640)": (1280, 640),
+}
+
+
 class PipemindSDXL15AspectRatio:
     @classmethod
     def INPUT_TYPES(cls):
@@ -25,19 +35,10 @@ class PipemindSDXL15AspectRatio:
     CATEGORY = "Pipemind/Resolution"
 
     def select_resolution(self, mode, preset, manual_width, manual_height):
-        # Preset dimensions (optimized for SDXL 1.5, maintaining aspect ratios)
-        presets = {
-            "1:1 (1024x1024)": (1024, 1024),
-            "3:2 (1216x832)": (1216, 832),
-            "4:3 (1152x896)": (1152, 896),
-            "16:9 (1344x768)": (1344, 768),
-            "2:1 (1280x640)": (1280, 640),
-        }
-
         if preset == "Manual" or mode == "Manual":
             width, height = manual_width, manual_height
         else:
-            width, height = presets.get(preset, (1024, 1024))
+            width, height = PRESETS.get(preset, (1024, 1024))
             if mode == "Portrait":
                 width, height = height, width  # Swap for portrait mode
 
@@ -62,6 +62,89 @@ a cozy interior scene"""
     return file_path
 
 
+@pytest.fixture
+def sample_image_dir(tmp_path):
+    """
+    Create a temporary directory tree with a few small images for testing.
+
+    The tree contains three valid PNGs (one in a subfolder), one corrupt PNG
+    and one non-image file.
+
+    Args:
+        tmp_path: Pytest fixture providing temporary directory
+
+    Returns:
+        Path: Path to the root of the image tree
+    """
+    from PIL import Image
+
+    root = tmp_path / "images"
+    (root / "sub").mkdir(parents=True)
+
+    Image.new("RGB", (32, 16), (255, 0, 0)).save(root / "a.png")
+    Image.new("RGB", (16, 32), (0, 255, 0)).save(root / "b.png")
+    Image.new("L", (24, 24), 128).save(root / "sub" / "c.png")
+    (root / "broken.png").write_bytes(b"not really a png")
+    (root / "notes.txt").write_text("not an image")
+
+    return root
+
+
+@pytest.fixture
+def sample_image_shards(sample_image_dir):
+    """
+    Pack the sample images into a tar and a zip shard next to the image tree.
+
+    Both shards hold b.png, a caption, a.png and a corrupt PNG, in that
+    (unsorted) order. The tar uses WebDataset-style "./" member names; the zip
+    stores one image and deflates the other.
+
+    Args:
+        sample_image_dir: Fixture providing the sample image tree
+
+    Returns:
+        Path: Directory containing data.tar and data.zip
+    """
+    import tarfile
+    import zipfile
+
+    root = sample_image_dir.parent / "shards"
+    root.mkdir()
+
+    with tarfile.open(root / "data.tar", "w") as tar:
+        tar.add(sample_image_dir / "b.png", arcname="./000001.png")
+        tar.add(sample_image_dir / "notes.txt", arcname="./000001.txt")
+        tar.add(sample_image_dir / "a.png", arcname="./000002.png")
+        tar.add(sample_image_dir / "broken.png", arcname="./000003.png")
+
+    with zipfile.ZipFile(root / "data.zip", "w") as archive:
+        archive.write(sample_image_dir / "b.png", "000001.png", zipfile.ZIP_STORED)
+        archive.write(sample_image_dir / "notes.txt", "000001.txt", zipfile.ZIP_DEFLATED)
+        archive.write(sample_image_dir / "a.png", "000002.png", zipfile.ZIP_DEFLATED)
+        archive.write(sample_image_dir / "broken.png", "000003.png", zipfile.ZIP_STORED)
+
+    return root
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    """
+    Provide a fresh in-memory image catalog, installed as the shared one.
+
+    Args:
+        monkeypatch: Pytest fixture restoring the shared catalog afterwards
+
+    Yields:
+        ImageCatalog: The catalog returned by get_catalog() during the test
+    """
+    import pipemind_image_catalog
+
+    cat = pipemind_image_catalog.ImageCatalog(":memory:")
+    monkeypatch.setattr(pipemind_image_catalog, "_catalog", cat)
+    yield cat
+    cat.close()
+
+
 @pytest.fixture
 def aspect_ratio_presets():
     """
@@ -174,6 +257,8 @@ def validate_node_outputs(node_class, output):
 __all__ = [
     'sample_text_file',
     'sample_prompt_file',
+    'sample_image_dir',
+    'sample_image_shards',
     'aspect_ratio_presets',
     'mock_comfyui_context',
     'validate_node_structure',
@@ -0,0 +1,554 @@
+"""
+Tests for BatchImageLoadInput and BatchImageLoadOutput nodes.
+
+This module tests the batch image loading functionality including:
+- Directory listing for the dropdown
+- Single and sequential selection
+- Handling of invalid images
+- Sequential read-ahead
+- Decoded image cache
+- Batch mode
+- List output variants
+- Reduced-resolution decoding
+- Persistent disk cache
+- Tar and zip shard sources
+- Shuffled epochs
+- Shared cursor across loader instances
+- Metadata filter
+- Sort order and header-based filters
+- Frames of animated images
+- Aspect-ratio buckets
+- Caption and metadata sidecars
+- Thumbnail previews
+"""
+
+import json
+import pytest
+import torch
+
+import pipemind_image_cache
+import pipemind_image_decode
+import pipemind_image_catalog
+import pipemind_image_thumbnails
+import pipemind_batch_image_loader_output as loader_output
+from pipemind_batch_image_loader_input import (
+    AspectBucketPlanInput, BatchImageLoadInput, BatchImageListLoadInput,
+)
+from pipemind_batch_image_loader_output import (
+    AspectBucketPlanOutput, BatchImageLoadOutput, BatchImageListLoadOutput,
+)
+from tests.conftest import validate_node_structure, validate_node_inputs, validate_node_outputs
+
+
+@pytest.fixture(autouse=True)
+def isolated_catalog(monkeypatch, tmp_path):
+    """Use a fresh catalog and image caches so tests never share state."""
+    catalog = pipemind_image_catalog.ImageCatalog(":memory:")
+    monkeypatch.setattr(pipemind_image_catalog, "_catalog", catalog)
+    monkeypatch.setattr(
+        pipemind_image_cache, "_tensor_cache", pipemind_image_cache.ImageTensorCache()
+    )
+    monkeypatch.setattr(
+        pipemind_image_cache, "_disk_cache",
+        pipemind_image_cache.DiskArrayCache(str(tmp_path / "decoded")),
+    )
+    monkeypatch.setattr(
+        pipemind_image_thumbnails, "_thumbnail_cache",
+        pipemind_image_thumbnails.ThumbnailCache(str(tmp_path / "thumbnails")),
+    )
+    yield catalog
+    catalog.close()
+
+
+def node_fixture(input_class, output_class):
+    """
+    Build a fixture creating the input and the output variant of a node.
+
+    The node's base directory (get_base_dir) points at the sample images.
+    """
+    @pytest.fixture(params=[input_class, output_class], ids=["input", "output"])
+    def node(request, monkeypatch, sample_image_dir):
+        base_dir = str(sample_image_dir.parent)
+        monkeypatch.setattr(request.param, "get_base_dir", classmethod(lambda cls: base_dir))
+        return request.param()
+    return node
+
+
+loader = node_fixture(BatchImageLoadInput, BatchImageLoadOutput)
+list_loader = node_fixture(BatchImageListLoadInput, BatchImageListLoadOutput)
+bucket_plan = node_fixture(AspectBucketPlanInput, AspectBucketPlanOutput)
+
+
+class TestBatchImageLoader:
+    """Test suite for the batch image loader nodes."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("node_class", [BatchImageLoadInput, BatchImageLoadOutput])
+    def test_node_structure(self, node_class):
+        """Test that the node has the correct structure."""
+        validate_node_structure(node_class)
+
+    @pytest.mark.unit
+    def test_input_types(self, loader):
+        """Test that the directory dropdown lists image folders."""
+        inputs = validate_node_inputs(type(loader))
+
+        directories = inputs["required"]["directory"][0]
+        assert "images" in directories
+        assert "images/sub" in directories
+        assert "mode" in inputs["required"]
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_single_mode(self, loader):
+        """Test that single mode returns the requested image."""
+        output = loader.load_image("images", "single", 1)
+        validate_node_outputs(type(loader), output)
+
+        image, count, index, epoch, position, caption, metadata = output
+        assert count == 3
+        assert index == 1
+        assert (epoch, position) == (0, 1)
+        assert (caption, metadata) == ("", "{}")
+        assert isinstance(image, torch.Tensor)
+        assert image.shape[0] == 1
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_sequential_mode_advances(self, loader):
+        """Test that sequential mode walks through every image and wraps."""
+        indices = [loader.load_image("images", "sequential", 0)[2] for _ in range(4)]
+        assert indices == [0, 1, 2, 0]
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_missing_directory(self, loader):
+        """Test that a missing directory returns an empty image."""
+        image, count, index, *_ = loader.load_image("does_not_exist", "single", 0)
+        assert count == 0
+        assert index == 0
+        assert image.shape == (1, 3, 64, 64)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_corrupt_pick_falls_through(self, loader):
+        """Test that a corrupt selection falls through to the next valid image."""
+        # With "none" the corrupt file is listed: a, b, broken, sub/c
+        image, count, index, *_ = loader.load_image("images", "single", 2, validation="none")
+        assert count == 4
+        assert index == 3
+        assert image.shape == (1, 24, 24, 3)
+
+        # The corrupt file is remembered and skipped from now on
+        assert loader.load_image("images", "single", 0, validation="none")[1] == 3
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_sequential_mode_prefetches(self, loader):
+        """Test that sequential loads are served by the read-ahead queue."""
+        first = loader.load_image("images", "sequential", 0, prefetch=2)
+        second = loader.load_image("images", "sequential", 0, prefetch=2)
+        third = loader.load_image("images", "sequential", 0, prefetch=2)
+
+        assert [first[2], second[2], third[2]] == [0, 1, 2]
+        assert loader.prefetcher.hits == 2
+        assert loader.prefetcher.misses == 1
+        assert torch.equal(second[0], loader.decode_image(loader.image_files[1]))
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_single_mode_resets_prefetch(self, loader):
+        """Test that switching to single mode drops pending read-ahead."""
+        loader.load_image("images", "sequential", 0)
+        loader.load_image("images", "single", 2)
+        assert loader.prefetcher.stats()["pending"] == 0
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_reselecting_uses_cache(self, loader):
+        """Test that re-selecting an image in single mode is a cache hit."""
+        first = loader.load_image("images", "single", 0)[0]
+        second = loader.load_image("images", "single", 0)[0]
+
+        stats = pipemind_image_cache.get_tensor_cache().stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert torch.equal(first, second)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_cache_disabled(self, loader):
+        """Test that a zero budget bypasses the cache."""
+        loader.load_image("images", "single", 0, cache_mb=0)
+        assert pipemind_image_cache.get_tensor_cache().stats()["entries"] == 0
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    @pytest.mark.parametrize("fit", ["resize", "pad", "crop"])
+    def test_batch_mode_stacks_images(self, loader, fit):
+        """Test that batch mode returns one stacked tensor sized like the first image."""
+        batch, count, index, *_ = loader.load_image(
+            "images", "batch", 0, batch_count=16, batch_fit=fit
+        )
+        assert count == 3
+        assert index == 0
+        assert batch.shape == (3, 16, 32, 3)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_batch_mode_step_and_count(self, loader):
+        """Test that batch_step and batch_count select the expected indices."""
+        batch = loader.load_image("images", "batch", 0, batch_count=2, batch_step=2)[0]
+        assert batch.shape[0] == 2
+        # Index 2 is sub/c.png, a grey image resized to the first image's size
+        assert torch.allclose(batch[1], torch.full((16, 32, 3), 128 / 255.0), atol=1e-6)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_batch_mode_reuses_image_buffers(self, loader, monkeypatch):
+        """Test that the per-image tensors of a batch go back to the pool, and the batch stays intact."""
+        pool = pipemind_image_decode.TensorBufferPool()
+        monkeypatch.setattr(pipemind_image_decode, "_buffer_pool", pool)
+
+        first = loader.load_image("images", "batch", 0, batch_count=16, cache_mb=0)[0]
+        expected = first.clone()
+        assert pool.stats()["pooled"] == 3
+
+        loader.load_image("images", "batch", 0, batch_count=16, cache_mb=0)
+        assert pool.stats()["reused"] == 3
+        assert torch.equal(first, expected)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_max_side_reduces_output(self, loader):
+        """Test that max_side shrinks the returned image and is part of the cache key."""
+        full = loader.load_image("images", "single", 0)[0]
+        small = loader.load_image("images", "single", 0, max_side=8)[0]
+
+        assert full.shape == (1, 16, 32, 3)
+        assert small.shape == (1, 4, 8, 3)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_disk_cache_serves_later_runs(self, loader):
+        """Test that disk_cache persists decoded images for a fresh memory cache."""
+        first = loader.load_image("images", "single", 0, cache_mb=0, disk_cache=True)[0]
+        second = loader.load_image("images", "single", 0, cache_mb=0, disk_cache=True)[0]
+
+        stats = pipemind_image_cache.get_disk_cache().stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+        assert torch.equal(first, second)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_disk_cache_is_opt_in(self, loader):
+        """Test that nothing is written to disk unless disk_cache is enabled."""
+        loader.load_image("images", "single", 0)
+        assert pipemind_image_cache.get_disk_cache().stats()["entries"] == 0
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_max_depth_and_ignore_globs(self, loader):
+        """Test that the walk can be limited to the top folder or prune folders."""
+        assert loader.load_image("images", "single", 0, max_depth=0)[1] == 2
+        assert loader.load_image("images", "single", 0, ignore_globs="sub")[1] == 2
+        assert loader.load_image("images", "single", 0)[1] == 3
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    @pytest.mark.parametrize("shard", ["data.tar", "data.zip"])
+    def test_archive_source(self, loader, sample_image_shards, shard):
+        """Test that a shard is listed and read in archive order without unpacking."""
+        source = f"shards/{shard}"
+        assert source in validate_node_inputs(type(loader))["required"]["directory"][0]
+
+        first = loader.load_image(source, "sequential", 0)
+        second = loader.load_image(source, "sequential", 0)
+        assert (first[1], first[2], second[2]) == (3, 0, 1)
+        assert first[0].shape == (1, 32, 16, 3)
+        assert second[0].shape == (1, 16, 32, 3)
+
+        # The corrupt member falls through to the first one and is dropped
+        image, count, index, *_ = loader.load_image(source, "single", 2)
+        assert (count, index) == (3, 0)
+        assert loader.load_image(source, "single", 0)[1] == 2
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_shuffled_mode_visits_each_image_once_per_epoch(self, loader):
+        """Test that shuffled mode covers every image per epoch and reports progress."""
+        outputs = [loader.load_image("images", "shuffled", 0, shuffle_seed=7) for _ in range(6)]
+
+        assert [(o[3], o[4]) for o in outputs] == [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2)]
+        assert sorted(o[2] for o in outputs[:3]) == [0, 1, 2]
+        assert sorted(o[2] for o in outputs[3:]) == [0, 1, 2]
+        for image, _, index, *_ in outputs:
+            assert torch.equal(image, loader.decode_image(loader.image_files[index]))
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_shuffled_mode_is_reproducible(self, loader):
+        """Test that the same seed replays the same order and a new seed restarts."""
+        first = [loader.load_image("images", "shuffled", 0, shuffle_seed=3)[2] for _ in range(3)]
+        restart = loader.load_image("images", "shuffled", 0, shuffle_seed=4)
+        assert (restart[3], restart[4]) == (0, 0)
+
+        again = [loader.load_image("images", "shuffled", 0, shuffle_seed=3)[2] for _ in range(3)]
+        assert again == first
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_shuffled_mode_skips_corrupt_in_shuffled_order(self, loader):
+        """Test that a corrupt image is skipped without repeating an image in the epoch."""
+        # With "none" the corrupt file is listed until it fails to decode
+        outputs = [
+            loader.load_image("images", "shuffled", 0, shuffle_seed=5, validation="none")
+            for _ in range(3)
+        ]
+        paths = [loader.image_files[o[2]] for o in outputs]
+
+        assert all(o[3] == 0 for o in outputs)
+        assert sorted(p.rsplit("images", 1)[1][1:] for p in paths) == ["a.png", "b.png", "sub/c.png"]
+        assert loader.load_image("images", "shuffled", 0, shuffle_seed=5, validation="none")[3] == 1
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_shuffled_mode_keeps_epoch_listing(self, loader, sample_image_dir):
+        """Test that a file added mid-epoch joins in the next epoch, and any listing input restarts."""
+        from PIL import Image
+
+        first = loader.load_image("images", "shuffled", 0, shuffle_seed=2)
+        Image.new("RGB", (8, 8)).save(sample_image_dir / "0.png")
+        rest = [loader.load_image("images", "shuffled", 0, shuffle_seed=2) for _ in range(2)]
+        epoch_paths = [loader.image_files[o[2]] for o in rest]
+        assert [(o[3], o[4]) for o in rest] == [(0, 1), (0, 2)]
+        assert not any(p.endswith("0.png") for p in epoch_paths)
+
+        nxt = [loader.load_image("images", "shuffled", 0, shuffle_seed=2) for _ in range(4)]
+        assert sorted(o[2] for o in nxt) == [0, 1, 2, 3]
+        assert all(o[3] == 1 for o in nxt)
+
+        restart = loader.load_image("images", "shuffled", 0, shuffle_seed=2, max_depth=0)
+        assert (restart[3], restart[4]) == (0, 0)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_shared_cursor_splits_work(self, loader):
+        """Test that loaders sharing the cursor each claim different images."""
+        other = type(loader)()
+        claimed = [
+            node.load_image("images", "sequential", 0, cursor="shared")[2]
+            for node in [loader, other, loader]
+        ]
+        assert claimed == [0, 1, 2]
+
+        # The next claim starts a new epoch
+        output = other.load_image("images", "sequential", 0, cursor="shared")
+        assert (output[2], output[3]) == (0, 1)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_shared_cursor_claims_paths(self, loader, sample_image_dir):
+        """Test that a file arriving between claims does not repeat or skip images."""
+        from PIL import Image
+
+        other = type(loader)()
+        first = loader.load_image("images", "sequential", 0, cursor="shared")
+        # Sorts first, so every index of the other worker's listing shifts by one
+        Image.new("RGB", (8, 8)).save(sample_image_dir / "0.png")
+        claimed = [first[2]] + [
+            other.load_image("images", "sequential", 0, cursor="shared")[2] for _ in range(3)
+        ]
+
+        names = [other.image_files[i].replace("\\", "/").split("images/")[1] for i in claimed[1:]]
+        assert loader.image_files[first[2]].endswith("a.png")
+        assert sorted(names) == ["0.png", "b.png", "sub/c.png"]
+
+    @pytest.mark.unit
+    def test_listing_source(self):
+        """Test that every listing input is part of the shared listing name."""
+        base = ("images", "full-on-select", -1, "", "", loader_output.ImageSelection())
+        changed = [
+            ("other",) + base[1:],
+            base[:1] + ("none",) + base[2:],
+            base[:2] + (1,) + base[3:],
+            base[:3] + ("tmp*",) + base[4:],
+            base[:4] + ("prompt:red",) + base[5:],
+            base[:5] + (loader_output.ImageSelection(sort="mtime"),),
+        ]
+        names = {loader_output.listing_source(*args) for args in [base] + changed}
+        assert len(names) == 7
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_metadata_filter(self, loader, sample_image_dir):
+        """Test that the filter narrows the listing before an index is applied."""
+        from PIL import Image
+        from PIL.PngImagePlugin import PngInfo
+
+        info = PngInfo()
+        info.add_text("prompt", '{"6": {"inputs": {"text": "a red square"}}}')
+        Image.new("RGB", (32, 16), (255, 0, 0)).save(sample_image_dir / "a.png", pnginfo=info)
+
+        image, count, index, *_ = loader.load_image("images", "single", 0, filter="red")
+        assert (count, index) == (1, 0)
+        assert loader.image_files == [str(sample_image_dir / "a.png")]
+
+        output = loader.load_image(
+            "images", "single", 0, filter="$.prompt.*.inputs.text ~ ^a blue"
+        )
+        assert output[1] == 0
+        assert loader.load_image("images", "single", 0)[1] == 3
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_sort_and_header_filters(self, loader):
+        """Test that sorting and dimension filters change what an index selects."""
+        output = loader.load_image("images", "single", 0, sort="pixels", sort_descending=True)
+        assert output[0].shape == (1, 24, 24, 3)
+        assert output[1] == 3
+
+        output = loader.load_image("images", "single", 0, orientation="portrait")
+        assert (output[0].shape, output[1]) == ((1, 32, 16, 3), 1)
+        assert loader.load_image("images", "single", 0, min_width=20, name_glob="a*")[1] == 1
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_frames_mode(self, loader, sample_image_dir):
+        """Test that frames mode batches frames of the picked animation."""
+        from PIL import Image
+
+        frames = [Image.new("RGB", (10, 6), (50 * i, 0, 0)) for i in range(5)]
+        frames[0].save(sample_image_dir / "0_anim.gif", save_all=True, append_images=frames[1:])
+
+        batch, count, index, epoch, position, *_ = loader.load_image(
+            "images", "frames", 0, frame_start=1, frame_step=2
+        )
+        assert batch.shape == (2, 6, 10, 3)
+        assert (count, index, epoch, position) == (4, 0, 0, 1)
+
+        batch = loader.load_image("images", "frames", 1, max_frames=3)[0]
+        assert batch.shape == (1, 16, 32, 3)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_bucketed_mode(self, loader):
+        """Test that bucketed mode loads uniform batches bucket by bucket."""
+        outputs = [
+            loader.load_image("images", "bucketed", 0, bucket_family="sdxl", batch_count=2)
+            for _ in range(4)
+        ]
+        shapes = [o[0].shape for o in outputs]
+        assert shapes[:3] == [(1, 1024, 1024, 3), (1, 640, 1280, 3), (1, 1280, 640, 3)]
+        assert [(o[3], o[4]) for o in outputs] == [(0, 0), (0, 1), (0, 2), (1, 0)]
+        assert [o[2] for o in outputs[:3]] == [2, 0, 1]
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_preview_mode(self, loader, monkeypatch):
+        """Test that preview mode returns the cached thumbnail of the picked image."""
+        preview, count, index, *_ = loader.load_image("images", "preview", 0)
+        assert (count, index) == (3, 0)
+        assert preview.shape == (1, 16, 32, 3)
+
+        # The thumbnail is served again without decoding the source image
+        monkeypatch.setattr(pipemind_image_thumbnails, "open_image", None)
+        again = loader.load_image("images", "preview", 0)[0]
+        assert torch.equal(again, preview)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_thumbnail_route_listing(self, loader, sample_image_dir, monkeypatch):
+        """Test that the thumbnail route resolves an index like the node loads it."""
+        from pipemind_image_thumbnails import resolve_image
+
+        monkeypatch.setattr(pipemind_image_thumbnails, "_roots", {})
+        root = "input" if isinstance(loader, BatchImageLoadInput) else "output"
+        pipemind_image_thumbnails.register_root(
+            root, str(sample_image_dir.parent), type(loader).list_preview_images
+        )
+        listing = {"sort": "pixels", "sort_descending": "true", "name_glob": "*.png"}
+        loader.load_image("images", "single", 0, sort="pixels", sort_descending=True)
+
+        assert resolve_image(root, directory="images", index=0, listing=listing) == \
+            loader.image_files[0] == str(sample_image_dir / "sub" / "c.png")
+        assert resolve_image(root, directory="images", index=0, listing={
+            "orientation": "portrait", "max_depth": "0",
+        }) == str(sample_image_dir / "b.png")
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_sidecars(self, loader, sample_image_dir):
+        """Test that the caption and JSON metadata saved next to an image are returned."""
+        (sample_image_dir / "a.txt").write_text("a red image", encoding="utf-8")
+        (sample_image_dir / "b.txt").write_text("a green image", encoding="utf-8")
+        (sample_image_dir / "b.json").write_text('{"seed": 7}')
+
+        *_, caption, metadata = loader.load_image("images", "single", 1)
+        assert caption == "a green image"
+        assert json.loads(metadata) == {"seed": 7}
+
+        *_, caption, metadata = loader.load_image("images", "batch", 0, batch_count=3)
+        # One line per batch image: sub/c.png has no caption, so its line is empty
+        assert caption.split("\n") == ["a red image", "a green image", ""]
+        assert json.loads(metadata) == [{}, {"seed": 7}, {}]
+
+
+class TestBatchImageListLoader:
+    """Test suite for the list output variants of the batch image loaders."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("node_class", [BatchImageListLoadInput, BatchImageListLoadOutput])
+    def test_node_structure(self, node_class):
+        """Test that the node has the correct structure."""
+        validate_node_structure(node_class)
+        assert node_class.OUTPUT_IS_LIST == (True, True, False, False, True, True)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_emits_every_image_at_native_size(self, list_loader):
+        """Test that every image is emitted with its own resolution."""
+        output = list_loader.load_images("images", 0, 0, 1)
+        validate_node_outputs(type(list_loader), output)
+
+        images, paths, count, start, captions, metadata = output
+        assert count == 3
+        assert start == 0
+        assert [tuple(image.shape) for image in images] == [
+            (1, 16, 32, 3), (1, 32, 16, 3), (1, 24, 24, 3),
+        ]
+        assert len(paths) == 3
+        assert captions == ["", "", ""]
+        assert metadata == ["{}", "{}", "{}"]
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_slice(self, list_loader):
+        """Test that start_index, count and step select a slice."""
+        images, paths, _, start, *_ = list_loader.load_images("images", 1, 1, 1)
+        assert start == 1
+        assert len(images) == 1
+        assert paths[0].endswith("b.png")
+
+
+class TestAspectBucketPlan:
+    """Test suite for the aspect bucket plan nodes."""
+
+    @pytest.mark.unit
+    def test_node_structure(self, bucket_plan):
+        """Test that the node has the correct structure."""
+        validate_node_structure(type(bucket_plan))
+        assert type(bucket_plan).OUTPUT_IS_LIST == (True, True, True, True)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_plan(self, bucket_plan, sample_image_dir):
+        """Test that every valid image is listed under its nearest bucket."""
+        paths, widths, heights, counts = bucket_plan.make_plan("images", "qwen")
+        # a.png is 32x16, b.png 16x32 and sub/c.png 24x24 (broken.png is left out)
+        assert list(zip(zip(widths, heights), paths)) == [
+            ((1328, 1328), str(sample_image_dir / "sub" / "c.png")),
+            ((1664, 928), str(sample_image_dir / "a.png")),
+            ((928, 1664), str(sample_image_dir / "b.png")),
+        ]
+        assert counts == [1, 1, 1]
@@ -0,0 +1,128 @@
+"""
+Tests for reading images out of tar and zip shards.
+
+This module tests:
+- Virtual member paths
+- Member offset indexing in archive order
+- Reading members by seek, stored and deflated
+- Cataloging archives and decoding their members
+"""
+
+import os
+import pytest
+
+from pipemind_image_archive import (
+    index_archive, is_archive_file, member_path, read_member, source_stat, split_member_path,
+)
+from pipemind_image_catalog import is_image_file
+from pipemind_image_decode import open_image
+
+
+class TestMemberPaths:
+    """Test suite for virtual member paths."""
+
+    @pytest.mark.unit
+    def test_round_trip(self):
+        """Test that a member path splits back into archive and member."""
+        path = member_path("/data/shard-0001.tar", "dir/000001.jpg")
+        assert path == "/data/shard-0001.tar::dir/000001.jpg"
+        assert split_member_path(path) == ("/data/shard-0001.tar", "dir/000001.jpg")
+
+    @pytest.mark.unit
+    def test_plain_paths_are_not_members(self):
+        """Test that ordinary paths, even containing the separator, are left alone."""
+        assert split_member_path("/data/a.png") == ("/data/a.png", None)
+        assert split_member_path("/data/odd::name.png") == ("/data/odd::name.png", None)
+        assert is_archive_file("shard.TAR")
+        assert not is_archive_file("shard.tar.gz")
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_source_stat_uses_archive(self, sample_image_shards):
+        """Test that a member is stat'ed through its archive."""
+        archive = str(sample_image_shards / "data.tar")
+        assert source_stat(member_path(archive, "000001.png")) == os.stat(archive)
+
+
+class TestIndexArchive:
+    """Test suite for index_archive and read_member."""
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    @pytest.mark.parametrize("name", ["data.tar", "data.zip"])
+    def test_index_keeps_archive_order(self, sample_image_shards, name):
+        """Test that image members are indexed in archive order with clean names."""
+        entries = index_archive(str(sample_image_shards / name), is_image_file)
+        assert [entry[0] for entry in entries] == ["000001.png", "000002.png", "000003.png"]
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    @pytest.mark.parametrize("name", ["data.tar", "data.zip"])
+    def test_read_member_by_offset(self, sample_image_dir, sample_image_shards, name):
+        """Test that stored and deflated members read back byte for byte."""
+        archive = str(sample_image_shards / name)
+        entries = {entry[0]: entry for entry in index_archive(archive)}
+
+        assert read_member(archive, *entries["000001.png"]) == \
+            (sample_image_dir / "b.png").read_bytes()
+        assert read_member(archive, *entries["000002.png"]) == \
+            (sample_image_dir / "a.png").read_bytes()
+        assert read_member(archive, *entries["000001.txt"]) == b"not an image"
+
+
+class TestArchiveCatalog:
+    """Test suite for archives in the image catalog."""
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    @pytest.mark.parametrize("name", ["data.tar", "data.zip"])
+    def test_members_listed_and_decoded(self, catalog, sample_image_shards, name):
+        """Test that an archive lists its images in order and they decode in place."""
+        archive = str(sample_image_shards / name)
+        files = catalog.get_image_files(archive)
+
+        assert files == [member_path(archive, f"00000{i}.png") for i in (1, 2, 3)]
+        assert open_image(files[0]).size == (16, 32)
+        assert open_image(files[1]).size == (32, 16)
+        with pytest.raises(Exception):
+            open_image(files[2])
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_index_is_built_once(self, catalog, sample_image_shards, monkeypatch):
+        """Test that an unchanged archive is not indexed again."""
+        import pipemind_image_catalog
+
+        archive = str(sample_image_shards / "data.tar")
+        catalog.get_image_files(archive)
+
+        calls = []
+        monkeypatch.setattr(
+            pipemind_image_catalog, "index_archive",
+            lambda *args: calls.append(args) or [],
+        )
+        assert len(catalog.get_image_files(archive)) == 3
+        assert calls == []
+
+        os.utime(archive, ns=(0, 10**9))
+        assert catalog.get_image_files(archive) == []
+        assert len(calls) == 1
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_mark_invalid_member(self, catalog, sample_image_shards):
+        """Test that a member failing to decode is left out of later listings."""
+        archive = str(sample_image_shards / "data.tar")
+        broken = catalog.get_image_files(archive)[2]
+        catalog.mark_invalid(broken)
+
+        assert broken not in catalog.get_image_files(archive)
+        assert catalog.member_location(broken) is not None
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_list_archives(self, catalog, sample_image_dir, sample_image_shards):
+        """Test that archives below a base directory are listed."""
+        base_dir = str(sample_image_dir.parent)
+        assert catalog.list_archives(base_dir) == ["shards/data.tar", "shards/data.zip"]
+        assert "shards" not in catalog.list_image_directories(base_dir)
@@ -0,0 +1,86 @@
+"""
+Tests for aspect-ratio bucketing.
+
+This module tests:
+- Bucket resolutions derived from the aspect ratio node presets
+- Vectorized nearest-bucket assignment
+- Bucket plans over a listing
+- Reading dimensions from the catalog without decoding
+"""
+
+import os
+import numpy as np
+import pytest
+from PIL import Image
+
+from pipemind_image_buckets import BUCKET_FAMILIES, assign_buckets, plan_buckets
+
+
+class TestBuckets:
+    """Test suite for bucket assignment and plans."""
+
+    @pytest.mark.unit
+    def test_families_cover_both_orientations(self):
+        """Test that every family has its presets in landscape and portrait."""
+        assert (1024, 1024) in BUCKET_FAMILIES["sdxl"]
+        assert BUCKET_FAMILIES["sdxl"].count((1024, 1024)) == 1
+        for buckets in BUCKET_FAMILIES.values():
+            assert {(height, width) for width, height in buckets} == set(buckets)
+
+    @pytest.mark.unit
+    def test_nearest_aspect_ratio(self):
+        """Test that each size goes to the bucket with the closest aspect ratio."""
+        buckets = [(1024, 1024), (1344, 768), (768, 1344)]
+        sizes = [(500, 500), (1920, 1080), (1080, 1920), (1200, 1000), (0, 0)]
+        assert assign_buckets(sizes, buckets).tolist() == [0, 1, 2, 0, 0]
+
+    @pytest.mark.unit
+    def test_plan_keeps_listing_order(self):
+        """Test that a plan groups indices per bucket in listing order."""
+        sizes = [(1920, 1080), (800, 800), (1600, 900), (900, 1600), (640, 640)]
+        plan = plan_buckets(sizes, "sdxl")
+        assert plan == [((1024, 1024), [1, 4]), ((1344, 768), [0, 2]), ((768, 1344), [3])]
+        assert plan_buckets([], "flux") == []
+
+    @pytest.mark.slow
+    def test_assignment_scales(self):
+        """Assign a million image sizes in one vectorized pass."""
+        sizes = np.random.default_rng(0).integers(256, 4096, size=(1_000_000, 2))
+        assigned = assign_buckets(sizes, BUCKET_FAMILIES["flux"])
+        assert assigned.shape == (1_000_000,)
+        assert set(assigned.tolist()) <= set(range(len(BUCKET_FAMILIES["flux"])))
+
+
+class TestCatalogDimensions:
+    """Test suite for ImageCatalog.get_dimensions."""
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_dimensions_from_headers(self, catalog, sample_image_dir):
+        """Test that listed images report their size and invalid ones are left out."""
+        files = catalog.get_image_files(str(sample_image_dir), "none")
+        sizes = catalog.get_dimensions(files)
+
+        assert sizes[str(sample_image_dir / "a.png")] == (32, 16)
+        assert sizes[str(sample_image_dir / "sub" / "c.png")] == (24, 24)
+        assert str(sample_image_dir / "broken.png") not in sizes
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_rotated_photos_are_upright(self, catalog, tmp_path):
+        """Test that EXIF orientations 5-8 swap the reported width and height."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        Image.new("RGB", (40, 20)).save(tmp_path / "rotated.jpg", exif=exif)
+
+        files = catalog.get_image_files(str(tmp_path))
+        assert catalog.get_dimensions(files) == {str(tmp_path / "rotated.jpg"): (20, 40)}
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_archive_members(self, catalog, sample_image_shards):
+        """Test that member headers are probed once and stored."""
+        files = catalog.get_image_files(str(sample_image_shards / "data.zip"))
+        sizes = catalog.get_dimensions(files)
+        assert [sizes.get(path) for path in files] == [(16, 32), (32, 16), None]
+        assert os.path.basename(files[0]).endswith("000001.png")
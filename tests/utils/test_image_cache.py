@@ -0,0 +1,222 @@
+"""
+Tests for the decoded image LRU cache shared by the batch image loaders.
+
+This module tests:
+- Cache keys tracking file changes
+- Byte budget and LRU eviction
+- Compact uint8 storage
+- Copies between the cache and its callers
+- Memory-mapped disk cache and its manifest
+"""
+
+import os
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+from pipemind_image_cache import DiskArrayCache, ImageTensorCache, cache_key
+
+
+def make_tensor(value, size=8):
+    """Build a float32 IMAGE tensor whose pixels are all value/255."""
+    return torch.full((1, size, size, 3), value / 255.0, dtype=torch.float32)
+
+
+class TestImageTensorCache:
+    """Test suite for ImageTensorCache."""
+
+    @pytest.mark.unit
+    def test_uint8_round_trip(self):
+        """Test that uint8 storage hands back the exact float32 values."""
+        cache = ImageTensorCache()
+        tensor = torch.arange(256, dtype=torch.float32).div(255.0).reshape(1, 16, 16, 1)
+        cache.put("key", tensor)
+
+        result = cache.get("key")
+        assert result.dtype == torch.float32
+        assert torch.equal(result, tensor)
+        assert cache.stats()["bytes"] == 256
+
+    @pytest.mark.unit
+    def test_float_storage(self):
+        """Test that float32 storage keeps the exact values in a copy."""
+        cache = ImageTensorCache(store_uint8=False)
+        tensor = make_tensor(10)
+        cache.put("key", tensor)
+
+        result = cache.get("key")
+        assert torch.equal(result, tensor)
+        assert result.data_ptr() != tensor.data_ptr()
+        assert cache.stats()["bytes"] == tensor.nelement() * 4
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("store_uint8", [True, False])
+    def test_in_place_changes_do_not_reach_the_cache(self, store_uint8):
+        """Test that changing a stored or returned tensor in place leaves later hits intact."""
+        cache = ImageTensorCache(store_uint8=store_uint8)
+        tensor = make_tensor(10)
+        cache.put("key", tensor)
+        tensor.fill_(1.0)
+
+        first = cache.get("key")
+        first.mul_(0.0)
+        second = cache.get("key")
+        assert torch.equal(second, make_tensor(10))
+        assert second.data_ptr() != first.data_ptr()
+
+    @pytest.mark.unit
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        entry_bytes = 8 * 8 * 3
+        cache = ImageTensorCache(max_bytes=2 * entry_bytes)
+        cache.put("a", make_tensor(1))
+        cache.put("b", make_tensor(2))
+        cache.get("a")
+        cache.put("c", make_tensor(3))
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["entries"] == 2
+        assert stats["bytes"] == 2 * entry_bytes
+
+    @pytest.mark.unit
+    def test_oversized_entry_not_cached(self):
+        """Test that an entry larger than the whole budget is skipped."""
+        cache = ImageTensorCache(max_bytes=10)
+        cache.put("big", make_tensor(1))
+        assert cache.stats()["entries"] == 0
+
+    @pytest.mark.unit
+    def test_configure_shrinks_budget(self):
+        """Test that lowering the budget evicts entries immediately."""
+        cache = ImageTensorCache()
+        cache.put("a", make_tensor(1))
+        cache.put("b", make_tensor(2))
+        cache.configure(max_bytes=8 * 8 * 3)
+        assert cache.stats()["entries"] == 1
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_load_skips_decode_on_hit(self, sample_image_dir):
+        """Test that load() only decodes on a miss."""
+        cache = ImageTensorCache()
+        calls = []
+
+        def decode(path):
+            calls.append(path)
+            return make_tensor(5)
+
+        path = str(sample_image_dir / "a.png")
+        cache.load(path, decode)
+        cache.load(path, decode)
+        assert len(calls) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_modified_file_is_a_miss(self, sample_image_dir):
+        """Test that rewriting a file changes its cache key."""
+        path = sample_image_dir / "a.png"
+        before = cache_key(path)
+
+        Image.new("RGB", (64, 64)).save(path)
+        os.utime(path, ns=(before[1] + 10**9, before[1] + 10**9))
+
+        assert cache_key(path) != before
+        assert cache_key(path, "RGBA") != cache_key(path)
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    """Create a disk cache in a temporary folder."""
+    return DiskArrayCache(str(tmp_path / "decoded"))
+
+
+def decode_pixels(path):
+    """Decode an image file to a uint8 array."""
+    return np.asarray(Image.open(path).convert("RGB"))
+
+
+class TestDiskArrayCache:
+    """Test suite for DiskArrayCache."""
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_second_load_is_memory_mapped(self, disk_cache, sample_image_dir):
+        """Test that a cached image is memory-mapped instead of decoded."""
+        path = str(sample_image_dir / "a.png")
+        calls = []
+
+        def decode(p):
+            calls.append(p)
+            return decode_pixels(p)
+
+        first = disk_cache.load(path, decode)
+        second = disk_cache.load(path, decode)
+
+        assert len(calls) == 1
+        assert isinstance(second, np.memmap)
+        assert np.array_equal(first, second)
+        assert disk_cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_modified_source_is_decoded_again(self, disk_cache, sample_image_dir):
+        """Test that a changed mtime or size invalidates the entry."""
+        path = sample_image_dir / "a.png"
+        disk_cache.load(str(path), decode_pixels)
+
+        Image.new("RGB", (8, 4), (255, 0, 0)).save(path)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        assert disk_cache.get(str(path)) is None
+        array = disk_cache.load(str(path), decode_pixels)
+        assert array.shape == (4, 8, 3)
+        assert disk_cache.get(str(path)).shape == (4, 8, 3)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_modes_are_separate_entries(self, disk_cache, sample_image_dir):
+        """Test that decoding variants of one file do not overwrite each other."""
+        path = str(sample_image_dir / "a.png")
+        disk_cache.load(path, decode_pixels, "RGB@0:0x0")
+        disk_cache.load(path, lambda p: decode_pixels(p)[::2, ::2], "RGB@16:0x0")
+
+        assert disk_cache.get(path, "RGB@0:0x0").shape == (16, 32, 3)
+        assert disk_cache.get(path, "RGB@16:0x0").shape == (8, 16, 3)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_manifest_persists_between_instances(self, disk_cache, sample_image_dir):
+        """Test that a new cache on the same folder reuses earlier entries."""
+        path = str(sample_image_dir / "b.png")
+        disk_cache.load(path, decode_pixels)
+
+        reopened = DiskArrayCache(disk_cache.root)
+        assert reopened.get(path) is not None
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_truncated_manifest_line_is_ignored(self, disk_cache, sample_image_dir):
+        """Test that an interrupted manifest write does not break loading."""
+        path = str(sample_image_dir / "a.png")
+        disk_cache.load(path, decode_pixels)
+        with open(disk_cache.manifest_path, "a", encoding="utf-8") as f:
+            f.write('{"path": "cut sh')
+
+        assert DiskArrayCache(disk_cache.root).get(path) is not None
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_clear(self, disk_cache, sample_image_dir):
+        """Test that clear removes the cached files and the manifest."""
+        disk_cache.load(str(sample_image_dir / "a.png"), decode_pixels)
+        disk_cache.clear()
+
+        assert os.listdir(disk_cache.root) == []
+        assert disk_cache.get(str(sample_image_dir / "a.png")) is None
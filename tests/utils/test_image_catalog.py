@@ -0,0 +1,517 @@
+"""
+Tests for the persistent image catalog used by the batch image loaders.
+
+This module tests:
+- Directory discovery and listing cache
+- Image validation and header records
+- Incremental rescans driven by (size, mtime)
+- Validation policies
+- Parallel probing of new files
+- Pruned, depth-limited directory walking
+- Sorting and header-based filters with a cached order
+- Caption and metadata sidecars paired from the catalog
+"""
+
+import os
+import json
+import time
+import pytest
+from PIL import Image
+
+import pipemind_image_catalog
+from pipemind_image_catalog import (
+    ImageCatalog, ImageSelection, VALIDATION_POLICIES, SCAN_EXECUTORS, CHECK_FULL, CHECK_HEADER,
+    DEFAULT_IGNORE_GLOBS, file_name, is_ignored_directory, natural_key, parse_globs, probe_images,
+    select_images, walk_image_files,
+)
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    """Create a catalog backed by a temporary database file."""
+    cat = ImageCatalog(str(tmp_path / "catalog" / "images.sqlite3"))
+    yield cat
+    cat.close()
+
+
+class TestImageCatalog:
+    """Test suite for ImageCatalog."""
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_get_image_files_skips_invalid(self, catalog, sample_image_dir):
+        """Test that only valid images are returned, in sorted order."""
+        files = catalog.get_image_files(str(sample_image_dir))
+
+        names = [os.path.relpath(f, sample_image_dir) for f in files]
+        assert names == ["a.png", "b.png", os.path.join("sub", "c.png")]
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_single_file_path(self, catalog, sample_image_dir):
+        """Test that a file path returns just that file when valid."""
+        path = str(sample_image_dir / "a.png")
+        assert catalog.get_image_files(path) == [path]
+        assert catalog.get_image_files(str(sample_image_dir / "broken.png")) == []
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_records_header_fields(self, catalog, sample_image_dir):
+        """Test that width, height and mode are stored for each image."""
+        catalog.get_image_files(str(sample_image_dir))
+
+        record = catalog.get_record(str(sample_image_dir / "sub" / "c.png"))
+        assert (record["width"], record["height"], record["mode"]) == (24, 24, "L")
+        assert record["valid"] == 1
+
+        broken = catalog.get_record(str(sample_image_dir / "broken.png"))
+        assert broken["valid"] == 0
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_unchanged_files_are_not_revalidated(self, catalog, sample_image_dir, monkeypatch):
+        """Test that a rescan only probes new or modified files."""
+        catalog.get_image_files(str(sample_image_dir))
+
+        probed = []
+        original = pipemind_image_catalog.probe_image
+
+        def tracking_probe(path, *args):
+            probed.append(os.path.basename(path))
+            return original(path, *args)
+
+        monkeypatch.setattr(pipemind_image_catalog, "probe_image", tracking_probe)
+
+        catalog.get_image_files(str(sample_image_dir))
+        assert probed == []
+
+        Image.new("RGB", (8, 8)).save(sample_image_dir / "d.png")
+        files = catalog.get_image_files(str(sample_image_dir))
+        assert probed == ["d.png"]
+        assert str(sample_image_dir / "d.png") in files
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_deleted_files_are_dropped(self, catalog, sample_image_dir):
+        """Test that files removed from disk disappear from the catalog."""
+        catalog.get_image_files(str(sample_image_dir))
+        os.remove(sample_image_dir / "b.png")
+
+        files = catalog.get_image_files(str(sample_image_dir))
+        assert str(sample_image_dir / "b.png") not in files
+        assert catalog.get_record(str(sample_image_dir / "b.png")) is None
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_catalog_persists_between_instances(self, tmp_path, sample_image_dir):
+        """Test that a new catalog on the same database reuses earlier results."""
+        db_path = str(tmp_path / "persist.sqlite3")
+        first = ImageCatalog(db_path)
+        first.get_image_files(str(sample_image_dir))
+        first.close()
+
+        second = ImageCatalog(db_path)
+        try:
+            record = second.get_record(str(sample_image_dir / "a.png"))
+            assert (record["width"], record["height"]) == (32, 16)
+        finally:
+            second.close()
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_list_image_directories(self, catalog, sample_image_dir):
+        """Test that directories directly containing images are listed."""
+        (sample_image_dir / "empty").mkdir()
+        assert catalog.list_image_directories(str(sample_image_dir)) == ["", "sub"]
+
+        (sample_image_dir / "empty" / "e.jpg").write_bytes(b"")
+        assert catalog.list_image_directories(str(sample_image_dir)) == ["", "empty", "sub"]
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_none_policy_trusts_extension(self, catalog, sample_image_dir):
+        """Test that the "none" policy lists files without opening them."""
+        files = catalog.get_image_files(str(sample_image_dir), "none")
+        assert str(sample_image_dir / "broken.png") in files
+        assert catalog.get_record(str(sample_image_dir / "a.png"))["width"] is None
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_stricter_policy_rechecks_cached_files(self, catalog, sample_image_dir):
+        """Test that files checked by a weaker policy are re-probed on demand."""
+        catalog.get_image_files(str(sample_image_dir), "none")
+        files = catalog.get_image_files(str(sample_image_dir), "header")
+
+        assert str(sample_image_dir / "broken.png") not in files
+        assert catalog.get_record(str(sample_image_dir / "a.png"))["width"] == 32
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    @pytest.mark.parametrize("policy", VALIDATION_POLICIES)
+    def test_truncated_image(self, catalog, tmp_path, policy):
+        """Test which policies catch an image whose pixel data is truncated."""
+        path = tmp_path / "truncated.png"
+        Image.effect_noise((64, 64), 50).save(path)
+        path.write_bytes(path.read_bytes()[:200])
+
+        files = catalog.get_image_files(str(tmp_path), policy)
+        # Only "verify" reads the compressed data; the others defer to selection
+        assert (str(path) in files) == (policy != "verify")
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_mark_invalid(self, catalog, sample_image_dir):
+        """Test that images failing to decode are excluded from later listings."""
+        path = str(sample_image_dir / "a.png")
+        catalog.get_image_files(str(sample_image_dir))
+        catalog.mark_invalid(path)
+
+        assert path not in catalog.get_image_files(str(sample_image_dir))
+        assert catalog.get_record(path)["checked"] == CHECK_FULL
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    @pytest.mark.parametrize("executor", SCAN_EXECUTORS)
+    def test_parallel_scan_matches_serial(self, tmp_path, executor):
+        """Test that a pooled first scan finds the same files as a serial one."""
+        image_dir = tmp_path / "many"
+        image_dir.mkdir()
+        for i in range(40):
+            Image.new("RGB", (8 + i, 8)).save(image_dir / f"img_{i:03}.png")
+        (image_dir / "img_bad.png").write_bytes(b"junk")
+
+        serial = ImageCatalog(":memory:")
+        pooled = ImageCatalog(":memory:")
+        try:
+            expected = serial.get_image_files(str(image_dir), workers=1)
+            progress = []
+            files = pooled.get_image_files(
+                str(image_dir), workers=4, executor=executor,
+                progress=lambda done, total: progress.append((done, total)),
+            )
+            assert files == expected
+            assert len(files) == 40
+            assert progress[-1] == (41, 41)
+            assert pooled.get_record(str(image_dir / "img_039.png"))["width"] == 47
+        finally:
+            serial.close()
+            pooled.close()
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_probe_images_keeps_order(self, sample_image_dir):
+        """Test that pooled probing returns records in input order."""
+        paths = [str(sample_image_dir / name) for name in ["b.png", "broken.png", "a.png"]] * 8
+        records = probe_images(paths, CHECK_HEADER, workers=3)
+        assert [r["width"] for r in records[:3]] == [16, None, 32]
+        assert [r["valid"] for r in records] == [True, False, True] * 8
+
+
+@pytest.fixture
+def walk_tree(sample_image_dir):
+    """Extend the sample tree with hidden, ignored and nested folders."""
+    for folder in [".thumbnails", "@eaDir", "sub/deeper", "skip_me"]:
+        (sample_image_dir / folder).mkdir(parents=True, exist_ok=True)
+        (sample_image_dir / folder / "x.png").write_bytes(b"")
+    return sample_image_dir
+
+
+class TestWalkImageFiles:
+    """Test suite for the shared directory walker."""
+
+    @staticmethod
+    def names(root, **kwargs):
+        return sorted(
+            os.path.relpath(path, root).replace(os.sep, "/")
+            for path, _ in walk_image_files(str(root), **kwargs)
+        )
+
+    @pytest.mark.unit
+    def test_prunes_hidden_and_ignored_folders(self, walk_tree):
+        """Test that hidden folders and default ignore globs are never entered."""
+        assert self.names(walk_tree) == [
+            "a.png", "b.png", "broken.png", "skip_me/x.png", "sub/c.png", "sub/deeper/x.png",
+        ]
+
+    @pytest.mark.unit
+    def test_custom_ignore_globs(self, walk_tree):
+        """Test that user globs prune matching folders by name."""
+        names = self.names(walk_tree, ignore_globs=parse_globs("skip_*, deeper"))
+        assert names == ["@eaDir/x.png", "a.png", "b.png", "broken.png", "sub/c.png"]
+
+        names = self.names(walk_tree, ignore_globs=DEFAULT_IGNORE_GLOBS + parse_globs("skip_*"))
+        assert names == ["a.png", "b.png", "broken.png", "sub/c.png", "sub/deeper/x.png"]
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("max_depth,expected", [
+        (0, ["a.png", "b.png", "broken.png"]),
+        (1, ["a.png", "b.png", "broken.png", "skip_me/x.png", "sub/c.png"]),
+    ])
+    def test_max_depth(self, walk_tree, max_depth, expected):
+        """Test that max_depth limits how many folder levels are descended."""
+        assert self.names(walk_tree, max_depth=max_depth) == expected
+
+    @pytest.mark.unit
+    def test_stat_results_match(self, sample_image_dir):
+        """Test that the yielded stat results describe the files."""
+        for path, st in walk_image_files(str(sample_image_dir)):
+            assert st.st_size == os.stat(path).st_size
+
+    @pytest.mark.unit
+    def test_helpers(self):
+        """Test glob parsing and the ignore check."""
+        assert parse_globs(" a*,\nb , ") == ("a*", "b")
+        assert is_ignored_directory(".git")
+        assert is_ignored_directory("__pycache__")
+        assert not is_ignored_directory("photos")
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_catalog_respects_depth(self, catalog, walk_tree):
+        """Test that pruned files are left out but kept in the catalog."""
+        shallow = catalog.get_image_files(str(walk_tree), max_depth=0)
+        assert [os.path.basename(f) for f in shallow] == ["a.png", "b.png"]
+        assert catalog.get_record(str(walk_tree / "sub" / "c.png")) is None
+
+        catalog.get_image_files(str(walk_tree))
+        catalog.get_image_files(str(walk_tree), max_depth=0)
+        assert catalog.get_record(str(walk_tree / "sub" / "c.png"))["valid"] == 1
+
+    @pytest.mark.unit
+    def test_directory_listing_prunes(self, catalog, walk_tree):
+        """Test that the directory dropdown skips hidden and ignored folders."""
+        listed = catalog.list_image_directories(str(walk_tree))
+        assert ".thumbnails" not in listed
+        assert "@eaDir" not in listed
+        assert "sub/deeper" in listed
+
+    @pytest.mark.slow
+    def test_benchmark_against_os_walk(self, tmp_path):
+        """Compare the walker with the previous os.walk listing on a 100k-file tree."""
+        allowed_extensions = [".png", ".jpg", ".jpeg", ".gif", ".webp"]
+        root = tmp_path / "tree"
+        for d in range(100):
+            folder = root / f"dir_{d:03}"
+            folder.mkdir(parents=True)
+            for i in range(1000):
+                suffix = ".png" if i % 4 else ".txt"
+                (folder / f"{i:04}{suffix}").touch()
+        thumbs = root / ".thumbnails"
+        thumbs.mkdir()
+        for i in range(1000):
+            (thumbs / f"{i:04}.png").touch()
+
+        def legacy():
+            found = []
+            for walk_root, _, files in os.walk(root):
+                for file in files:
+                    if any(file.lower().endswith(ext) for ext in allowed_extensions):
+                        file_path = os.path.join(walk_root, file)
+                        found.append((file_path, os.stat(file_path)))
+            return found
+
+        start = time.perf_counter()
+        expected = legacy()
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = list(walk_image_files(str(root)))
+        walker_time = time.perf_counter() - start
+
+        print(f"\nwalk 101k files: os.walk {legacy_time * 1000:.0f} ms, "
+              f"scandir walker {walker_time * 1000:.0f} ms ({legacy_time / walker_time:.2f}x)")
+        assert len(expected) == 76000
+        assert len(found) == 75000
+
+
+@pytest.fixture
+def sized_tree(tmp_path):
+    """A folder of images with distinct names, sizes, shapes and mtimes."""
+    root = tmp_path / "sized"
+    root.mkdir()
+    shapes = {"img10.png": (40, 10), "img2.png": (10, 10), "img1.png": (10, 30), "IMG3.jpg": (50, 40)}
+    for age, (name, size) in enumerate(shapes.items()):
+        Image.new("RGB", size).save(root / name)
+        os.utime(root / name, ns=(10**18 - age * 10**9, 10**18 - age * 10**9))
+    return root
+
+
+class TestImageSelection:
+    """Test suite for sorting and filtering listings by stored data."""
+
+    @staticmethod
+    def names(paths):
+        return [file_name(p) for p in paths]
+
+    @pytest.mark.unit
+    def test_natural_key(self):
+        """Test that digit runs compare as numbers, ignoring case."""
+        names = ["img10.png", "IMG2.png", "img1.png", "img2b.png"]
+        assert sorted(names, key=natural_key) == ["img1.png", "IMG2.png", "img2b.png", "img10.png"]
+
+    @pytest.mark.unit
+    def test_select_images_uses_upright_size(self):
+        """Test that rotated EXIF orientations swap width and height."""
+        info = {"a.jpg": (1, 1, 40, 30, 6), "b.jpg": (1, 1, 40, 30, 1)}
+        assert select_images(info, ImageSelection(orientation="portrait")) == ["a.jpg"]
+        assert select_images(info, ImageSelection(max_height=35)) == ["b.jpg"]
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    @pytest.mark.parametrize("sort,descending,expected", [
+        ("path", False, ["IMG3.jpg", "img1.png", "img10.png", "img2.png"]),
+        ("natural", False, ["img1.png", "img2.png", "IMG3.jpg", "img10.png"]),
+        ("mtime", True, ["img10.png", "img2.png", "img1.png", "IMG3.jpg"]),
+        ("pixels", False, ["img2.png", "img1.png", "img10.png", "IMG3.jpg"]),
+        ("aspect", True, ["img10.png", "IMG3.jpg", "img2.png", "img1.png"]),
+    ])
+    def test_sort_keys(self, catalog, sized_tree, sort, descending, expected):
+        """Test every sort key against the stored stat and header data."""
+        selection = ImageSelection(sort=sort, descending=descending)
+        files = catalog.get_image_files(str(sized_tree), "none", selection=selection)
+        assert self.names(files) == expected
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_size_sort(self, catalog, sized_tree):
+        """Test sorting by file size."""
+        files = catalog.get_image_files(str(sized_tree), selection=ImageSelection(sort="size"))
+        sizes = [os.path.getsize(f) for f in files]
+        assert sizes == sorted(sizes)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    @pytest.mark.parametrize("selection,expected", [
+        (ImageSelection(min_width=40), ["IMG3.jpg", "img10.png"]),
+        (ImageSelection(max_width=10, min_height=20), ["img1.png"]),
+        (ImageSelection(orientation="landscape"), ["IMG3.jpg", "img10.png"]),
+        (ImageSelection(orientation="square"), ["img2.png"]),
+        (ImageSelection(name_globs=("img1*",)), ["img1.png", "img10.png"]),
+        (ImageSelection(name_globs=("*.jpg", "img2.*")), ["IMG3.jpg", "img2.png"]),
+    ])
+    def test_filters(self, catalog, sized_tree, selection, expected):
+        """Test dimension, orientation and name filters."""
+        files = catalog.get_image_files(str(sized_tree), "none", selection=selection)
+        assert self.names(files) == expected
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_order_is_cached_until_the_directory_changes(self, catalog, sized_tree, monkeypatch):
+        """Test that an unchanged listing reuses its order and a new file invalidates it."""
+        selection = ImageSelection(sort="pixels")
+        first = catalog.get_image_files(str(sized_tree), selection=selection)
+
+        def fail(*args):
+            raise AssertionError("order recomputed")
+
+        monkeypatch.setattr(pipemind_image_catalog, "select_images", fail)
+        assert catalog.get_image_files(str(sized_tree), selection=selection) == first
+
+        Image.new("RGB", (1, 1)).save(sized_tree / "tiny.png")
+        monkeypatch.undo()
+        files = catalog.get_image_files(str(sized_tree), selection=selection)
+        assert self.names(files)[0] == "tiny.png"
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_sorting_never_opens_images(self, catalog, sized_tree, monkeypatch):
+        """Test that re-sorting a scanned folder only uses the catalog."""
+        catalog.get_image_files(str(sized_tree))
+        monkeypatch.setattr(pipemind_image_catalog.Image, "open", None)
+
+        for sort in ["natural", "mtime", "size", "pixels", "aspect"]:
+            files = catalog.get_image_files(str(sized_tree), selection=ImageSelection(sort=sort))
+            assert len(files) == 4
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_archive_members(self, catalog, sample_image_shards):
+        """Test that members are sorted and filtered after reading their headers once."""
+        archive = str(sample_image_shards / "data.tar")
+        assert self.names(catalog.get_image_files(archive)) == [
+            "000001.png", "000002.png", "000003.png",
+        ]
+
+        landscape = catalog.get_image_files(
+            archive, selection=ImageSelection(orientation="landscape")
+        )
+        assert self.names(landscape) == ["000002.png"]
+        descending = catalog.get_image_files(archive, selection=ImageSelection(descending=True))
+        assert self.names(descending) == ["000002.png", "000001.png"]
+
+
+@pytest.fixture
+def captioned_dir(sample_image_dir):
+    """The sample tree with a caption for a.png and b.png and metadata for a.png."""
+    (sample_image_dir / "a.txt").write_text("a red image", encoding="utf-8")
+    (sample_image_dir / "a.json").write_text(json.dumps({"tags": ["red"]}))
+    (sample_image_dir / "b.caption").write_text("a green image", encoding="utf-8")
+    return sample_image_dir
+
+
+class TestSidecars:
+    """Test suite for ImageCatalog.get_sidecars."""
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_pairs_by_name(self, catalog, captioned_dir):
+        """Test that captions and metadata are found for the listed images only."""
+        files = catalog.get_image_files(str(captioned_dir))
+        a, b, c = (str(captioned_dir / name) for name in ("a.png", "b.png", "sub/c.png"))
+
+        sidecars = catalog.get_sidecars(files)
+        assert sidecars[a] == ("a red image", {"tags": ["red"]})
+        assert sidecars[b] == ("", {})
+        assert sidecars[c] == ("", {})
+        assert catalog.get_sidecars([b], ".caption")[b] == ("a green image", {})
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_lookup_never_probes_files(self, catalog, captioned_dir, monkeypatch):
+        """Test that stored sidecars are returned without touching the file system."""
+        files = catalog.get_image_files(str(captioned_dir))
+        catalog.get_sidecars(files)
+
+        monkeypatch.setattr(os.path, "exists", None)
+        monkeypatch.setattr("builtins.open", None)
+        assert catalog.get_sidecars(files)[files[0]][0] == "a red image"
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_changes_are_picked_up(self, catalog, captioned_dir):
+        """Test that a rewritten, new or deleted sidecar is seen by the next listing."""
+        a = str(captioned_dir / "a.png")
+        b = str(captioned_dir / "b.png")
+        catalog.get_sidecars(catalog.get_image_files(str(captioned_dir)), workers=1)
+
+        (captioned_dir / "a.txt").write_text("now a longer caption", encoding="utf-8")
+        (captioned_dir / "a.json").unlink()
+        (captioned_dir / "b.txt").write_text("new", encoding="utf-8")
+
+        sidecars = catalog.get_sidecars(catalog.get_image_files(str(captioned_dir)), workers=1)
+        assert sidecars[a] == ("now a longer caption", {})
+        assert sidecars[b] == ("new", {})
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_invalid_json(self, catalog, captioned_dir):
+        """Test that a broken metadata file yields empty metadata."""
+        (captioned_dir / "a.json").write_text("{not json")
+        files = catalog.get_image_files(str(captioned_dir))
+        assert catalog.get_sidecars(files)[files[0]] == ("a red image", {})
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_single_file_source(self, catalog, captioned_dir):
+        """Test that an image selected as a file finds its sidecars too."""
+        a = str(captioned_dir / "a.png")
+        assert catalog.get_sidecars(catalog.get_image_files(a))[a][0] == "a red image"
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    @pytest.mark.parametrize("shard", ["data.tar", "data.zip"])
+    def test_archive_members(self, catalog, sample_image_shards, shard):
+        """Test that WebDataset-style samples pair an image with its caption member."""
+        files = catalog.get_image_files(str(sample_image_shards / shard))
+        sidecars = catalog.get_sidecars(files)
+        assert [sidecars[path][0] for path in files] == ["not an image", "", ""]
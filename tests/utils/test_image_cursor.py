@@ -0,0 +1,141 @@
+"""
+Tests for the shared cursor used by sequential mode across ComfyUI instances.
+
+This module tests:
+- Atomic claiming without duplicates across connections
+- Completing claims and starting new epochs
+- Handing out expired leases of crashed workers
+- Claiming by path when the workers' listings differ
+"""
+
+import threading
+import time
+import pytest
+
+from pipemind_image_cursor import SharedCursor, get_shared_cursor, worker_id
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Path of a cursor database in a temporary shared folder."""
+    return str(tmp_path / "cursor.sqlite3")
+
+
+def names(count):
+    """A listing of count relative image paths."""
+    return [f"img_{i:04}.png" for i in range(count)]
+
+
+class TestSharedCursor:
+    """Test suite for SharedCursor."""
+
+    @pytest.mark.unit
+    def test_claims_advance_and_wrap(self, db_path):
+        """Test that indices are claimed in order and a new epoch starts after the last."""
+        cursor = SharedCursor(db_path)
+        claims = []
+        previous = None
+        for _ in range(5):
+            index, epoch = cursor.claim("images", names(3), "w1", release=previous)
+            claims.append((index, epoch))
+            previous = names(3)[index]
+        assert claims == [(0, 0), (1, 0), (2, 0), (0, 1), (1, 1)]
+
+    @pytest.mark.unit
+    def test_concurrent_workers_never_share_an_index(self, db_path):
+        """Test that workers on separate connections claim disjoint indices."""
+        claimed = []
+        lock = threading.Lock()
+
+        def work(name):
+            cursor = SharedCursor(db_path)
+            paths = names(1000)
+            previous = None
+            for _ in range(25):
+                index, _ = cursor.claim("images", paths, name, release=previous)
+                previous = paths[index]
+                with lock:
+                    claimed.append(index)
+            cursor.close()
+
+        SharedCursor(db_path).close()  # Create the schema up front
+        threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(claimed) == list(range(100))
+
+    @pytest.mark.unit
+    def test_expired_lease_is_handed_out_again(self, db_path):
+        """Test that a crashed worker's claim goes to the next worker first."""
+        cursor = SharedCursor(db_path)
+        paths = names(10)
+        crashed, _ = cursor.claim("images", paths, "crashed", lease_seconds=0.05)
+        assert cursor.claim("images", paths, "alive")[0] == 1
+
+        time.sleep(0.1)
+        assert cursor.claim("images", paths, "alive", release=paths[1])[0] == crashed
+        assert cursor.claim("images", paths, "alive", release=paths[crashed])[0] == 2
+
+    @pytest.mark.unit
+    def test_completed_claims_do_not_expire(self, db_path):
+        """Test that released claims are never handed out again in the epoch."""
+        cursor = SharedCursor(db_path)
+        paths = names(10)
+        first, _ = cursor.claim("images", paths, "w1", lease_seconds=0.05)
+        cursor.complete("images", paths[first], "w1")
+
+        time.sleep(0.1)
+        assert cursor.claim("images", paths, "w1")[0] == 1
+
+    @pytest.mark.unit
+    def test_sources_are_independent(self, db_path):
+        """Test that each directory has its own position."""
+        cursor = SharedCursor(db_path)
+        cursor.claim("a", names(10), "w1")
+        assert cursor.claim("b", names(10), "w1") == (0, 0)
+        cursor.reset("a")
+        assert cursor.claim("a", names(10), "w1") == (0, 0)
+
+    @pytest.mark.unit
+    def test_differing_listings_share_paths(self, db_path):
+        """Test that a path is claimed once per epoch even if the workers' listings differ."""
+        cursor = SharedCursor(db_path)
+        full = names(6)
+        # w2 does not list img_0001 (e.g. it failed to decode there) and
+        # lists a file that arrived later, which shifts every index
+        shifted = ["img_0000.png", "img_0002.png", "img_0002b.png"] + full[3:]
+
+        claimed = []
+        for worker, paths in [("w1", full), ("w2", shifted)] * 4:
+            index, epoch = cursor.claim("images", paths, worker)
+            claimed.append((paths[index], epoch))
+
+        # Each listed path once in epoch 0, then the next epoch starts over
+        first_epoch = [path for path, epoch in claimed if epoch == 0]
+        assert sorted(first_epoch) == sorted(set(full) | set(shifted))
+        assert claimed[7] == ("img_0000.png", 1)
+
+    @pytest.mark.unit
+    def test_expired_claim_outside_listing(self, db_path):
+        """Test that an expired claim of a path this worker does not list is left alone."""
+        cursor = SharedCursor(db_path)
+        cursor.claim("images", ["gone.png"], "crashed", lease_seconds=0.05)
+        time.sleep(0.1)
+        assert cursor.claim("images", names(2), "alive") == (1, 0)
+
+    @pytest.mark.unit
+    def test_empty_listing(self, db_path):
+        """Test that claiming from an empty listing is refused."""
+        with pytest.raises(ValueError):
+            SharedCursor(db_path).claim("images", [], "w1")
+
+    @pytest.mark.unit
+    def test_helpers(self, tmp_path):
+        """Test the per-folder cursor registry and worker ids."""
+        assert get_shared_cursor(str(tmp_path)) is get_shared_cursor(str(tmp_path))
+        first, second = object(), object()
+        assert worker_id(first) != worker_id(second)
+        assert worker_id().count(":") == 1
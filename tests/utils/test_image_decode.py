@@ -0,0 +1,387 @@
+"""
+Tests for the shared image decoding helpers used by the batch image loaders.
+
+This module tests:
+- Full decoding with EXIF orientation
+- Reduced-resolution decoding
+- Falling through corrupt images
+- Background prefetching
+- Parallel decoding and batch stacking
+- Tensor conversion and output buffer reuse
+- Frame-by-frame loading of animations
+"""
+
+import threading
+import time
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+from pipemind_image_decode import (
+    ImagePrefetcher, TensorBufferPool, decode_many, decode_with_fallback, fit_image, fit_within,
+    frame_indices, iter_decoded, load_frames, open_image, pil2tensor, stack_images,
+)
+
+
+def legacy_pil2tensor(image):
+    """The conversion the loaders used before pil2tensor moved here."""
+    image = np.array(image).astype(np.float32) / 255.0
+    return torch.from_numpy(image)[None,]
+
+
+class TestDecodeHelpers:
+    """Test suite for open_image and decode_with_fallback."""
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_open_image_returns_rgb(self, sample_image_dir):
+        """Test that any input mode is decoded to RGB."""
+        image = open_image(sample_image_dir / "sub" / "c.png")
+        assert image.mode == "RGB"
+        assert image.size == (24, 24)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_open_image_applies_exif_orientation(self, tmp_path):
+        """Test that EXIF orientation is applied while decoding."""
+        path = tmp_path / "rotated.jpg"
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotate 90 degrees clockwise
+        Image.new("RGB", (40, 20)).save(path, exif=exif)
+
+        assert open_image(path).size == (20, 40)
+
+    @pytest.mark.unit
+    def test_fit_within(self):
+        """Test that size limits keep the aspect ratio and never upscale."""
+        assert fit_within(6000, 4000, max_side=1024) == (1024, 683)
+        assert fit_within(6000, 4000, target_width=600) == (600, 400)
+        assert fit_within(6000, 4000, target_width=600, target_height=100) == (150, 100)
+        assert fit_within(100, 50, max_side=1024) == (100, 50)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    @pytest.mark.parametrize("suffix", [".jpg", ".png"])
+    def test_open_image_reduced(self, tmp_path, suffix):
+        """Test that limits shrink the decoded image for JPEG and other formats."""
+        path = tmp_path / f"large{suffix}"
+        Image.new("RGB", (1200, 800), (10, 200, 30)).save(path)
+
+        image = open_image(path, max_side=300)
+        assert image.size == (300, 200)
+        assert image.mode == "RGB"
+        assert open_image(path, target_height=100).size == (150, 100)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_open_image_reduced_rotated(self, tmp_path):
+        """Test that limits apply to the upright image of a rotated photo."""
+        path = tmp_path / "rotated.jpg"
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        Image.new("RGB", (800, 400)).save(path, exif=exif)
+
+        assert open_image(path, target_width=100).size == (100, 200)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_fallback_skips_corrupt(self, sample_image_dir):
+        """Test that a corrupt pick falls through and is reported."""
+        files = [str(sample_image_dir / n) for n in ["a.png", "broken.png", "b.png"]]
+        invalid = []
+
+        index, image = decode_with_fallback(files, 1, invalid.append)
+        assert index == 2
+        assert image.size == (16, 32)
+        assert invalid == [files[1]]
+
+    @pytest.mark.unit
+    def test_fallback_all_corrupt(self, sample_image_dir):
+        """Test that an error is raised when nothing decodes."""
+        with pytest.raises(ValueError):
+            decode_with_fallback([str(sample_image_dir / "broken.png")], 0)
+
+
+class TestBatchHelpers:
+    """Test suite for decode_many, fit_image and stack_images."""
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_decode_many_keeps_order(self, sample_image_dir):
+        """Test that parallel decoding keeps input order and flags failures."""
+        paths = [str(sample_image_dir / n) for n in ["b.png", "broken.png", "a.png"]]
+        invalid = []
+
+        images = decode_many(paths, open_image, invalid.append, workers=3)
+        assert [None if im is None else im.size for im in images] == [(16, 32), None, (32, 16)]
+        assert invalid == [paths[1]]
+
+    @pytest.mark.unit
+    def test_iter_decoded_bounds_in_flight(self):
+        """Test that streaming decode never runs ahead of its window."""
+        consumed = []
+        started = []
+        ahead = []
+
+        def decode(path):
+            started.append(path)
+            ahead.append(len(started) - len(consumed))
+            return path * 2
+
+        results = []
+        for path, result in iter_decoded(range(10), decode, window=2):
+            consumed.append(path)
+            results.append(result)
+
+        # The window is refilled just before an item is handed over
+        assert max(ahead) <= 3
+        assert results == [i * 2 for i in range(10)]
+
+    @pytest.mark.unit
+    def test_iter_decoded_reports_failures(self):
+        """Test that a failing decode yields None and is reported."""
+        def decode(path):
+            if path == "bad":
+                raise OSError("corrupt")
+            return path
+
+        invalid = []
+        results = list(iter_decoded(["a", "bad", "b"], decode, 2, invalid.append))
+        assert results == [("a", "a"), ("bad", None), ("b", "b")]
+        assert invalid == ["bad"]
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("fit", ["resize", "pad", "crop"])
+    def test_fit_image_size(self, fit):
+        """Test that every fit policy produces the requested size."""
+        image = torch.rand(1, 30, 50, 3)
+        assert fit_image(image, 40, 40, fit).shape == (1, 40, 40, 3)
+
+    @pytest.mark.unit
+    def test_fit_pad_letterboxes(self):
+        """Test that padding keeps the content centered between black bars."""
+        image = torch.ones(1, 10, 20, 3)
+        fitted = fit_image(image, 20, 20, "pad")
+        assert fitted[0, 0].sum() == 0
+        assert fitted[0, -1].sum() == 0
+        assert torch.allclose(fitted[0, 10], torch.ones(20, 3))
+
+    @pytest.mark.unit
+    def test_fit_crop_fills(self):
+        """Test that cropping covers the whole target without bars."""
+        image = torch.ones(1, 10, 20, 3)
+        fitted = fit_image(image, 20, 20, "crop")
+        assert torch.allclose(fitted, torch.ones(1, 20, 20, 3))
+
+    @pytest.mark.unit
+    def test_stack_images_uses_first_size(self):
+        """Test that a batch takes the size of its first image."""
+        batch = stack_images([torch.rand(1, 8, 8, 3), torch.rand(1, 16, 4, 3)])
+        assert batch.shape == (2, 8, 8, 3)
+
+
+class TestImagePrefetcher:
+    """Test suite for ImagePrefetcher."""
+
+    @pytest.mark.unit
+    def test_hits_and_misses(self):
+        """Test that scheduled images are served from the prefetch queue."""
+        prefetcher = ImagePrefetcher(lambda path: path.upper(), depth=2)
+
+        assert prefetcher.load("a") == "A"
+        prefetcher.schedule(["b", "c", "d"])
+        assert prefetcher.stats()["pending"] == 2
+
+        assert prefetcher.load("b") == "B"
+        assert prefetcher.load("c") == "C"
+        assert prefetcher.load("z") == "Z"
+        assert (prefetcher.hits, prefetcher.misses) == (2, 2)
+
+    @pytest.mark.unit
+    def test_jump_drops_pending(self):
+        """Test that requesting an unexpected image drops the read-ahead."""
+        release = threading.Event()
+
+        def slow_load(path):
+            release.wait(5)
+            return path
+
+        prefetcher = ImagePrefetcher(slow_load, depth=3)
+        prefetcher.schedule(["b", "c", "d"])
+        release.set()
+        assert prefetcher.load("x") == "x"
+        assert prefetcher.stats()["pending"] == 0
+
+    @pytest.mark.unit
+    def test_errors_surface_on_load(self):
+        """Test that a failed background decode raises when the image is used."""
+        def failing_load(path):
+            raise OSError(f"cannot decode {path}")
+
+        prefetcher = ImagePrefetcher(failing_load, depth=1)
+        prefetcher.schedule(["bad"])
+        with pytest.raises(OSError):
+            prefetcher.load("bad")
+        assert prefetcher.hits == 1
+
+    @pytest.mark.unit
+    def test_zero_depth_disables(self):
+        """Test that a depth of zero never starts background work."""
+        prefetcher = ImagePrefetcher(lambda path: path, depth=0)
+        prefetcher.schedule(["a", "b"])
+        assert prefetcher.stats()["pending"] == 0
+
+
+class TestPil2Tensor:
+    """Test suite for pil2tensor and TensorBufferPool."""
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_matches_legacy_conversion(self):
+        """Test that values are bit-identical to the previous conversion."""
+        image = Image.effect_noise((40, 24), 80).convert("RGB")
+        tensor = pil2tensor(image)
+
+        assert tensor.shape == (1, 24, 40, 3)
+        assert tensor.dtype == torch.float32
+        assert torch.equal(tensor, legacy_pil2tensor(image))
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_grayscale_gets_channel_axis(self):
+        """Test that single-channel images keep a channel dimension."""
+        tensor = pil2tensor(Image.new("L", (8, 4), 255))
+        assert tensor.shape == (1, 4, 8, 1)
+        assert torch.all(tensor == 1.0)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_pool_reuses_released_buffers(self):
+        """Test that a buffer is leased again only after it was released."""
+        pool = TensorBufferPool()
+        image = Image.new("RGB", (8, 8), (255, 0, 0))
+
+        first = pil2tensor(image, pool=pool)
+        first_ptr = first.data_ptr()
+        second = pil2tensor(image, pool=pool)
+        assert second.data_ptr() != first_ptr
+
+        # Dropping every reference does not return a buffer to the pool
+        del first
+        third = pil2tensor(image, pool=pool)
+        assert third.data_ptr() != first_ptr
+
+        pool.release(third)
+        pool.release(third)  # Releasing twice keeps one entry
+        fourth = pil2tensor(image, pool=pool)
+        assert fourth.data_ptr() == third.data_ptr()
+        assert torch.equal(fourth, second)
+        assert pool.stats() == {"allocated": 3, "reused": 1, "pooled": 0, "bytes": 0}
+
+    @pytest.mark.unit
+    def test_pool_caps_buffers_per_shape(self):
+        """Test that at most max_per_shape released buffers are kept for a shape."""
+        pool = TensorBufferPool(max_per_shape=2)
+        held = [pool.acquire((1, 4, 4, 3)) for _ in range(5)]
+        for buffer in held:
+            pool.release(buffer)
+
+        assert len({buffer.data_ptr() for buffer in held}) == 5
+        assert pool.stats()["pooled"] == 2
+        pool.clear()
+        assert pool.stats()["pooled"] == 0
+
+    @pytest.mark.unit
+    def test_pool_byte_budget(self):
+        """Test that buffers of the least recently released shapes are dropped first."""
+        buffer_bytes = 4 * 4 * 3 * 4
+        pool = TensorBufferPool(max_bytes=2 * buffer_bytes)
+        small, other = pool.acquire((1, 4, 4, 3)), pool.acquire((1, 3, 4, 4))
+        pool.release(small)
+        pool.release(other)
+        pool.release(torch.empty((1, 4, 3, 4)))
+
+        assert pool.stats()["pooled"] == 2
+        assert pool.stats()["bytes"] == 2 * buffer_bytes
+        assert pool.acquire((1, 4, 4, 3)).data_ptr() != small.data_ptr()
+        assert pool.acquire((1, 3, 4, 4)).data_ptr() == other.data_ptr()
+
+        pool.release(torch.empty((1, 64, 64, 3)))  # Larger than the whole budget
+        assert pool.stats()["pooled"] == 1
+
+    @pytest.mark.slow
+    @pytest.mark.image
+    def test_benchmark_against_legacy(self):
+        """Compare pil2tensor (pooled) with the legacy conversion on a large image."""
+        image = Image.effect_noise((2048, 2048), 80).convert("RGB")
+        pool = TensorBufferPool()
+        rounds = 10
+
+        def timed(convert, release=None):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                tensor = convert(image)
+                if release is not None:
+                    release(tensor)
+                del tensor
+            return (time.perf_counter() - start) / rounds
+
+        legacy = timed(legacy_pil2tensor)
+        pooled = timed(lambda img: pil2tensor(img, pool=pool), pool.release)
+        print(f"\npil2tensor 2048x2048: legacy {legacy * 1000:.1f} ms, "
+              f"pooled {pooled * 1000:.1f} ms ({legacy / pooled:.2f}x)")
+
+        assert pool.stats()["allocated"] == 1
+        assert torch.equal(pil2tensor(image), legacy_pil2tensor(image))
+
+
+def save_animation(path, count=6):
+    """Save an animation whose frame i is filled with gray level 40 * i."""
+    frames = [Image.new("RGB", (12, 8), (40 * i,) * 3) for i in range(count)]
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=50, loop=0,
+                   **({"lossless": True} if str(path).endswith(".webp") else {}))
+
+
+class TestLoadFrames:
+    """Test suite for frame-by-frame loading of animated images."""
+
+    @pytest.mark.unit
+    def test_frame_indices(self):
+        """Test start, stride and frame limit."""
+        assert list(frame_indices(10)) == list(range(10))
+        assert list(frame_indices(10, start=1, step=3)) == [1, 4, 7]
+        assert list(frame_indices(10, step=2, max_frames=2)) == [0, 2]
+        assert list(frame_indices(3, start=5)) == []
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    @pytest.mark.parametrize("suffix", [".gif", ".webp"])
+    def test_selected_frames(self, tmp_path, suffix):
+        """Test that only the requested frames end up in the batch, in order."""
+        path = tmp_path / f"anim{suffix}"
+        save_animation(path)
+
+        frames, indices, frame_count = load_frames(str(path), start=1, step=2, max_frames=2)
+        assert frame_count == 6
+        assert indices == [1, 3]
+        assert frames.shape == (2, 8, 12, 3)
+        assert frames.dtype == torch.float32
+        gray = (frames[:, 0, 0, 0] * 255).round().tolist()
+        assert gray == [40.0, 120.0]
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_reduced_size_and_still_images(self, tmp_path):
+        """Test size limits on frames and that still images have one frame."""
+        path = tmp_path / "anim.gif"
+        save_animation(path, count=3)
+        frames, _, _ = load_frames(str(path), max_side=6)
+        assert frames.shape == (3, 4, 6, 3)
+
+        Image.new("RGB", (5, 7)).save(tmp_path / "still.png")
+        frames, indices, frame_count = load_frames(str(tmp_path / "still.png"))
+        assert (frames.shape, indices, frame_count) == ((1, 7, 5, 3), [0], 1)
+
+        with pytest.raises(ValueError):
+            load_frames(str(tmp_path / "still.png"), start=1)
@@ -0,0 +1,194 @@
+"""
+Tests for the PNG text chunk index and metadata filters.
+
+This module tests:
+- Reading tEXt, zTXt and iTXt chunks without decoding pixels
+- Filter expressions: substring, regex and JSON path
+- Storing text chunks in the catalog and filtering listings
+"""
+
+import io
+import json
+import struct
+import zlib
+import pytest
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+from pipemind_image_archive import member_path
+from pipemind_image_metadata import compile_text_filter, read_png_text
+
+PROMPT = {
+    "3": {"class_type": "KSampler", "inputs": {"seed": 42, "steps": 20}},
+    "6": {"class_type": "CLIPTextEncode", "inputs": {"text": "A castle on a hill"}},
+}
+
+
+def save_png(path, **text):
+    """Save a small PNG carrying the given tEXt chunks."""
+    info = PngInfo()
+    for key, value in text.items():
+        info.add_text(key, value)
+    Image.new("RGB", (8, 8), (0, 0, 255)).save(path, pnginfo=info)
+
+
+def append_chunk(png_bytes, chunk_type, data):
+    """Insert a chunk right before IEND, after the image data."""
+    iend = png_bytes.rindex(b"IEND") - 4
+    chunk = struct.pack(">I", len(data)) + chunk_type + data
+    chunk += struct.pack(">I", zlib.crc32(chunk[4:]))
+    return png_bytes[:iend] + chunk + png_bytes[iend:]
+
+
+@pytest.fixture
+def tagged_images(tmp_path):
+    """A folder with two ComfyUI-style PNGs, one untagged PNG and a JPEG."""
+    root = tmp_path / "renders"
+    root.mkdir()
+    save_png(root / "castle.png", prompt=json.dumps(PROMPT), workflow="{}")
+    other = dict(PROMPT, **{"6": {"class_type": "CLIPTextEncode", "inputs": {"text": "A cat"}}})
+    save_png(root / "cat.png", prompt=json.dumps(other))
+    save_png(root / "plain.png")
+    Image.new("RGB", (8, 8)).save(root / "photo.jpg")
+    return root
+
+
+class TestReadPngText:
+    """Test suite for read_png_text."""
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_all_text_chunk_types(self, tmp_path):
+        """Test that tEXt, compressed zTXt and UTF-8 iTXt chunks are read."""
+        info = PngInfo()
+        info.add_text("plain", "latin")
+        info.add_text("packed", "squeezed " * 50, zip=True)
+        info.add_itxt("unicode", "château", lang="fr", zip=True)
+        Image.new("RGB", (8, 8)).save(tmp_path / "t.png", pnginfo=info)
+
+        assert read_png_text(tmp_path / "t.png") == {
+            "plain": "latin", "packed": "squeezed " * 50, "unicode": "château",
+        }
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_chunks_after_image_data(self, tmp_path):
+        """Test that text stored after IDAT is found without loading the image."""
+        buffer = io.BytesIO()
+        Image.new("RGB", (8, 8)).save(buffer, format="PNG")
+        data = append_chunk(buffer.getvalue(), b"tEXt", b"late\0value")
+
+        assert read_png_text(io.BytesIO(data)) == {"late": "value"}
+
+    @pytest.mark.unit
+    def test_non_png_and_malformed_chunks(self, tmp_path):
+        """Test that non-PNG data and broken chunks yield no text instead of errors."""
+        assert read_png_text(io.BytesIO(b"GIF89a....")) == {}
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (8, 8)).save(buffer, format="PNG")
+        data = append_chunk(buffer.getvalue(), b"zTXt", b"bad\0\0not zlib")
+        data = append_chunk(data, b"tEXt", b"good\0yes")
+        assert read_png_text(io.BytesIO(data)) == {"good": "yes"}
+
+
+class TestCompileTextFilter:
+    """Test suite for metadata filter expressions."""
+
+    METADATA = {"prompt": json.dumps(PROMPT), "workflow": "{}"}
+
+    @pytest.mark.unit
+    def test_empty_filter(self):
+        """Test that an empty expression disables filtering."""
+        assert compile_text_filter("") is None
+        assert compile_text_filter("   ") is None
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("expression,expected", [
+        ("CASTLE", True),
+        ("dragon", False),
+        ("re:castle on", True),
+        ("re:^A castle", False),
+        ("$.prompt.6.inputs.text", True),
+        ("$.prompt.9.inputs.text", False),
+        ("$.prompt.*.inputs.text ~ (?i)castle", True),
+        ("$.prompt.*.inputs.text ~ dragon", False),
+        ("$.prompt.3.inputs.seed = 42", True),
+        ("$.prompt.3.inputs.seed = 7", False),
+        ("$.prompt.*.class_type=KSampler", True),
+        ("$.workflow.nodes", False),
+    ])
+    def test_expressions(self, expression, expected):
+        """Test substring, regex and JSON path expressions."""
+        assert compile_text_filter(expression)(self.METADATA) is expected
+
+    @pytest.mark.unit
+    def test_invalid_regex(self):
+        """Test that a broken pattern is reported as a ValueError."""
+        with pytest.raises(ValueError):
+            compile_text_filter("re:(unclosed")
+
+
+class TestCatalogMetadata:
+    """Test suite for the catalog's text chunk index."""
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_text_is_stored_while_scanning(self, catalog, tagged_images, monkeypatch):
+        """Test that a header scan stores the text so filtering opens no files."""
+        import pipemind_image_catalog
+
+        paths = catalog.get_image_files(str(tagged_images), "header")
+        monkeypatch.setattr(pipemind_image_catalog, "read_png_text", None)
+        metadata = catalog.get_text_metadata(paths)
+
+        assert metadata[str(tagged_images / "castle.png")]["workflow"] == "{}"
+        assert metadata[str(tagged_images / "photo.jpg")] == {}
+        assert metadata[str(tagged_images / "plain.png")] == {}
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_filter_images(self, catalog, tagged_images):
+        """Test that filtering keeps the matching images in order."""
+        paths = catalog.get_image_files(str(tagged_images), "none")
+        predicate = compile_text_filter("$.prompt.*.inputs.text ~ ^A ca")
+
+        assert catalog.filter_images(paths, predicate, workers=1) == [
+            str(tagged_images / "castle.png"), str(tagged_images / "cat.png"),
+        ]
+        assert catalog.filter_images(paths, compile_text_filter("castle")) == [
+            str(tagged_images / "castle.png"),
+        ]
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_text_is_read_again_after_a_change(self, catalog, tagged_images):
+        """Test that rewriting a file replaces its stored text."""
+        path = str(tagged_images / "plain.png")
+        catalog.get_image_files(str(tagged_images), "none")
+        assert catalog.get_text_metadata([path])[path] == {}
+
+        save_png(path, prompt="now tagged, and a bit longer")
+        paths = catalog.get_image_files(str(tagged_images), "none")
+        assert path in catalog.filter_images(paths, compile_text_filter("tagged"))
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_archive_members(self, catalog, tagged_images, tmp_path, monkeypatch):
+        """Test that the text of archive members is read and stored."""
+        import zipfile
+        import pipemind_image_catalog
+
+        archive = tmp_path / "renders.zip"
+        with zipfile.ZipFile(archive, "w") as shard:
+            shard.write(tagged_images / "castle.png", "castle.png", zipfile.ZIP_DEFLATED)
+            shard.write(tagged_images / "cat.png", "cat.png")
+
+        paths = catalog.get_image_files(str(archive))
+        assert catalog.filter_images(paths, compile_text_filter("castle")) == [
+            member_path(str(archive), "castle.png"),
+        ]
+
+        # Stored text is reused without reading the archive again
+        monkeypatch.setattr(pipemind_image_catalog, "read_png_text", None)
+        assert "castle" in catalog.get_text_metadata(paths)[paths[0]]["prompt"]
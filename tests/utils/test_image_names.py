@@ -0,0 +1,142 @@
+"""
+Tests for the filename allocator used by PipemindSaveImageWTxt.
+
+This module tests:
+- Sequential names with the legacy counter format
+- The one-time scan of folders without a counter hint
+- Persisted hints (no rescans), malformed hints and skipping names taken elsewhere
+- Collision-free claims from concurrent allocators
+"""
+
+import json
+import os
+import threading
+import pytest
+
+import pipemind_image_names
+from pipemind_image_names import (
+    COUNTER_FILE_NAME, FilenameAllocator, format_name, scan_next_counter,
+)
+
+
+class TestScanNextCounter:
+    """Test suite for the legacy folder scan."""
+
+    @pytest.mark.unit
+    def test_empty_and_missing_folder(self, tmp_path):
+        """Test that counting starts at 0."""
+        assert scan_next_counter(str(tmp_path), "tag") == 0
+        assert scan_next_counter(str(tmp_path / "missing"), "tag") == 0
+
+    @pytest.mark.unit
+    def test_highest_counter(self, tmp_path):
+        """Test that the counter follows the highest existing one."""
+        for name in ["tag_00003.png", "tag_00010.txt", "tag_notes.png", "other_00099.png"]:
+            (tmp_path / name).write_bytes(b"")
+        assert scan_next_counter(str(tmp_path), "tag") == 11
+
+
+class TestFilenameAllocator:
+    """Test suite for FilenameAllocator."""
+
+    @pytest.mark.unit
+    def test_sequential_claims(self, tmp_path):
+        """Test that claims create consecutive files and save_hints persists the next counter."""
+        allocator = FilenameAllocator()
+        claims = [allocator.claim(str(tmp_path), "tag") for _ in range(3)]
+
+        assert claims == [("tag_00000.png", 0), ("tag_00001.png", 1), ("tag_00002.png", 2)]
+        assert all((tmp_path / name).exists() for name, _ in claims)
+        assert not (tmp_path / COUNTER_FILE_NAME).exists()
+
+        allocator.save_hints(str(tmp_path))
+        hints = json.loads((tmp_path / COUNTER_FILE_NAME).read_text())
+        assert hints == {"tag": 3}
+
+    @pytest.mark.unit
+    def test_continues_after_existing_files(self, tmp_path):
+        """Test that a folder without hint is scanned once."""
+        (tmp_path / "tag_00007.png").write_bytes(b"png")
+        assert FilenameAllocator().claim(str(tmp_path), "tag") == ("tag_00008.png", 8)
+
+    @pytest.mark.unit
+    def test_hint_avoids_scan(self, tmp_path, monkeypatch):
+        """Test that a new allocator (another process) starts from the hint."""
+        first = FilenameAllocator()
+        first.claim(str(tmp_path), "tag")
+        first.save_hints(str(tmp_path))
+
+        def no_scan(*args):
+            raise AssertionError("folder scanned")
+
+        monkeypatch.setattr(pipemind_image_names, "scan_next_counter", no_scan)
+        allocator = FilenameAllocator()
+        assert allocator.claim(str(tmp_path), "tag") == ("tag_00001.png", 1)
+        assert allocator.claim(str(tmp_path), "tag") == ("tag_00002.png", 2)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("hint", ["7", None, 2.5, True, -3, [1]])
+    def test_malformed_hint(self, tmp_path, hint):
+        """Test that a malformed hint is ignored when starting and after a collision."""
+        (tmp_path / COUNTER_FILE_NAME).write_text(json.dumps({"tag": hint}))
+        (tmp_path / "tag_00000.png").write_bytes(b"png")
+
+        allocator = FilenameAllocator()
+        assert allocator.claim(str(tmp_path), "tag") == ("tag_00001.png", 1)
+        (tmp_path / "tag_00002.png").write_bytes(b"png")
+        assert allocator.claim(str(tmp_path), "tag") == ("tag_00003.png", 3)
+
+        allocator.save_hints(str(tmp_path))
+        assert json.loads((tmp_path / COUNTER_FILE_NAME).read_text()) == {"tag": 4}
+
+    @pytest.mark.unit
+    def test_save_hints_keeps_newer_hints(self, tmp_path):
+        """Test that saving never lowers another process's hint or drops other prefixes."""
+        (tmp_path / COUNTER_FILE_NAME).write_text(json.dumps({"tag": 50, "other": 3}))
+        allocator = FilenameAllocator()
+        allocator.forget()
+        allocator._next[(str(tmp_path), "tag")] = 10
+        allocator.save_hints(str(tmp_path))
+        assert json.loads((tmp_path / COUNTER_FILE_NAME).read_text()) == {"tag": 50, "other": 3}
+
+    @pytest.mark.unit
+    def test_skips_taken_names(self, tmp_path):
+        """Test that names created behind the allocator's back are skipped."""
+        allocator = FilenameAllocator()
+        allocator.claim(str(tmp_path), "tag")
+        (tmp_path / format_name("tag", 1)).write_bytes(b"png")
+        (tmp_path / format_name("tag", 2)).write_bytes(b"png")
+
+        assert allocator.claim(str(tmp_path), "tag") == ("tag_00003.png", 3)
+        assert (tmp_path / "tag_00001.png").read_bytes() == b"png"
+
+    @pytest.mark.unit
+    def test_prefixes_are_independent(self, tmp_path):
+        """Test that each prefix has its own counter."""
+        allocator = FilenameAllocator()
+        allocator.claim(str(tmp_path), "a")
+        assert allocator.claim(str(tmp_path), "b") == ("b_00000.png", 0)
+        assert allocator.claim(str(tmp_path), "a", ".webp") == ("a_00001.webp", 1)
+
+    @pytest.mark.unit
+    def test_concurrent_allocators(self, tmp_path):
+        """Test that allocators sharing a folder never hand out the same name."""
+        allocators = [FilenameAllocator() for _ in range(4)]
+        claimed = []
+        lock = threading.Lock()
+
+        def work(allocator):
+            for _ in range(25):
+                name, _ = allocator.claim(str(tmp_path), "tag")
+                with lock:
+                    claimed.append(name)
+
+        threads = [threading.Thread(target=work, args=(a,)) for a in allocators]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(claimed) == 100
+        assert len(set(claimed)) == 100
+        assert len([n for n in os.listdir(tmp_path) if n.endswith(".png")]) == 100
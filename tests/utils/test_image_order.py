@@ -0,0 +1,52 @@
+"""
+Tests for the seeded index permutations behind shuffled mode.
+
+This module tests:
+- Bijection on range(count) for awkward sizes
+- Reproducibility per (seed, epoch)
+- Different orders for different seeds and epochs
+"""
+
+import pytest
+
+from pipemind_image_order import IndexPermutation
+
+
+class TestIndexPermutation:
+    """Test suite for IndexPermutation."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("count", [1, 2, 3, 5, 16, 17, 1000, 4097])
+    def test_is_a_permutation(self, count):
+        """Test that every index is visited exactly once."""
+        permutation = IndexPermutation(count, seed=42)
+        assert sorted(permutation[i] for i in range(count)) == list(range(count))
+
+    @pytest.mark.unit
+    def test_reproducible(self):
+        """Test that the same seed and epoch give the same order."""
+        first = [IndexPermutation(100, 1, 2)[i] for i in range(100)]
+        second = [IndexPermutation(100, 1, 2)[i] for i in range(100)]
+        assert first == second
+
+    @pytest.mark.unit
+    def test_seed_and_epoch_change_order(self):
+        """Test that other seeds and epochs give other orders."""
+        base = [IndexPermutation(100, 1, 0)[i] for i in range(100)]
+        assert base != list(range(100))
+        assert base != [IndexPermutation(100, 2, 0)[i] for i in range(100)]
+        assert base != [IndexPermutation(100, 1, 1)[i] for i in range(100)]
+
+    @pytest.mark.unit
+    def test_large_count_needs_no_list(self):
+        """Test that huge counts work without materializing an order."""
+        permutation = IndexPermutation(10_000_000, seed=9)
+        values = {permutation[i] for i in range(1000)}
+        assert len(values) == 1000
+        assert all(0 <= v < 10_000_000 for v in values)
+
+    @pytest.mark.unit
+    def test_out_of_range(self):
+        """Test that positions outside range(count) raise IndexError."""
+        with pytest.raises(IndexError):
+            IndexPermutation(3)[3]
@@ -0,0 +1,147 @@
+"""
+Tests for the thumbnail cache and the thumbnail route helpers.
+
+This module tests:
+- Thumbnail size, format and reuse per (path, mtime, size)
+- Background building in the order the images are scheduled
+- Resolving route requests inside the registered base folders
+"""
+
+import os
+import time
+import pytest
+from PIL import Image
+
+import pipemind_image_catalog
+import pipemind_image_thumbnails
+from pipemind_image_thumbnails import ThumbnailCache, register_root, resolve_image
+
+
+@pytest.fixture
+def thumbnails(tmp_path):
+    """Provide a thumbnail cache in a temporary folder."""
+    return ThumbnailCache(str(tmp_path / "thumbnails"), size=16)
+
+
+def wait_for(cache, count, timeout=10.0):
+    """Wait until the background builder has processed count images."""
+    deadline = time.monotonic() + timeout
+    while cache.built + cache.failed < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+class TestThumbnailCache:
+    """Test suite for ThumbnailCache."""
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_thumbnail_fits_size(self, thumbnails, sample_image_dir):
+        """Test that thumbnails are small WebP images with the source's aspect ratio."""
+        path = thumbnails.make(str(sample_image_dir / "a.png"))
+        with Image.open(path) as thumbnail:
+            assert thumbnail.format == "WEBP"
+            assert thumbnail.size == (16, 8)
+        assert thumbnails.load(str(sample_image_dir / "a.png")).shape == (8, 16, 3)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_reused_until_the_source_changes(self, thumbnails, sample_image_dir, monkeypatch):
+        """Test that an existing thumbnail is served without decoding the source."""
+        source = str(sample_image_dir / "a.png")
+        first = thumbnails.make(source)
+
+        monkeypatch.setattr(pipemind_image_thumbnails, "open_image", None)
+        assert thumbnails.make(source) == first
+        monkeypatch.undo()
+
+        Image.new("RGB", (64, 16)).save(source)
+        second = thumbnails.make(source)
+        assert second != first
+        with Image.open(second) as thumbnail:
+            assert thumbnail.size == (16, 4)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_background_build(self, thumbnails, sample_image_dir):
+        """Test that scheduled thumbnails are built and unreadable images are skipped."""
+        paths = [str(sample_image_dir / name) for name in ("a.png", "broken.png", "b.png")]
+        thumbnails.schedule(paths)
+        wait_for(thumbnails, len(paths))
+
+        assert thumbnails.stats() == {"built": 2, "failed": 1, "pending": 0}
+        assert os.path.exists(thumbnails.path(paths[2]))
+
+    @pytest.mark.unit
+    def test_schedule_replaces_queue(self, thumbnails, monkeypatch):
+        """Test that a new schedule drops what was still queued."""
+        started = []
+
+        def make(path):
+            started.append(path)
+            time.sleep(0.2)
+
+        monkeypatch.setattr(thumbnails, "make", make)
+
+        thumbnails.schedule(["first", "stale-1", "stale-2"])
+        time.sleep(0.05)
+        thumbnails.schedule(["next"])
+        time.sleep(0.5)
+        assert started == ["first", "next"]
+
+
+class TestResolveImage:
+    """Test suite for resolving thumbnail route requests."""
+
+    @pytest.fixture(autouse=True)
+    def roots(self, monkeypatch, sample_image_dir):
+        """Register the sample tree as the input folder with a fresh catalog."""
+        monkeypatch.setattr(pipemind_image_thumbnails, "_roots", {})
+        monkeypatch.setattr(
+            pipemind_image_catalog, "_catalog", pipemind_image_catalog.ImageCatalog(":memory:")
+        )
+        register_root("input", str(sample_image_dir))
+
+    @pytest.mark.unit
+    def test_filename(self, sample_image_dir):
+        """Test that a relative file name resolves inside the base folder."""
+        assert resolve_image("input", "sub/c.png") == str(sample_image_dir / "sub" / "c.png")
+
+    @pytest.mark.unit
+    def test_directory_and_index(self, sample_image_dir):
+        """Test that a folder and index resolve through the catalog listing."""
+        assert resolve_image("input", directory="", index=1) == str(sample_image_dir / "b.png")
+        with pytest.raises(FileNotFoundError):
+            resolve_image("input", directory="sub", index=1)
+
+    @pytest.mark.unit
+    def test_registered_listing(self, sample_image_dir):
+        """Test that a folder is listed by the registered function with the listing inputs."""
+        calls = []
+
+        def list_images(folder, listing):
+            calls.append((folder, listing))
+            return [str(sample_image_dir / "sub" / "c.png")]
+
+        register_root("input", str(sample_image_dir), list_images)
+        image_path = resolve_image("input", directory="", index=0, listing={"sort": "pixels"})
+
+        assert image_path == str(sample_image_dir / "sub" / "c.png")
+        assert calls == [(str(sample_image_dir), {"sort": "pixels"})]
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("root,filename", [
+        ("output", "a.png"),
+        ("input", "../images/a.png/../../secret.png"),
+        ("input", "../outside.png"),
+        ("input", "notes.txt"),
+    ])
+    def test_rejected(self, root, filename):
+        """Test that unknown roots, paths escaping the folder and non-images are refused."""
+        with pytest.raises(ValueError):
+            resolve_image(root, filename)
+
+    @pytest.mark.unit
+    def test_missing(self):
+        """Test that a missing image is reported as not found."""
+        with pytest.raises(FileNotFoundError):
+            resolve_image("input", "missing.png")
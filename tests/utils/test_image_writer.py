@@ -0,0 +1,398 @@
+"""
+Tests for the background writer pool used by PipemindSaveImageWTxt.
+
+This module tests:
+- Jobs running in the background and flushing
+- Backpressure once the pending limit is reached
+- Failure collection for the next execution, per submitting node
+- Atomic writes
+- Parallel batch encoding with write_many
+- Whole-batch tensor to uint8 conversion
+- Output formats, profiles, metadata embedding and save statistics
+"""
+
+import os
+import threading
+import time
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+from pipemind_image_writer import (
+    FORMAT_EXTENSIONS, SAVE_FORMATS, SAVE_PROFILES, BackgroundWriter, SaveErrors, SaveOptions,
+    SaveStats, format_errors, format_stats, images_to_uint8, resolve_save_options, write_atomic,
+    write_image, write_many,
+)
+
+FAST_PNG = SaveOptions("png", 1, 90)
+
+
+@pytest.fixture
+def writer():
+    """Provide a small writer pool."""
+    pool = BackgroundWriter(workers=2, max_pending=2)
+    yield pool
+    pool.shutdown()
+
+
+class TestBackgroundWriter:
+    """Test suite for BackgroundWriter."""
+
+    @pytest.mark.unit
+    def test_jobs_run_in_background(self, writer, tmp_path):
+        """Test that submit returns before the job ran and flush waits for it."""
+        release = threading.Event()
+        done = []
+
+        def job(path):
+            release.wait()
+            path.write_text("saved")
+            done.append(path)
+
+        writer.submit("a.png", job, tmp_path / "a.png")
+        assert done == []
+        assert writer.pending() == 1
+
+        release.set()
+        assert writer.flush(timeout=5)
+        assert (tmp_path / "a.png").read_text() == "saved"
+        assert (writer.pending(), writer.written) == (0, 1)
+
+    @pytest.mark.unit
+    def test_backpressure(self, writer):
+        """Test that submitting blocks while max_pending jobs are outstanding."""
+        release = threading.Event()
+        for name in ("a", "b"):
+            writer.submit(name, release.wait)
+
+        submitted = threading.Event()
+        thread = threading.Thread(
+            target=lambda: (writer.submit("c", lambda: None), submitted.set())
+        )
+        thread.start()
+        assert not submitted.wait(0.2)
+
+        release.set()
+        assert submitted.wait(5)
+        thread.join()
+        assert writer.flush(timeout=5)
+        assert writer.written == 3
+
+    @pytest.mark.unit
+    def test_failures_are_reported_once(self, writer):
+        """Test that failed jobs are collected until taken and do not stop the pool."""
+        def fail():
+            raise OSError("disk full")
+
+        writer.submit("bad.png", fail)
+        writer.submit("good.png", lambda: None)
+        writer.flush(timeout=5)
+
+        errors = writer.take_errors()
+        assert [(label, str(error)) for label, error in errors] == [("bad.png", "disk full")]
+        assert writer.take_errors() == []
+        assert writer.written == 1
+
+    @pytest.mark.unit
+    def test_failures_go_to_the_submitting_node(self, writer):
+        """Test that a failure is only reported to the SaveErrors it was submitted with."""
+        def fail():
+            raise OSError("disk full")
+
+        failing, other = SaveErrors(), SaveErrors()
+        writer.submit("bad.png", fail, errors=failing)
+        writer.submit("good.png", lambda: None, errors=other)
+        writer.flush(timeout=5)
+
+        assert writer.take_errors() == []
+        assert other.take() == []
+        errors = failing.take()
+        assert [(label, str(error)) for label, error in errors] == [("bad.png", "disk full")]
+        assert failing.take() == []
+
+    @pytest.mark.unit
+    def test_format_errors(self):
+        """Test that long failure lists are cut off."""
+        errors = [(f"{i}.png", OSError("disk full")) for i in range(12)]
+        lines = format_errors(errors, limit=10).split("\n")
+        assert lines[0] == "0.png: disk full"
+        assert lines[-1] == "... and 2 more"
+        assert len(lines) == 11
+
+    @pytest.mark.unit
+    def test_flush_timeout(self, writer):
+        """Test that flush gives up after its timeout."""
+        writer.submit("slow", time.sleep, 0.5)
+        assert writer.flush(timeout=0.05) is False
+        assert writer.flush(timeout=5) is True
+
+
+class TestWriteAtomic:
+    """Test suite for write_atomic."""
+
+    @pytest.mark.unit
+    def test_replaces_target(self, tmp_path):
+        """Test that the file only appears once it is complete."""
+        target = tmp_path / "image.png"
+
+        def write(path):
+            assert not target.exists()
+            with open(path, "w") as f:
+                f.write("data")
+
+        write_atomic(str(target), write)
+        assert target.read_text() == "data"
+        assert os.listdir(tmp_path) == ["image.png"]
+
+    @pytest.mark.unit
+    def test_failed_write_leaves_nothing(self, tmp_path):
+        """Test that a failing write removes its temporary file."""
+        def write(path):
+            with open(path, "w") as f:
+                f.write("partial")
+            raise ValueError("encoder error")
+
+        with pytest.raises(ValueError):
+            write_atomic(str(tmp_path / "image.png"), write)
+        assert os.listdir(tmp_path) == []
+
+
+def noise_batch(count, size=64, seed=0):
+    """Create a batch of random uint8 RGB frames."""
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (size, size, 3), dtype=np.uint8) for _ in range(count)]
+
+
+class TestWriteMany:
+    """Test suite for parallel batch encoding."""
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_names_and_captions_pair_up(self, tmp_path):
+        """Test that every frame lands in its own file next to its caption."""
+        frames = noise_batch(6)
+        jobs = [
+            (pixels, str(tmp_path / f"tag_{i:05}.png"), None, FAST_PNG,
+             str(tmp_path / f"tag_{i:05}.txt"), f"caption {i}")
+            for i, pixels in enumerate(frames)
+        ]
+        write_many(jobs, workers=4)
+
+        for i, pixels in enumerate(frames):
+            with Image.open(tmp_path / f"tag_{i:05}.png") as img:
+                assert np.array_equal(np.asarray(img), pixels)
+            assert (tmp_path / f"tag_{i:05}.txt").read_text() == f"caption {i}"
+
+    @pytest.mark.unit
+    def test_failure_raised_after_all_jobs(self, tmp_path):
+        """Test that one failing job does not stop the others."""
+        done = []
+
+        def write(i):
+            if i == 1:
+                raise OSError("disk full")
+            done.append(i)
+
+        with pytest.raises(OSError, match="disk full"):
+            write_many([(i,) for i in range(4)], write=write, workers=2)
+        assert sorted(done) == [0, 2, 3]
+
+    @pytest.mark.unit
+    def test_failed_image_removes_placeholder(self, tmp_path):
+        """Test that the empty file of a claimed name is removed when encoding fails."""
+        target = tmp_path / "tag_00000.png"
+        target.write_bytes(b"")
+        bad_pixels = np.zeros((4, 4, 7), dtype=np.uint8)
+
+        with pytest.raises(Exception):
+            write_image(bad_pixels, str(target), None, FAST_PNG)
+        assert os.listdir(tmp_path) == []
+
+    @pytest.mark.slow
+    @pytest.mark.image
+    def test_benchmark_parallel_encoding(self, tmp_path):
+        """Compare sequential and parallel encoding of a synthetic 16-frame batch."""
+        frames = noise_batch(16, size=512)
+
+        def timed(workers):
+            folder = tmp_path / f"workers_{workers}"
+            folder.mkdir()
+            jobs = [(pixels, str(folder / f"{i}.png"), None, SAVE_PROFILES["balanced"]) for i, pixels in enumerate(frames)]
+            start = time.perf_counter()
+            write_many(jobs, workers=workers)
+            return time.perf_counter() - start, folder
+
+        sequential, sequential_dir = timed(1)
+        parallel, parallel_dir = timed(0)
+        print(f"\nPNG encode 16x512x512: sequential {sequential * 1000:.0f} ms, "
+              f"parallel {parallel * 1000:.0f} ms ({sequential / parallel:.2f}x, "
+              f"{os.cpu_count()} CPUs)")
+
+        for i in range(len(frames)):
+            assert (sequential_dir / f"{i}.png").read_bytes() == (parallel_dir / f"{i}.png").read_bytes()
+
+
+def legacy_to_uint8(image):
+    """The per-frame conversion images_to_uint8 replaces."""
+    i = 255. * image.cpu().numpy()
+    return np.clip(i, 0, 255).astype(np.uint8)
+
+
+class TestImagesToUint8:
+    """Test suite for the batch conversion."""
+
+    @pytest.mark.unit
+    def test_matches_per_frame_conversion(self):
+        """Test that the result differs from the truncating conversion by rounding only."""
+        images = torch.rand(3, 16, 12, 3)
+        pixels = images_to_uint8(images)
+
+        assert pixels.dtype == np.uint8
+        assert pixels.shape == (3, 16, 12, 3)
+        for frame, image in zip(pixels, images):
+            diff = frame.astype(int) - legacy_to_uint8(image).astype(int)
+            assert diff.min() >= 0 and diff.max() <= 1
+
+    @pytest.mark.unit
+    def test_clamps_and_rounds(self):
+        """Test out-of-range values and rounding."""
+        images = torch.tensor([-0.5, 0.0, 0.6 / 255, 0.4, 1.0, 2.0]).reshape(1, 1, 6, 1)
+        assert images_to_uint8(images).ravel().tolist() == [0, 0, 1, 102, 255, 255]
+
+    @pytest.mark.unit
+    def test_frames_are_views(self):
+        """Test that frames share the batch buffer and are contiguous for PIL."""
+        pixels = images_to_uint8(torch.rand(2, 8, 8, 3))
+        frame = pixels[1]
+        assert np.shares_memory(frame, pixels)
+        assert frame.flags["C_CONTIGUOUS"]
+
+    @pytest.mark.unit
+    def test_non_contiguous_input(self):
+        """Test a permuted (non-contiguous) batch."""
+        images = torch.rand(2, 3, 8, 6).permute(0, 2, 3, 1)
+        pixels = images_to_uint8(images)
+        assert pixels.shape == (2, 8, 6, 3)
+        assert pixels.flags["C_CONTIGUOUS"]
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("dtype", [torch.float16, torch.bfloat16, torch.float64])
+    def test_other_dtypes(self, dtype):
+        """Test half, bfloat16 and double batches."""
+        images = torch.tensor([0.0, 0.5, 1.0]).reshape(1, 1, 3, 1).to(dtype)
+        assert images_to_uint8(images).ravel().tolist() == [0, 128, 255]
+
+    @pytest.mark.slow
+    def test_benchmark_against_legacy(self):
+        """Compare the batch conversion with the per-frame legacy conversion."""
+        images = torch.rand(16, 512, 512, 3)
+        rounds = 5
+
+        def timed(convert):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                convert()
+            return (time.perf_counter() - start) / rounds
+
+        legacy = timed(lambda: [legacy_to_uint8(image) for image in images])
+        batched = timed(lambda: images_to_uint8(images))
+        print(f"\nuint8 conversion 16x512x512: legacy {legacy * 1000:.1f} ms, "
+              f"batched {batched * 1000:.1f} ms ({legacy / batched:.2f}x)")
+
+
+class TestSaveFormats:
+    """Test suite for output formats and profiles."""
+
+    METADATA = {"prompt": '{"1": {"class_type": "KSampler"}}', "workflow": '{"nodes": []}'}
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    @pytest.mark.parametrize("save_format", SAVE_FORMATS)
+    def test_round_trip(self, tmp_path, save_format):
+        """Test that every format writes a readable file with the right pixels."""
+        pixels = noise_batch(1, size=32)[0]
+        path = tmp_path / f"tag_00000{FORMAT_EXTENSIONS[save_format]}"
+        write_image(pixels, str(path), self.METADATA, SaveOptions(save_format, 1, 90))
+
+        if save_format == "npy":
+            assert np.array_equal(np.load(path), pixels)
+            return
+        with Image.open(path) as img:
+            decoded = np.asarray(img.convert("RGB"))
+        assert decoded.shape == pixels.shape
+        if save_format in ("png", "webp-lossless"):
+            assert np.array_equal(decoded, pixels)
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_png_metadata(self, tmp_path):
+        """Test that PNG keeps metadata as text chunks."""
+        path = tmp_path / "tag.png"
+        write_image(noise_batch(1, 8)[0], str(path), self.METADATA, FAST_PNG)
+        with Image.open(path) as img:
+            assert img.text == self.METADATA
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    @pytest.mark.parametrize("save_format", ["webp-lossless", "webp", "jpeg"])
+    def test_exif_metadata(self, tmp_path, save_format):
+        """Test that WebP and JPEG keep metadata in EXIF like ComfyUI's WebP saver."""
+        path = tmp_path / f"tag{FORMAT_EXTENSIONS[save_format]}"
+        write_image(noise_batch(1, 8)[0], str(path), self.METADATA, SaveOptions(save_format, 1, 90))
+        with Image.open(path) as img:
+            exif = img.getexif()
+        assert exif[0x0110] == f"prompt:{self.METADATA['prompt']}"
+        assert exif[0x010f] == f"workflow:{self.METADATA['workflow']}"
+
+    @pytest.mark.unit
+    @pytest.mark.image
+    def test_oversized_jpeg_metadata_dropped(self, tmp_path):
+        """Test that metadata too large for a JPEG segment is skipped, not fatal."""
+        path = tmp_path / "tag.jpg"
+        write_image(noise_batch(1, 8)[0], str(path), {"workflow": "x" * 70000},
+                    SaveOptions("jpeg", 0, 90))
+        with Image.open(path) as img:
+            assert img.size == (8, 8)
+            assert 0x010f not in img.getexif()
+
+    @pytest.mark.unit
+    def test_resolve_profiles(self):
+        """Test that profiles override the format inputs and custom uses them."""
+        assert resolve_save_options("balanced", "jpeg", 9, 50) == SaveOptions("png", 4, 90)
+        assert resolve_save_options("custom", "jpeg", 9, 50) == SaveOptions("jpeg", 9, 50)
+        with pytest.raises(ValueError):
+            resolve_save_options("custom", "bmp")
+
+    @pytest.mark.unit
+    def test_stats(self, tmp_path):
+        """Test that writes are counted per label and reset when taken."""
+        stats = SaveStats()
+        for i in range(2):
+            write_image(noise_batch(1, 8)[0], str(tmp_path / f"{i}.png"), None, FAST_PNG,
+                        stats=stats, label="fastest")
+        totals = stats.take()
+
+        count, size, seconds = totals["fastest"]
+        assert count == 2
+        assert size == sum(os.path.getsize(tmp_path / f"{i}.png") for i in range(2))
+        assert seconds > 0
+        assert format_stats(totals).startswith("fastest: 2 image(s)")
+        assert stats.take() == {}
+
+    @pytest.mark.slow
+    @pytest.mark.image
+    def test_benchmark_profiles(self, tmp_path):
+        """Report encode time and size of each profile on a smooth synthetic image."""
+        y, x = np.mgrid[0:768, 0:768]
+        noise = np.random.default_rng(0).normal(0, 4, (768, 768, 3))
+        pixels = np.clip(np.stack([x / 3, y / 3, (x + y) / 6], -1) + noise, 0, 255).astype(np.uint8)
+        stats = SaveStats()
+
+        for name, options in SAVE_PROFILES.items():
+            write_image(pixels, str(tmp_path / f"{name}{FORMAT_EXTENSIONS[options.format]}"),
+                        None, options, stats=stats, label=name)
+        totals = stats.take()
+        print("\n" + format_stats(totals))
+
+        assert totals["smallest"][1] < totals["fastest"][1]
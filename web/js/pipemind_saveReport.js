@@ -0,0 +1,40 @@
+import { app } from "../../../scripts/app.js";
+import { ComfyWidgets } from "../../../scripts/widgets.js";
+
+// Shows the encode time and file size report of PipemindSaveImageWTxt on the node
+app.registerExtension({
+	name: "pipemind.SaveReport",
+	async beforeRegisterNodeDef(nodeType, nodeData, app) {
+		if (nodeData.name !== "PipemindSaveImageWTxt") {
+			return;
+		}
+
+		const onExecuted = nodeType.prototype.onExecuted;
+		nodeType.prototype.onExecuted = function (message) {
+			onExecuted?.apply(this, arguments);
+			const text = [message?.text ?? []].flat().join("\n");
+
+			let w = this.widgets?.find((w) => w.name === "save_report");
+			if (!w) {
+				w = ComfyWidgets["STRING"](this, "save_report", ["STRING", { multiline: true }], app).widget;
+				w.inputEl.readOnly = true;
+				w.inputEl.style.opacity = 0.6;
+				// The report is output, not a setting: keep it out of the workflow
+				w.serialize = false;
+			}
+			w.value = text;
+
+			requestAnimationFrame(() => {
+				const sz = this.computeSize();
+				if (sz[0] < this.size[0]) {
+					sz[0] = this.size[0];
+				}
+				if (sz[1] < this.size[1]) {
+					sz[1] = this.size[1];
+				}
+				this.onResize?.(sz);
+				app.graph.setDirtyCanvas(true, false);
+			});
+		};
+	},
+});
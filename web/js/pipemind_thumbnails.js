@@ -0,0 +1,68 @@
+import { app } from "../../../scripts/app.js";
+import { api } from "../../../scripts/api.js";
+
+// Batch image loader nodes: the base folder their directory is relative to and
+// the dropdown entry standing for that folder itself
+const LOADERS = {
+    BatchImageLoadInput: { type: "input", rootDirectory: "[Root Input Directory]" },
+    BatchImageLoadOutput: { type: "output", rootDirectory: "[Root Output Directory]" },
+};
+
+// Inputs that decide which image an image_index refers to; they are sent to the
+// route so the preview is listed, filtered and sorted like the node does
+const LISTING_INPUTS = [
+    "validation", "max_depth", "ignore_globs", "filter", "sort", "sort_descending",
+    "min_width", "min_height", "max_width", "max_height", "orientation", "name_glob",
+];
+
+app.registerExtension({
+    name: "pipemind.Thumbnails",
+    async beforeRegisterNodeDef(nodeType, nodeData, app) {
+        const loader = LOADERS[nodeData.name];
+        if (!loader) {
+            return;
+        }
+
+        const onNodeCreated = nodeType.prototype.onNodeCreated;
+        nodeType.prototype.onNodeCreated = function () {
+            onNodeCreated ? onNodeCreated.apply(this, []) : undefined;
+
+            const widget = (name) => this.widgets?.find((w) => w.name === name);
+
+            // Show the cached thumbnail of the selected image without running the workflow
+            const showThumbnail = () => {
+                const directory = widget("directory")?.value ?? "";
+                const params = new URLSearchParams({
+                    type: loader.type,
+                    directory: directory === loader.rootDirectory ? "" : directory,
+                    index: String(widget("image_index")?.value ?? 0),
+                });
+                for (const name of LISTING_INPUTS) {
+                    const w = widget(name);
+                    if (w) {
+                        params.set(name, String(w.value));
+                    }
+                }
+                const img = new Image();
+                img.onload = () => {
+                    this.imgs = [img];
+                    app.graph.setDirtyCanvas(true);
+                };
+                img.src = api.apiURL(`/pipemind/thumbnail?${params}`);
+            };
+
+            for (const name of ["directory", "image_index", ...LISTING_INPUTS]) {
+                const w = widget(name);
+                if (!w) {
+                    continue;
+                }
+                const callback = w.callback;
+                w.callback = function () {
+                    const result = callback?.apply(this, arguments);
+                    showThumbnail();
+                    return result;
+                };
+            }
+        };
+    },
+});